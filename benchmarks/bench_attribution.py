@@ -0,0 +1,87 @@
+"""Parity and latency: FlatForest path-based attributions.
+
+Usage:
+    python benchmarks/bench_attribution.py [--rows 20000] [--reference-rows 200]
+
+Parity: for a sample of rows, the attributions are recomputed tree by tree
+from sklearn's ``decision_path`` (the textbook per-node walk) and must
+match; for every row, bias plus contributions must equal
+``model.predict_proba``. Latency is reported per row for single-row calls
+(the UI) and for batches (``score --explain``).
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_model_artifacts  # noqa: E402
+from readmission.forest import FlatForest  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+
+
+def reference_contributions(model, X):
+    """Per-tree walk along sklearn's decision paths, averaged over trees."""
+    X = np.asarray(X, dtype=np.float32)
+    contributions = np.zeros((len(X), X.shape[1], model.n_classes_))
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+        paths = estimator.decision_path(X)
+        for row in range(len(X)):
+            nodes = paths.indices[paths.indptr[row]:paths.indptr[row + 1]]
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                contributions[row, tree.feature[parent]] += value[child] - value[parent]
+    return contributions / len(model.estimators_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--reference-rows', type=int, default=200, help='rows checked against the per-node walk')
+    parser.add_argument('--single-row-calls', type=int, default=500)
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    model.n_jobs = 1
+    forest = FlatForest.from_sklearn(model)
+    X, _ = encode_features(synthetic_features(args.rows, encoders), encoders, feature_names)
+    print(f"Forest: {forest.n_trees} trees, {forest.n_nodes:,} nodes, max depth {forest.max_depth}")
+
+    bias, contributions = forest.contributions(X)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X), atol=1e-9)
+    print(f"✓ bias + contributions == predict_proba for {len(X):,} rows")
+    sample = X.iloc[:args.reference_rows]
+    np.testing.assert_allclose(contributions[:len(sample)], reference_contributions(model, sample), atol=1e-12)
+    print(f"✓ Matches the per-tree decision_path walk for {len(sample):,} rows")
+
+    row = X.iloc[[0]]
+    forest.contributions(row)
+    times = np.empty(args.single_row_calls)
+    for i in range(args.single_row_calls):
+        start = time.perf_counter()
+        forest.contributions(row)
+        times[i] = time.perf_counter() - start
+    p50, p99 = np.percentile(times * 1000, [50, 99])
+    print(f"\nSingle row:  p50 {p50:.3f} ms   p99 {p99:.3f} ms")
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    predict_seconds = time.perf_counter() - start
+    for batch in (100, 1_000, len(X)):
+        start = time.perf_counter()
+        for offset in range(0, len(X), batch):
+            forest.contributions(X.iloc[offset:offset + batch])
+        seconds = time.perf_counter() - start
+        print(f"Batch {batch:>6,}: {seconds / len(X) * 1e6:8.1f} µs/row")
+    print(f"(sklearn predict_proba alone: {predict_seconds / len(X) * 1e6:.1f} µs/row)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Cold load: three pickles (model, encoders, feature names) vs. the model bundle.
+
+Each measurement runs in a fresh interpreter and times imports, artifact
+loading and the first single-row prediction; peak RSS is reported too.
+Also checks that the bundle reproduces the pickled model's probabilities.
+
+Usage:
+    python benchmarks/bench_bundle.py [--repeats 5] [--models-dir models/]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import DEFAULT_MODELS, load_model_artifacts  # noqa: E402
+from readmission.bundle import BUNDLE_DIR, load_bundle, write_bundle  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+
+ROW = {'LengthOfStay': 5, 'PreviousAdmissions': 2, 'PatientAge': 70.0, 'PatientGender': 1, 'DiagnosisChapter': 8,
+       'NumLabs': 100, 'hemoglobin_avg': 12.0, 'glucose_avg': 130.0, 'creatinine_avg': 1.4, 'wbc_avg': 9.0}
+
+# Run in a fresh interpreter; prints {"seconds": ..., "max_rss_mb": ...}
+LOADERS = {
+    'three pickles': '''
+from readmission.artifacts import load_model_artifacts
+model, encoders, feature_names = load_model_artifacts({path!r})
+import pandas as pd
+model.n_jobs = 1
+model.predict_proba(pd.DataFrame([{row!r}])[feature_names])
+''',
+    'bundle (verified)': '''
+from readmission.bundle import load_bundle
+bundle = load_bundle({path!r})
+import numpy as np
+bundle.predict_proba(np.array([[{row!r}[name] for name in bundle.feature_names]]))
+''',
+    'bundle (lazy mmap)': '''
+from readmission.bundle import load_bundle
+bundle = load_bundle({path!r}, verify=False)
+import numpy as np
+bundle.predict_proba(np.array([[{row!r}[name] for name in bundle.feature_names]]))
+''',
+}
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{body}
+seconds = time.perf_counter() - start
+import json
+# VmHWM, unlike ru_maxrss, is not inherited from the parent process
+peak_kb = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM'))
+print(json.dumps({{"seconds": seconds, "max_rss_mb": peak_kb / 1024}}))
+'''
+
+
+def cold_load(body):
+    result = subprocess.run([sys.executable, '-c', TIMER.format(body=body)], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True, env={**os.environ, 'PYTHONWARNINGS': 'ignore'})
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS))
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts(args.models_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = Path(tmp) / BUNDLE_DIR
+        manifest = write_bundle(bundle_path, model, encoders, feature_names)
+        bundle = load_bundle(bundle_path)
+        features_df = synthetic_features(5000, encoders)
+        X, _ = encode_features(features_df, bundle.vocabularies, bundle.feature_names)
+        assert np.array_equal(bundle.predict_proba(X), model.predict_proba(X))
+        print(f"✓ Bundle {manifest['model_version']} matches the pickled model on {len(X):,} rows\n")
+
+        print(f"{'Cold load + first prediction':<28} {'median':>9} {'min':>9} {'peak RSS':>10}")
+        for name, template in LOADERS.items():
+            path = args.models_dir if name == 'three pickles' else str(bundle_path)
+            runs = [cold_load(template.format(path=path, row=ROW)) for _ in range(args.repeats)]
+            seconds = np.array([run['seconds'] for run in runs]) * 1000
+            rss = max(run['max_rss_mb'] for run in runs)
+            print(f"{name:<28} {np.median(seconds):>7.0f}ms {seconds.min():>7.0f}ms {rss:>8.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
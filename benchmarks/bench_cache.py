@@ -0,0 +1,76 @@
+"""Prediction cache: UI-style single-row scoring with repeated inputs, with and without the cache.
+
+Requests are drawn from a pool of distinct admissions with a skewed
+(Zipf) distribution, like clinicians re-clicking "Analyze" or switching
+tabs with unchanged inputs. Also checks that cached probabilities equal
+``predict_proba`` and exercises LRU eviction and TTL expiry.
+
+Usage:
+    python benchmarks/bench_cache.py [--requests 2000] [--distinct 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_model_artifacts, model_version  # noqa: E402
+from readmission.cache import PredictionCache  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+
+
+def check_eviction_and_ttl():
+    now = [0.0]
+    cache = PredictionCache(maxsize=2, ttl_seconds=10, clock=lambda: now[0])
+    for key in 'abc':
+        cache.put(key, key)
+    assert cache.get('a') is None and cache.get('c') == 'c' and cache.evictions == 1
+    now[0] = 11.0
+    assert cache.get('c') is None and cache.expirations == 1
+    print("✓ LRU eviction and TTL expiry")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=200)
+    parser.add_argument('--zipf', type=float, default=1.3, help='skew of the request distribution')
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    model.n_jobs = 1
+    version = model_version()
+    X, _ = encode_features(synthetic_features(args.distinct, encoders), encoders, feature_names)
+    rng = np.random.default_rng(0)
+    requests = (rng.zipf(args.zipf, args.requests) - 1) % args.distinct
+    expected = model.predict_proba(X)
+
+    start = time.perf_counter()
+    for i in requests:
+        model.predict_proba(X.iloc[[i]])
+    uncached = time.perf_counter() - start
+
+    cache = PredictionCache()
+    start = time.perf_counter()
+    for i in requests:
+        proba = cache.predict_proba(X.iloc[[i]], model.predict_proba, version)
+        assert np.array_equal(proba, expected[[i]])
+    cached = time.perf_counter() - start
+
+    stats = cache.stats()
+    print(f"{args.requests:,} requests over {len(np.unique(requests))} distinct admissions\n")
+    print(f"{'Uncached predict_proba':<26} {uncached / args.requests * 1000:>8.2f} ms/request")
+    print(f"{'With PredictionCache':<26} {cached / args.requests * 1000:>8.2f} ms/request  ({uncached / cached:.1f}x)")
+    print(f"  hits {stats['hits']:,}  misses {stats['misses']:,}  hit rate {stats['hit_rate']:.1%}\n")
+    print("✓ Cached probabilities match predict_proba")
+    check_eviction_and_ttl()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Parity, latency and throughput of the discharge drop-directory watcher.
+
+Usage:
+    python benchmarks/bench_discharge_watch.py [--patients 20000] [--files 200] [--rows-per-file 20] [--rate 20]
+
+A synthetic EMR is generated and the last admission of ``files *
+rows-per-file`` patients is held out; the rest is the watcher's history.
+The held-out discharges are dropped as ``<stem>.admissions.tsv`` files
+with their labs and diagnoses (companions first, each renamed into
+place), first paced at ``--rate`` files per second, then all at once.
+
+Checks that every scored probability equals scoring the full-dataset
+training features (``create_readmission_labels`` + ``build_model_df``)
+of the same admission, and that a restarted watcher rescores nothing.
+Reports latency from file arrival to written score for the paced run and
+sustained files per second for the burst.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.artifacts import DEFAULT_MODELS  # noqa: E402
+from readmission.cleaning import RAW_FILES, clean_tables, load_raw_tables  # noqa: E402
+from readmission.features import LAB_COLUMNS, build_model_df, create_readmission_labels  # noqa: E402
+from readmission.lab_features import KEY_COLUMNS, aggregate_lab_features  # noqa: E402
+from readmission.registry import ModelVersion  # noqa: E402
+from readmission.watch import BATCH_FILES, SCORES_SUFFIX, DischargeHistory, DischargeWatcher  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+REFERENCE_DATE = '2025-01-01'
+
+
+def reference_features(dataset):
+    """Training features of every admission, computed over the full dataset."""
+    tables = clean_tables(load_raw_tables(dataset, compact=False))
+    labelled = create_readmission_labels(tables['admissions'])
+    features = build_model_df(labelled, tables['patients'], tables['diagnoses'],
+                              aggregate_lab_features(tables['labs']), REFERENCE_DATE)
+    features['NumLabs'] = features['NumLabs'].fillna(0)
+    return features
+
+
+def split_drops(raw, n_files, rows_per_file, seed=0):
+    """Hold out the last admission of randomly chosen patients; returns (history admissions, batches)."""
+    admissions = raw['admissions']
+    last = admissions.sort_values('AdmissionStartDate').groupby('PatientID').tail(1)
+    chosen = last.sample(n_files * rows_per_file, random_state=seed)
+    held_out = admissions.index.isin(chosen.index)
+    batches = []
+    for i in range(n_files):
+        keys = chosen.iloc[i * rows_per_file:(i + 1) * rows_per_file][KEY_COLUMNS]
+        batch = {'admissions': keys.merge(admissions, on=KEY_COLUMNS)}
+        for table in ('labs', 'diagnoses'):
+            batch[table] = raw[table].merge(keys, on=KEY_COLUMNS)
+        batches.append((f'discharges-{i:05d}', batch))
+    return admissions.loc[~held_out], batches
+
+
+def drop(drop_dir, stem, batch):
+    # Companions first; the admissions file appearing completes the batch
+    for table in ('labs', 'diagnoses', 'admissions'):
+        path = os.path.join(drop_dir, stem + BATCH_FILES[table])
+        batch[table].to_csv(path + '.tmp', sep='\t', index=False)
+        os.replace(path + '.tmp', path)
+
+
+def run(watcher, drop_dir, batches, rate=None):
+    watcher.start()
+    for stem, batch in batches:
+        drop(drop_dir, stem, batch)
+        if rate:
+            time.sleep(1 / rate)
+    deadline = time.time() + 60
+    while watcher.files + watcher.failed < len(batches) and time.time() < deadline:
+        time.sleep(0.05)
+    watcher.close()
+    return watcher.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=20_000)
+    parser.add_argument('--files', type=int, default=200, help='dropped files per run')
+    parser.add_argument('--rows-per-file', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=20.0, help='files per second in the paced run')
+    parser.add_argument('--poll', type=float, default=0.1, help='watcher scan interval in seconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        dataset = tmp / 'dataset'
+        generate_emr(dataset, args.patients, labs_per_admission=10)
+        features = reference_features(dataset)
+        lab_medians = {col: float(features[col].median()) for col in LAB_COLUMNS}
+        raw = load_raw_tables(dataset, compact=False)
+        history_admissions, batches = split_drops(raw, 2 * args.files, args.rows_per_file)
+        paced, burst = batches[:args.files], batches[args.files:]
+        history_dir = tmp / 'history'
+        history_dir.mkdir()
+        history_admissions.to_csv(history_dir / RAW_FILES['admissions'], sep='\t', index=False)
+        raw['patients'].to_csv(history_dir / RAW_FILES['patients'], sep='\t', index=False)
+
+        model = ModelVersion(DEFAULT_MODELS)
+        model.model.n_jobs = 1
+        drop_dir, out_dir = tmp / 'drop', tmp / 'scored'
+        drop_dir.mkdir()
+
+        def new_watcher():
+            history = DischargeHistory.from_dataset(history_dir, REFERENCE_DATE)
+            return DischargeWatcher(drop_dir, out_dir, model, history, lab_medians, args.poll,
+                                    reference_date=REFERENCE_DATE)
+
+        paced_report = run(new_watcher(), drop_dir, paced, args.rate)
+        burst_report = run(new_watcher(), drop_dir, burst)
+        assert paced_report['failed'] == burst_report['failed'] == 0
+
+        # Parity with the training features of the same admissions
+        scored = pd.concat([pd.read_csv(out_dir / (stem + SCORES_SUFFIX)) for stem, _ in batches], ignore_index=True)
+        expected = scored[KEY_COLUMNS].merge(features, on=KEY_COLUMNS, how='left')
+        X, _ = new_watcher().encoder.transform(expected, on_unknown='flag')
+        np.testing.assert_allclose(scored['readmission_probability'], model.model.predict_proba(X)[:, 1])
+        print(f"✓ {len(scored):,} discharges from {len(batches)} files match scoring their full-dataset "
+              f"training features ({int((scored['unknown_features'].fillna('') != '').sum())} with unknown "
+              f"categories)")
+
+        # Restart: everything is checkpointed
+        outputs = {path: path.stat().st_mtime_ns for path in out_dir.glob('*' + SCORES_SUFFIX)}
+        restarted = new_watcher().run_once()
+        assert restarted.files == restarted.failed == 0
+        assert outputs == {path: path.stat().st_mtime_ns for path in out_dir.glob('*' + SCORES_SUFFIX)}
+        print(f"✓ Restarted watcher skipped all {len(restarted.checkpoint)} checkpointed files")
+
+        print(f"\nPaced {args.rate:g} files/s ({args.rows_per_file} discharges each, poll {args.poll:g}s): "
+              f"latency p50 {paced_report['latency_p50_seconds']:.2f}s  "
+              f"p95 {paced_report['latency_p95_seconds']:.2f}s  max {paced_report['latency_max_seconds']:.2f}s")
+        print(f"Burst of {args.files} files: {burst_report['files_per_second']:,.1f} files/s sustained "
+              f"({burst_report['rows'] / (burst_report['files'] / burst_report['files_per_second']):,.0f} "
+              f"discharges/s), latency max {burst_report['latency_max_seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Parity and latency: compiled FeatureEncoder vs. per-request LabelEncoder.transform.
+
+Usage:
+    python benchmarks/bench_encoding.py [--rows 100000] [--single-row-calls 2000]
+
+Parity: for values in the trained vocabulary, ``FeatureEncoder`` matches
+``LabelEncoder.transform``; every UI chapter label maps to a trained
+letter (or is reported as unknown), where the old UI encoding sent code 0
+for all of them. ``encode_records`` (the HTTP service's path) gives the
+same matrix and unknown report as ``transform``. Latency is the old UI
+encoding (``transform`` per column in a try/except) against
+``FeatureEncoder.transform`` and ``encode_records`` for one row, and the
+batch throughput of ``transform``.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_lab_medians, load_model_artifacts  # noqa: E402
+from readmission.encoding import CHAPTER_LABELS, FeatureEncoder  # noqa: E402
+from readmission.features import CATEGORICAL_COLUMNS  # noqa: E402
+
+
+def legacy_ui_encode(input_data, encoders):
+    """The UI's encoding before the compiled encoder"""
+    input_data = input_data.copy()
+    for col in ['PatientGender', 'DiagnosisChapter']:
+        if col in encoders:
+            try:
+                input_data[col] = encoders[col].transform(input_data[col].astype(str))
+            except:  # noqa: E722
+                input_data[col] = 0
+    return input_data
+
+
+def per_call_us(func, calls):
+    func()
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--single-row-calls', type=int, default=2_000)
+    args = parser.parse_args()
+
+    _, encoders, feature_names = load_model_artifacts()
+    lab_medians = load_lab_medians()
+    encoder = FeatureEncoder.from_encoders(encoders, feature_names, lab_medians)
+    raw = synthetic_features(args.rows, encoders)[feature_names]
+
+    X, unknown = encoder.transform(raw)
+    assert not unknown
+    for col in CATEGORICAL_COLUMNS:
+        np.testing.assert_array_equal(X[col], encoders[col].transform(raw[col].astype(str)))
+    np.testing.assert_array_equal(X.drop(columns=CATEGORICAL_COLUMNS), raw.drop(columns=CATEGORICAL_COLUMNS))
+    print(f"✓ Matches LabelEncoder.transform for {len(raw):,} rows")
+
+    ui_rows = pd.DataFrame({col: [raw[col].iloc[0]] * len(CHAPTER_LABELS) for col in feature_names})
+    ui_rows['DiagnosisChapter'] = CHAPTER_LABELS
+    X_ui, unknown = encoder.transform(ui_rows, on_unknown='flag')
+    classes = list(encoders['DiagnosisChapter'].classes_)
+    legacy_codes = legacy_ui_encode(ui_rows, encoders)['DiagnosisChapter']
+    print(f"✓ UI chapter labels: {len(CHAPTER_LABELS) - len(unknown.get('DiagnosisChapter', []))} of "
+          f"{len(CHAPTER_LABELS)} map to a trained letter (old encoding: always code {legacy_codes.iloc[0]}):")
+    for label, code in zip(CHAPTER_LABELS, X_ui['DiagnosisChapter']):
+        flag = '  (unknown, flagged)' if label in unknown.get('DiagnosisChapter', []) else ''
+        print(f"    {label:<40} -> {classes[code]}{flag}")
+
+    records = ui_rows.head(200).to_dict('records')
+    X_records, unknown_records = encoder.encode_records(records, on_unknown='flag')
+    X_frame, unknown_frame = encoder.transform(ui_rows.head(200), on_unknown='flag')
+    np.testing.assert_array_equal(X_records, X_frame.to_numpy(dtype=np.float64))
+    assert unknown_records == unknown_frame
+    print("✓ encode_records matches transform, unknown report included")
+
+    row = raw.iloc[[0]]
+    record = row.to_dict('records')
+    legacy = per_call_us(lambda: legacy_ui_encode(row, encoders), args.single_row_calls)
+    compiled = per_call_us(lambda: encoder.transform(row), args.single_row_calls)
+    from_records = per_call_us(lambda: encoder.encode_records(record), args.single_row_calls)
+    print(f"\nSingle row:  LabelEncoder.transform {legacy:8.1f} µs   FeatureEncoder.transform {compiled:8.1f} µs   "
+          f"encode_records {from_records:6.1f} µs")
+
+    start = time.perf_counter()
+    encoder.transform(raw)
+    compiled_seconds = time.perf_counter() - start
+    print(f"Batch {len(raw):,}: FeatureEncoder.transform {len(raw) / compiled_seconds:,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Side-by-side comparison of the model engines on one held-out test set.
+
+Usage:
+    python benchmarks/bench_engines.py [--patients 20000] [--engines random_forest hist_gb]
+    python benchmarks/bench_engines.py --dataset dataset/
+
+``model_df`` is split once (stratified 80/20). Each engine trains on the
+training part as the pipeline would feed it: the random forest on every
+readmitted row plus 200 sampled healthy rows, full-data engines on every
+row. All engines are scored on the same untouched test part, so ROC-AUC
+is comparable. Reports training time, rows used, single-row latency,
+batch throughput, pickled model size and test metrics.
+"""
+
+import argparse
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.cleaning import clean_tables, load_raw_tables  # noqa: E402
+from readmission.engines import ENGINES, get_engine  # noqa: E402
+from readmission.features import TARGET_COLUMN, build_model_df, create_readmission_labels  # noqa: E402
+from readmission.lab_features import aggregate_lab_features  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+from readmission.training import balance_dataset, evaluate_model, prepare_features, train_model  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+SINGLE_ROW_CALLS = 200
+
+
+def load_model_df(dataset_path):
+    tables = clean_tables(load_raw_tables(dataset_path))
+    labelled = create_readmission_labels(tables['admissions'])
+    return build_model_df(labelled, tables['patients'], tables['diagnoses'],
+                          aggregate_lab_features(tables['labs']), '2024-01-01')
+
+
+def single_row_p50_ms(model, row):
+    model.predict_proba(row)
+    times = np.empty(SINGLE_ROW_CALLS)
+    for i in range(SINGLE_ROW_CALLS):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        times[i] = time.perf_counter() - start
+    return float(np.median(times) * 1000)
+
+
+def bench_engine(name, train_df, test_df, n_healthy):
+    engine = get_engine(name)
+    train_df = balance_dataset(train_df, None if engine.full_data else n_healthy)
+    X_train, y_train, encoders, lab_medians = prepare_features(train_df)
+    feature_names = list(X_train.columns)
+
+    start = time.perf_counter()
+    model = train_model(X_train, y_train, name)
+    train_seconds = time.perf_counter() - start
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+    if hasattr(model, 'verbose'):
+        model.verbose = 0
+
+    X_test, _ = encode_features(test_df, encoders, feature_names, lab_medians)
+    start = time.perf_counter()
+    model.predict_proba(X_test)
+    batch_seconds = time.perf_counter() - start
+    return {
+        'engine': name,
+        'train_rows': len(X_train),
+        'train_seconds': train_seconds,
+        'single_row_ms': single_row_p50_ms(model, X_test.iloc[:1]),
+        'batch_rows_per_second': len(X_test) / batch_seconds,
+        'model_kb': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024,
+        'iterations': getattr(model, 'n_iter_', None),
+        **evaluate_model(model, X_test, test_df[TARGET_COLUMN]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=20_000, help='synthetic patients when --dataset is not given')
+    parser.add_argument('--dataset', default=None, help='directory with the raw *CorePopulatedTable.txt files')
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--n-healthy', type=int, default=200, help='healthy rows for subsampling engines')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dataset is None:
+            generate_emr(tmp, args.patients)
+        model_df = load_model_df(args.dataset or tmp)
+    train_df, test_df = train_test_split(model_df, test_size=0.2, random_state=42, stratify=model_df[TARGET_COLUMN])
+    print(f"model_df: {len(model_df):,} admissions ({model_df[TARGET_COLUMN].mean():.1%} readmitted), "
+          f"test set: {len(test_df):,}\n")
+
+    results = [bench_engine(name, train_df, test_df, args.n_healthy) for name in args.engines]
+    print(f"{'Engine':<14} {'train rows':>10} {'train s':>8} {'1-row ms':>9} {'batch rows/s':>13} "
+          f"{'size KB':>8} {'ROC-AUC':>8} {'recall':>7} {'precision':>9}")
+    for r in results:
+        print(f"{r['engine']:<14} {r['train_rows']:>10,} {r['train_seconds']:>8.2f} {r['single_row_ms']:>9.3f} "
+              f"{r['batch_rows_per_second']:>13,.0f} {r['model_kb']:>8,.0f} {r['roc_auc']:>8.4f} "
+              f"{r['recall']:>7.3f} {r['precision']:>9.3f}"
+              + (f"  ({r['iterations']} boosting iterations)" if r['iterations'] else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Parity and speed: vectorized bootstrap metrics and parallel k-fold CV vs. per-resample sklearn calls.
+
+Usage:
+    python benchmarks/bench_evaluation.py [--patients 20000] [--resamples 2000] [--workers 1 4]
+    python benchmarks/bench_evaluation.py --dataset dataset/
+
+A random forest is trained on a stratified 80/20 split of every
+admission, so the test set is large. Checks:
+
+- ``binary_metrics`` equals ``evaluate_model`` on the test set
+- ``resample_metrics`` equals sklearn's accuracy/precision/recall/F1/
+  ROC-AUC on the same resampled rows, for ``--parity-resamples`` resamples
+- ``bootstrap_samples`` gives the same resamples for every worker count
+- ``cross_validate`` gives the same fold metrics serially and in parallel
+
+Timings: the per-resample sklearn loop (measured on ``--parity-resamples``
+resamples and scaled to ``--resamples``) against the vectorized
+bootstrap, and k-fold CV per worker count.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.engines import RF_PARAMS  # noqa: E402
+from readmission.evaluation import (  # noqa: E402
+    METRIC_NAMES, binary_metrics, bootstrap_samples, cross_validate, resample_metrics, score_groups
+)
+from readmission.training import (  # noqa: E402
+    balance_dataset, evaluate_model, prepare_features, split_features, train_model
+)
+from bench_engines import load_model_df  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+
+def seconds(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def sklearn_resample_metrics(y_test, proba, rows):
+    """The per-resample loop: five sklearn metric calls on each resampled test set."""
+    predicted = (proba > 0.5).astype(int)
+    results = {name: np.empty(len(rows)) for name in METRIC_NAMES}
+    for i, sample in enumerate(rows):
+        y, pred, score = y_test[sample], predicted[sample], proba[sample]
+        results['accuracy'][i] = accuracy_score(y, pred)
+        results['precision'][i] = precision_score(y, pred, zero_division=0)
+        results['recall'][i] = recall_score(y, pred, zero_division=0)
+        results['f1'][i] = f1_score(y, pred, zero_division=0)
+        results['roc_auc'][i] = roc_auc_score(y, score) if len(np.unique(y)) > 1 else np.nan
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=20_000, help='synthetic patients when --dataset is not given')
+    parser.add_argument('--dataset', default=None, help='directory with the raw *CorePopulatedTable.txt files')
+    parser.add_argument('--resamples', type=int, default=2000)
+    parser.add_argument('--parity-resamples', type=int, default=200)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or str(Path(tmp) / 'dataset')
+        if args.dataset is None:
+            generate_emr(dataset, args.patients, labs_per_admission=10)
+        model_df = balance_dataset(load_model_df(dataset), n_healthy=None)
+
+    X, y, _, _ = prepare_features(model_df)
+    X_train, X_test, y_train, y_test = split_features(X, y)
+    model = train_model(X_train, y_train)
+    proba = model.predict_proba(X_test)[:, 1]
+    labels = y_test.to_numpy()
+    print(f"Test set: {len(y_test):,} rows ({labels.mean():.1%} readmitted), "
+          f"{len(np.unique(proba)):,} distinct probabilities")
+
+    expected = evaluate_model(model, X_test, y_test)
+    actual = binary_metrics(y_test, proba)
+    for name in METRIC_NAMES:
+        np.testing.assert_allclose(actual[name], expected[name], rtol=1e-12, err_msg=name)
+    print("✓ binary_metrics matches evaluate_model on the test set")
+
+    rows = np.random.default_rng(0).integers(0, len(labels), size=(args.parity_resamples, len(labels)))
+    legacy, legacy_s = seconds(lambda: sklearn_resample_metrics(labels, proba, rows))
+    groups, predicted = score_groups(proba)
+    vectorized = resample_metrics(labels.astype(bool), groups, predicted, rows)
+    for name in METRIC_NAMES:
+        np.testing.assert_allclose(vectorized[name], legacy[name], rtol=1e-9, equal_nan=True, err_msg=name)
+    print(f"✓ {args.parity_resamples} resamples match sklearn's metric calls on the same rows")
+
+    legacy_estimate = legacy_s / args.parity_resamples * args.resamples
+    print(f"\n{'Bootstrap':<28} {'resamples':>9} {'seconds':>9} {'speedup':>8}")
+    print(f"{'sklearn per resample (est.)':<28} {args.resamples:>9,} {legacy_estimate:>9.2f} {1:>7.1f}x")
+    reference = None
+    for workers in args.workers:
+        samples, elapsed = seconds(lambda: bootstrap_samples(y_test, proba, args.resamples, 42, workers))
+        if reference is None:
+            reference = samples
+        for name in METRIC_NAMES:
+            np.testing.assert_array_equal(samples[name], reference[name])
+        print(f"{f'vectorized, {workers} workers':<28} {args.resamples:>9,} {elapsed:>9.2f} "
+              f"{legacy_estimate / elapsed:>7.1f}x")
+    print(f"✓ Same resamples for every worker count (95% ROC-AUC interval "
+          f"{np.nanpercentile(reference['roc_auc'], 2.5):.4f}–{np.nanpercentile(reference['roc_auc'], 97.5):.4f})")
+
+    print(f"\n{f'{args.folds}-fold CV':<28} {'seconds':>9}")
+    folds_reference = None
+    for workers in args.workers:
+        cv, elapsed = seconds(lambda: cross_validate(X, y, 'random_forest', dict(RF_PARAMS), args.folds, 42, workers))
+        if folds_reference is None:
+            folds_reference = cv
+        for fold, expected_fold in zip(cv['per_fold'], folds_reference['per_fold']):
+            for name in METRIC_NAMES:
+                np.testing.assert_allclose(fold[name], expected_fold[name], rtol=1e-12, err_msg=name)
+        print(f"{f'{workers} workers':<28} {elapsed:>9.2f}")
+    print(f"✓ Fold metrics are the same for every worker count (ROC-AUC "
+          f"{folds_reference['mean']['roc_auc']:.4f} ± {folds_reference['std']['roc_auc']:.4f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Latency: FlatForest vs. sklearn RandomForestClassifier.predict_proba.
+
+Usage:
+    python benchmarks/bench_forest.py [--rows 10000] [--repeat 200]
+
+The saved model's probabilities are checked for exact equality on the
+benchmark rows first. The parity cases (single row, batch, split
+thresholds, extreme and missing values, contributions) are pytest tests
+in ``tests/test_forest.py``.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_model_artifacts  # noqa: E402
+from readmission.forest import FlatForest  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+
+
+def check(name, model, flat, X):
+    expected = model.predict_proba(X)
+    actual = flat.predict_proba(X)
+    assert np.array_equal(actual, expected), f"{name}: max diff {np.abs(actual - expected).max()}"
+    print(f"✓ {name:<40} {len(X):>7,} rows identical")
+
+
+def latency(func, X, repeat):
+    func(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(X)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    model.n_jobs = 1  # sequential accumulation, so equality is exact
+    X, _ = encode_features(synthetic_features(args.rows, encoders), encoders, feature_names)
+
+    start = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    print(f"Exported {flat.n_trees} trees, {flat.n_nodes:,} nodes, depth {flat.max_depth} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    check('saved model, random rows', model, flat, X)
+
+    print(f"\n{'Batch size':>10} {'sklearn':>12} {'FlatForest':>12} {'Speedup':>8}")
+    for size in [1, 10, 100, 1000, args.rows]:
+        batch = X.iloc[:size]
+        repeat = max(1, args.repeat * 10 // max(size, 10))
+        sk = latency(model.predict_proba, batch, repeat)
+        ff = latency(flat.predict_proba, batch, repeat)
+        print(f"{size:>10,} {sk * 1000:>10.3f}ms {ff * 1000:>10.3f}ms {sk / ff:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
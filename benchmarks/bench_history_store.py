@@ -0,0 +1,175 @@
+"""Lookup latency, parity and incremental updates of the patient-history store.
+
+Usage:
+    python benchmarks/bench_history_store.py [--patients 1000000] [--labs-per-admission 2] [--lookups 100000]
+
+A synthetic EMR is generated and the store is built from the raw files
+(labs streamed). Checks that ``lookup`` returns the training features
+(``create_readmission_labels`` + ``build_model_df``) of sampled
+admissions, then times single lookups on the memory-mapped store
+(latest admission, a given admission, unknown patients) against a
+boolean-mask lookup in a precomputed feature frame.
+
+Incremental path: the last admission of ``--holdout`` of the patients is
+held out with its labs and diagnoses, the store is built from the rest
+and the held-out rows are applied as ``--updates`` deltas (enough to
+trigger a compaction). Every admission of the touched patients must then
+look up the same as in the full build.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.cleaning import clean_tables, load_raw_tables  # noqa: E402
+from readmission.features import FEATURE_COLUMNS, build_model_df, create_readmission_labels, patient_ages  # noqa: E402
+from readmission.history_store import PatientHistoryStore, build_from_dataset  # noqa: E402
+from readmission.lab_features import KEY_COLUMNS, aggregate_lab_features, aggregate_lab_sums  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+REFERENCE_DATE = '2025-01-01'
+
+
+def seconds(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def percentiles(latencies_ns):
+    p50, p99 = np.percentile(latencies_ns, [50, 99]) / 1000
+    return f"p50 {p50:7.1f} µs  p99 {p99:7.1f} µs"
+
+
+def timed_lookups(lookup, keys):
+    latencies = np.empty(len(keys), dtype=np.int64)
+    for i, key in enumerate(keys):
+        start = time.perf_counter_ns()
+        lookup(*key)
+        latencies[i] = time.perf_counter_ns() - start
+    return latencies
+
+
+def reference_features(tables, patient_ids):
+    """Training features of every admission of ``patient_ids`` (age fill from all patients)."""
+    subset = {name: df[df['PatientID'].isin(patient_ids)] for name, df in tables.items()}
+    age_fill = float(patient_ages(tables['patients'], REFERENCE_DATE).median())
+    features = build_model_df(create_readmission_labels(subset['admissions']), subset['patients'],
+                              subset['diagnoses'], aggregate_lab_features(subset['labs']), REFERENCE_DATE, age_fill)
+    features['PatientID'] = features['PatientID'].astype(str)
+    features['NumLabs'] = features['NumLabs'].fillna(0)
+    return features
+
+
+def assert_same_record(actual, expected, key):
+    assert actual is not None, key
+    for col in FEATURE_COLUMNS:
+        a, e = actual[col], expected[col]
+        if isinstance(e, str) or e is None:
+            assert a == e, (key, col, a, e)
+        else:
+            np.testing.assert_allclose(a, e, rtol=1e-6, equal_nan=True, err_msg=f"{key} {col}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=1_000_000)
+    parser.add_argument('--labs-per-admission', type=int, default=2)
+    parser.add_argument('--lookups', type=int, default=100_000, help='timed lookups per kind')
+    parser.add_argument('--parity-patients', type=int, default=2_000)
+    parser.add_argument('--holdout', type=float, default=0.01, help='share of patients whose last admission '
+                                                                   'arrives as an update')
+    parser.add_argument('--updates', type=int, default=10, help='number of deltas the held-out rows are split into')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        dataset = tmp / 'dataset'
+        generate_emr(dataset, args.patients, labs_per_admission=args.labs_per_admission)
+
+        store, build_s = seconds(lambda: build_from_dataset(dataset, tmp / 'store'))
+        size = sum(path.stat().st_size for path in (tmp / 'store').rglob('*') if path.is_file())
+        print(f"✓ Built from the raw files: {len(store.segments[0]):,} admissions in {build_s:.1f}s "
+              f"({size / 2**20:,.0f} MiB on disk)")
+
+        tables = clean_tables(load_raw_tables(dataset))
+        tables['admissions'] = tables['admissions'].astype({'PatientID': str})
+        patients = tables['admissions']['PatientID'].unique()
+
+        # Parity with the training features
+        sample = rng.choice(patients, min(args.parity_patients, len(patients)), replace=False)
+        features = reference_features(tables, sample)
+        for row in features.to_dict('records'):
+            key = (row['PatientID'], row['AdmissionID'])
+            assert_same_record(store.lookup(*key, reference_date=REFERENCE_DATE), row, key)
+        latest = features.sort_values('PreviousAdmissions').groupby('PatientID').tail(1)
+        for row in latest.to_dict('records'):
+            assert store.lookup(row['PatientID'], reference_date=REFERENCE_DATE)['AdmissionID'] == row['AdmissionID']
+        print(f"✓ {len(features):,} admissions of {len(sample):,} patients match their build_model_df features "
+              f"(latest admission included)")
+
+        # Lookup latency
+        reopened, open_s = seconds(lambda: PatientHistoryStore(tmp / 'store'))
+        keys = tables['admissions'][KEY_COLUMNS].sample(args.lookups, replace=True, random_state=0)
+        keys = list(keys.itertuples(index=False, name=None))
+        print(f"\nLookup latency over {args.patients:,} patients (store opened in {open_s * 1000:.1f} ms):")
+        by_patient = [(patient_id, None, REFERENCE_DATE) for patient_id, _ in keys]
+        by_admission = [(patient_id, admission_id, REFERENCE_DATE) for patient_id, admission_id in keys]
+        unknown = [(f'NOT-A-PATIENT-{i}', None, REFERENCE_DATE) for i in range(args.lookups)]
+        for label, batch in (('latest admission', by_patient), ('given admission', by_admission),
+                             ('unknown patient', unknown)):
+            print(f"  {label:<17} {percentiles(timed_lookups(reopened.lookup, batch))}")
+
+        model_df = build_model_df(create_readmission_labels(tables['admissions']), tables['patients'],
+                                  tables['diagnoses'], aggregate_lab_features(tables['labs']), REFERENCE_DATE)
+        model_df['PatientID'] = model_df['PatientID'].astype(str)
+
+        def mask_lookup(patient_id, admission_id, _):
+            return model_df[(model_df['PatientID'] == patient_id) & (model_df['AdmissionID'] == admission_id)]
+
+        mask_latencies = timed_lookups(mask_lookup, by_admission[:200])
+        print(f"  {'boolean mask':<17} {percentiles(mask_latencies)}  (precomputed {len(model_df):,}-row frame, "
+              f"200 lookups)")
+
+        # Incremental updates vs. the full build
+        admissions = tables['admissions']
+        last = admissions.sort_values('AdmissionStartDate').groupby('PatientID').tail(1)
+        held = last.sample(frac=args.holdout, random_state=0)[KEY_COLUMNS]
+        is_held = {name: pd.MultiIndex.from_frame(df[KEY_COLUMNS].astype({'PatientID': str}))
+                   .isin(pd.MultiIndex.from_frame(held))
+                   for name, df in tables.items() if name != 'patients'}
+        base = {name: df[~is_held[name]] for name, df in tables.items() if name != 'patients'}
+        partial = PatientHistoryStore.build(tmp / 'incremental', base['admissions'], tables['patients'],
+                                            base['diagnoses'], aggregate_lab_sums(base['labs']))
+        update_s = []
+        for chunk in np.array_split(held['PatientID'].unique(), args.updates):
+            delta = {name: df[is_held[name] & df['PatientID'].astype(str).isin(chunk)]
+                     for name, df in tables.items() if name != 'patients'}
+            _, elapsed = seconds(lambda: partial.update(delta['admissions'], delta['labs'], delta['diagnoses']))
+            update_s.append(elapsed)
+        touched = held['PatientID'].unique()
+        checked = 0
+        for patient_id in touched:
+            for admission_id in store.admissions_of(patient_id):
+                key = (patient_id, admission_id)
+                expected = store.lookup(*key, reference_date=REFERENCE_DATE)
+                assert_same_record(partial.lookup(*key, reference_date=REFERENCE_DATE), expected, key)
+                checked += 1
+        assert partial.admissions_of(touched[0]) == store.admissions_of(touched[0])
+        print(f"\n✓ {len(held):,} new discharges applied as {args.updates} updates ({len(partial.segments)} segments "
+              f"after compaction): {checked:,} admissions of the touched patients match the full build")
+        print(f"  update {np.mean(update_s) * 1000:,.0f} ms mean per delta of ~{len(held) // args.updates:,} "
+              f"patients vs. {build_s:.1f}s full build")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Parity and timing: incremental snapshot update vs. full label/lab recompute.
+
+Usage:
+    python benchmarks/bench_incremental.py [--patients 20000] [--delta-days 1]
+
+Synthetic admissions and labs are split at a cutoff date. The snapshot is
+built from everything before the cutoff and then updated with the last
+``--delta-days`` days of admissions (and their labs). The result must equal a
+full recompute over all rows.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_lab_features import LAB_NAMES  # noqa: E402
+from readmission.features import create_readmission_labels  # noqa: E402
+from readmission.incremental import FeatureSnapshot, close_labels  # noqa: E402
+from readmission.lab_features import aggregate_lab_features, aggregate_lab_sums  # noqa: E402
+
+
+def synthetic_admissions(n_patients, seed=42):
+    """Admissions with 1-6 stays per patient and 2-400 day gaps (some < 30)."""
+    rng = np.random.default_rng(seed)
+    per_patient = rng.integers(1, 7, n_patients)
+    patient = np.repeat(np.arange(n_patients), per_patient)
+    admission_id = np.concatenate([np.arange(1, n + 1) for n in per_patient])
+    stay = rng.integers(1, 15, len(patient))
+    gap = rng.integers(2, 400, len(patient))
+    first = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365, n_patients), unit='D')
+    offset = pd.Series(stay + gap).groupby(patient).cumsum().to_numpy() - (stay + gap)
+    start = first.to_numpy()[patient] + pd.to_timedelta(offset, unit='D').to_numpy()
+    return pd.DataFrame({
+        'PatientID': np.char.add('P', patient.astype(str)).astype(object),
+        'AdmissionID': admission_id,
+        'AdmissionStartDate': start,
+        'AdmissionEndDate': start + pd.to_timedelta(stay, unit='D').to_numpy()
+    })
+
+
+def synthetic_labs_for(admissions_df, labs_per_admission=20, seed=42):
+    rng = np.random.default_rng(seed)
+    idx = np.repeat(np.arange(len(admissions_df)), labs_per_admission)
+    return pd.DataFrame({
+        'PatientID': admissions_df['PatientID'].to_numpy()[idx],
+        'AdmissionID': admissions_df['AdmissionID'].to_numpy()[idx],
+        'LabName': np.array(LAB_NAMES, dtype=object)[rng.integers(0, len(LAB_NAMES), len(idx))],
+        'LabValue': rng.normal(50, 20, len(idx)).round(1)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--delta-days', type=int, default=3)
+    args = parser.parse_args()
+
+    # Everything admitted up to a mid-range date is "known"; the delta is its last days
+    admissions_df = synthetic_admissions(args.patients)
+    as_of = admissions_df['AdmissionStartDate'].quantile(0.5).normalize()
+    admissions_df = admissions_df[admissions_df['AdmissionStartDate'] <= as_of].reset_index(drop=True)
+    labs_df = synthetic_labs_for(admissions_df)
+    cutoff = as_of - pd.Timedelta(days=args.delta_days)
+
+    is_new = admissions_df['AdmissionStartDate'] > cutoff
+    new_keys = admissions_df.loc[is_new, ['PatientID', 'AdmissionID']]
+    labs_new = labs_df.merge(new_keys, on=['PatientID', 'AdmissionID'], how='inner')
+    labs_old = labs_df.merge(new_keys, on=['PatientID', 'AdmissionID'], how='left', indicator=True)
+    labs_old = labs_old[labs_old['_merge'] == 'left_only'].drop(columns='_merge')
+
+    base = FeatureSnapshot.build(admissions_df[~is_new], aggregate_lab_sums(labs_old), cutoff)
+
+    start = time.perf_counter()
+    updated = base.update(admissions_df[is_new], labs_new, as_of)
+    incremental_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full = create_readmission_labels(admissions_df)
+    full['LabelClosed'] = close_labels(full, as_of)
+    full_labs = aggregate_lab_features(labs_df)
+    full_s = time.perf_counter() - start
+
+    keys = ['PatientID', 'AdmissionID']
+    pd.testing.assert_frame_equal(
+        updated.admissions.sort_values(keys).reset_index(drop=True)[full.columns],
+        full.sort_values(keys).reset_index(drop=True))
+    pd.testing.assert_frame_equal(updated.lab_features(), full_labs)
+
+    print(f"Admissions: {len(admissions_df):,} total, {int(is_new.sum()):,} in delta")
+    print("✓ Parity: incremental snapshot identical to full recompute")
+    print(f"Full recompute: {full_s:7.3f} s")
+    print(f"Incremental:    {incremental_s:7.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Peak memory of streaming lab ingestion vs. a full read, at growing sizes.
+
+Usage:
+    python benchmarks/bench_ingest.py [--sizes 2000 8000 32000] [--chunksize 100000]
+
+For each size a synthetic LabsCorePopulatedTable.txt is written to a temp
+directory, then lab features are built (a) by reading the whole file and
+aggregating, and (b) with ``stream_lab_features``. Results must match and
+the streaming peak should stay roughly flat as the file grows.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_lab_features import synthetic_labs  # noqa: E402
+from readmission.ingest import stream_lab_features  # noqa: E402
+from readmission.lab_features import aggregate_lab_features  # noqa: E402
+
+
+def measure(func, *args, **kwargs):
+    """Run func and return (result, seconds, peak traced MiB)"""
+    # Timed and traced separately: tracemalloc slows allocation-heavy code a lot
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def full_read(path):
+    labs_df = pd.read_csv(path, sep='\t')
+    labs_df = labs_df.dropna(subset=['LabName', 'LabValue'])
+    return aggregate_lab_features(labs_df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 8000, 32000],
+                        help='synthetic admissions per run (30 labs each)')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'Lab rows':>12} {'Full read MiB':>14} {'Stream MiB':>11} {'Full s':>8} {'Stream s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_admissions in args.sizes:
+            # Admission count is held fixed so only the number of lab rows grows
+            path = Path(tmp) / 'LabsCorePopulatedTable.txt'
+            synthetic_labs(args.sizes[0], labs_per_admission=30 * n_admissions // args.sizes[0]).to_csv(
+                path, sep='\t', index=False)
+            n_rows = sum(1 for _ in open(path)) - 1
+
+            expected, full_s, full_mib = measure(full_read, path)
+            actual, stream_s, stream_mib = measure(stream_lab_features, path, chunksize=args.chunksize)
+            pd.testing.assert_frame_equal(actual, expected)
+
+            print(f"{n_rows:>12,} {full_mib:>14.1f} {stream_mib:>11.1f} {full_s:>8.2f} {stream_s:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
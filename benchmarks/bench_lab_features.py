@@ -0,0 +1,92 @@
+"""Parity check and timing: vectorized lab aggregation vs. the notebook loop.
+
+Usage:
+    python benchmarks/bench_lab_features.py [--labs PATH] [--admissions N]
+
+With ``--labs`` the cleaned labs CSV is used, otherwise a synthetic labs
+table is generated.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from readmission.lab_features import CRITICAL_LABS, aggregate_lab_features  # noqa: E402
+
+LAB_NAMES = [
+    'CBC: HEMOGLOBIN', 'CBC: MEAN CORPUSCULAR HEMOGLOBIN', 'CBC: WHITE BLOOD CELL COUNT',
+    'CBC: PLATELET COUNT', 'METABOLIC: GLUCOSE', 'METABOLIC: CREATININE',
+    'METABOLIC: SODIUM', 'METABOLIC: POTASSIUM', 'METABOLIC: ALBUMIN',
+    'URINALYSIS: WHITE BLOOD CELLS', 'URINALYSIS: PH', 'URINALYSIS: SPECIFIC GRAVITY'
+]
+
+
+def synthetic_labs(n_admissions, labs_per_admission=30, seed=42):
+    """Generate a labs table shaped like labs_cleaned.csv"""
+    rng = np.random.default_rng(seed)
+    n_rows = n_admissions * labs_per_admission
+    admission = rng.integers(0, n_admissions, n_rows)
+    return pd.DataFrame({
+        'PatientID': np.char.add('P', (admission // 4).astype(str)).astype(object),
+        'AdmissionID': admission % 4 + 1,
+        'LabName': np.array(LAB_NAMES, dtype=object)[rng.integers(0, len(LAB_NAMES), n_rows)],
+        'LabValue': rng.normal(50, 20, n_rows).round(1),
+        'LabUnits': 'mg/dL',
+        'LabDateTime': (pd.Timestamp('2010-01-01') + pd.to_timedelta(rng.integers(0, 3650 * 24, n_rows), unit='h'))
+        .strftime('%Y-%m-%d %H:%M:%S.000')
+    })
+
+
+def notebook_loop(labs_df):
+    """The original per-admission loop from model-training.ipynb"""
+    def extract_lab_value(group, lab_keywords):
+        mask = group['LabName'].str.upper().str.contains('|'.join(lab_keywords), na=False)
+        if mask.any():
+            return group[mask]['LabValue'].mean()
+        return np.nan
+
+    lab_features_list = []
+    for (patient_id, admission_id), group in labs_df.groupby(['PatientID', 'AdmissionID']):
+        features = {
+            'PatientID': patient_id,
+            'AdmissionID': admission_id,
+            'NumLabs': len(group),
+        }
+        for lab_name, keywords in CRITICAL_LABS.items():
+            features[f'{lab_name}_avg'] = extract_lab_value(group, keywords)
+        lab_features_list.append(features)
+    return pd.DataFrame(lab_features_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--labs', help='path to labs_cleaned.csv')
+    parser.add_argument('--admissions', type=int, default=5000,
+                        help='synthetic admissions when --labs is not given')
+    args = parser.parse_args()
+
+    labs_df = pd.read_csv(args.labs) if args.labs else synthetic_labs(args.admissions)
+    print(f"Labs rows: {len(labs_df):,}")
+
+    start = time.perf_counter()
+    expected = notebook_loop(labs_df)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = aggregate_lab_features(labs_df)
+    vectorized_seconds = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(actual, expected)
+    print(f"✓ Parity: {len(actual):,} admissions identical")
+    print(f"Notebook loop: {loop_seconds:8.3f} s")
+    print(f"Vectorized:    {vectorized_seconds:8.3f} s  ({loop_seconds / vectorized_seconds:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Overhead of the metrics layer on the single-row prediction hot path.
+
+Usage:
+    python benchmarks/bench_metrics.py [--calls 2000]
+
+Times single-row ``predict_proba`` with and without a ``metrics.timer``
+around it, the bare cost of an enabled and a disabled timer, and checks
+that the Prometheus export is consistent (cumulative buckets, ``+Inf``
+bucket equal to ``_count``) and that the trace holds one event per call.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_model_artifacts  # noqa: E402
+from readmission.metrics import MetricsRegistry  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+
+
+def per_call_us(func, calls):
+    func()
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def check_prometheus(text, name, calls):
+    buckets = [float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(f'{name}_bucket')]
+    count = float(next(line for line in text.splitlines() if line.startswith(f'{name}_count')).rsplit(' ', 1)[1])
+    assert buckets == sorted(buckets), "buckets are not cumulative"
+    assert buckets[-1] == count == calls, (buckets[-1], count, calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2_000)
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    model.n_jobs = 1
+    X, _ = encode_features(synthetic_features(1, encoders), encoders, feature_names)
+    registry = MetricsRegistry(trace_capacity=args.calls)
+    disabled = MetricsRegistry(enabled=False)
+
+    def predict():
+        model.predict_proba(X)
+
+    def predict_timed():
+        with registry.timer('predict_seconds', caller='bench'):
+            model.predict_proba(X)
+
+    def empty_timer(r):
+        def run():
+            with r.timer('noop_seconds'):
+                pass
+        return run
+
+    bare = per_call_us(predict, args.calls)
+    registry.reset()
+    timed = per_call_us(predict_timed, args.calls)
+    timer_on = per_call_us(empty_timer(registry), 100_000)
+    timer_off = per_call_us(empty_timer(disabled), 100_000)
+
+    print(f"predict_proba (1 row):          {bare:10.1f} µs")
+    print(f"predict_proba inside a timer:   {timed:10.1f} µs")
+    print(f"empty timer, enabled:           {timer_on:10.2f} µs  ({timer_on / bare:.2%} of a prediction)")
+    print(f"empty timer, disabled:          {timer_off:10.2f} µs")
+
+    registry.reset()
+    for _ in range(args.calls):
+        predict_timed()
+    check_prometheus(registry.to_prometheus(), 'readmission_predict_seconds', args.calls)
+    print(f"\n✓ Prometheus histogram is cumulative and counts {args.calls:,} calls")
+    trace = json.loads(json.dumps(registry.trace()))
+    assert len(trace['traceEvents']) == args.calls
+    durations = np.array([event['dur'] for event in trace['traceEvents']])
+    print(f"✓ Trace has {len(durations):,} events, median {np.median(durations):.1f} µs")
+    summary = registry.snapshot()['histograms']['predict_seconds{caller="bench"}']
+    print(f"  snapshot: mean {summary['mean'] * 1e6:.1f} µs, p50 ≤ {summary['p50'] * 1e3:g} ms, "
+          f"p99 ≤ {summary['p99'] * 1e3:g} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Hot swap and shadow scoring with ModelRegistry under concurrent load.
+
+Usage:
+    python benchmarks/bench_registry.py [--clients 8] [--seconds 6] [--poll 0.2]
+
+The shipped models are copied to a temporary directory. Client threads
+score single rows continuously through ``registry.current()`` while a
+"retrained" model (the first half of the forest's trees) is exported over
+the directory with ``save_artifacts``. Checks that no request fails, that
+the registry switches to the new version and that every response came
+from a complete version. Reports the time from export to swap and
+request latency before and after. A second run scores the same traffic
+with the half-forest as a shadow and reports the score differences and
+per-version latency.
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission import metrics  # noqa: E402
+from readmission.artifacts import DEFAULT_MODELS, load_model_artifacts  # noqa: E402
+from readmission.registry import ModelRegistry  # noqa: E402
+from readmission.training import save_artifacts  # noqa: E402
+
+
+def half_forest(models_path):
+    """The shipped forest truncated to its first half of trees (a different model version)."""
+    model, encoders, feature_names = load_model_artifacts(models_path)
+    model.estimators_ = model.estimators_[:len(model.estimators_) // 2]
+    model.n_estimators = len(model.estimators_)
+    return model, encoders, feature_names
+
+
+def n_trees(model):
+    """Trees in a served model: a bundle's ``FlatForest`` or a pickled sklearn forest."""
+    return model.n_trees if hasattr(model, 'n_trees') else len(model.estimators_)
+
+
+def run_clients(registry, rows, clients, seconds, shadow=False):
+    """Score rows from ``clients`` threads; returns [(finish time, version, latency)] and errors."""
+    results, errors = [], []
+    stop = time.perf_counter() + seconds
+
+    def client(offset):
+        i = offset
+        while time.perf_counter() < stop:
+            row = rows.iloc[[i % len(rows)]]
+            start = time.perf_counter()
+            try:
+                current = registry.current()
+                X, _ = current.encoder.transform(row)
+                proba = current.predict_proba(X)
+                if shadow:
+                    registry.submit_shadow(row, proba)
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            end = time.perf_counter()
+            results.append((end, current.version, end - start))
+            i += clients
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=6.0)
+    parser.add_argument('--poll', type=float, default=0.2, help='registry poll interval in seconds')
+    args = parser.parse_args()
+
+    _, encoders, _ = load_model_artifacts()
+    rows = synthetic_features(1_000, encoders)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        live, candidate = Path(tmp) / 'models', Path(tmp) / 'candidate'
+        shutil.copytree(DEFAULT_MODELS, live)
+        model, encoders, feature_names = half_forest(live)
+        model.n_jobs = 1
+        save_artifacts(candidate, model, encoders, feature_names)
+
+        # Hot swap under load
+        registry = ModelRegistry(live, poll_seconds=args.poll).start()
+        registry.current().model.n_jobs = 1
+        old_version = registry.current().version
+        old_trees = n_trees(registry.current().model)
+        threads, results, errors = run_clients(registry, rows, args.clients, args.seconds)
+        time.sleep(args.seconds / 3)
+        exported = time.perf_counter()
+        save_artifacts(live, model, encoders, feature_names)
+        for thread in threads:
+            thread.join()
+        registry.close()
+
+        new_version = registry.current().version
+        assert not errors, f"{len(errors)} requests failed: {errors[0]!r}"
+        assert new_version != old_version, "the registry did not pick up the new model"
+        versions = {version for _, version, _ in results}
+        assert versions == {old_version, new_version}, versions
+        swapped = min(end for end, version, _ in results if version == new_version)
+        before = np.array([lat for end, version, lat in results if end < exported]) * 1000
+        after = np.array([lat for end, version, lat in results if version == new_version]) * 1000
+        print(f"✓ {len(results):,} requests, 0 failed; {old_version} -> {new_version} "
+              f"{swapped - exported:.2f} s after export (poll {args.poll:g} s, one stable poll required)")
+        print(f"  before swap: p50 {np.percentile(before, 50):.2f} ms  p99 {np.percentile(before, 99):.2f} ms "
+              f"({old_version}, {old_trees} trees)")
+        print(f"  after swap:  p50 {np.percentile(after, 50):.2f} ms  p99 {np.percentile(after, 99):.2f} ms "
+              f"({new_version}, {n_trees(registry.current().model)} trees)")
+
+        # Shadow scoring of the same traffic
+        shutil.rmtree(live)
+        shutil.copytree(DEFAULT_MODELS, live)
+        metrics.REGISTRY.reset()
+        registry = ModelRegistry(live, shadow_path=candidate, poll_seconds=args.poll).start()
+        registry.current().model.n_jobs = 1
+        threads, results, errors = run_clients(registry, rows, args.clients, args.seconds, shadow=True)
+        for thread in threads:
+            thread.join()
+        time.sleep(0.5)
+        registry.close()
+        assert not errors
+        stats = registry.shadow_stats.as_dict()
+        print(f"\n✓ Shadow {registry.shadow.version} compared on {stats['rows']:,} of {len(results):,} requests "
+              f"({stats['dropped']:,} dropped while the shadow queue was full, {stats['errors']} errors)")
+        print(f"  mean |Δp| {stats['mean_abs_diff']:.4f}  max |Δp| {stats['max_abs_diff']:.4f}  "
+              f"prediction flips {stats['prediction_flips']}  tier changes {stats['tier_disagreements']}")
+        for name, summary in sorted(metrics.REGISTRY.snapshot()['histograms'].items()):
+            if name.startswith('predict_seconds{caller="registry"'):
+                print(f"  {name}: n={summary['count']:,} mean {summary['mean'] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Per-table memory and load time: compact dtype schema vs. pandas' default inference.
+
+Usage:
+    python benchmarks/bench_schema.py [--patients 20000] [--labs-per-admission 30]
+    python benchmarks/bench_schema.py --dataset dataset/
+
+Reads each raw table the way the notebooks did (``pd.read_csv`` plus
+``pd.to_datetime`` on the date columns, which training parses anyway) and
+with ``readmission.schema.read_emr_table``. Reports load time, peak traced
+memory while loading and the in-memory size of the frame, then checks that
+lab features built from both loads agree (to float32 precision).
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.cleaning import RAW_FILES, clean_labs  # noqa: E402
+from readmission.lab_features import aggregate_lab_features  # noqa: E402
+from readmission.schema import read_emr_table  # noqa: E402
+from readmission.storage import DATE_COLUMNS  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+
+def read_default(path, table):
+    """Today's loading: default inference, dates parsed afterwards."""
+    df = pd.read_csv(path, sep='\t')
+    for col in DATE_COLUMNS[table]:
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def measure(func):
+    """Return (result, seconds, peak traced MiB, frame MiB)"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20, result.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=20_000, help='synthetic patients when --dataset is not given')
+    parser.add_argument('--labs-per-admission', type=int, default=30)
+    parser.add_argument('--dataset', default=None, help='directory with the raw *CorePopulatedTable.txt files')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or tmp
+        if args.dataset is None:
+            generate_emr(tmp, args.patients, labs_per_admission=args.labs_per_admission)
+
+        print(f"{'Table':<11} {'rows':>11} {'default s':>10} {'compact s':>10} {'default MiB':>12} "
+              f"{'compact MiB':>12} {'ratio':>6} {'peak default':>13} {'peak compact':>13}")
+        totals = np.zeros(2)
+        loaded = {}
+        for table, filename in RAW_FILES.items():
+            path = Path(dataset) / filename
+            default, default_s, default_peak, default_mib = measure(lambda: read_default(path, table))
+            compact, compact_s, compact_peak, compact_mib = measure(lambda: read_emr_table(path, table))
+            totals += [default_mib, compact_mib]
+            loaded[table] = (default, compact)
+            print(f"{table:<11} {len(default):>11,} {default_s:>10.3f} {compact_s:>10.3f} {default_mib:>12.1f} "
+                  f"{compact_mib:>12.1f} {default_mib / compact_mib:>5.1f}x {default_peak:>12.1f}M "
+                  f"{compact_peak:>12.1f}M")
+        print(f"{'total':<11} {'':>11} {'':>10} {'':>10} {totals[0]:>12.1f} {totals[1]:>12.1f} "
+              f"{totals[0] / totals[1]:>5.1f}x")
+
+    default_labs, compact_labs = loaded['labs']
+    expected = aggregate_lab_features(clean_labs(default_labs))
+    actual = aggregate_lab_features(clean_labs(compact_labs))
+    np.testing.assert_array_equal(actual['PatientID'].astype(str), expected['PatientID'].astype(str))
+    np.testing.assert_array_equal(actual['AdmissionID'], expected['AdmissionID'])
+    for col in expected.columns[2:]:
+        np.testing.assert_allclose(actual[col], expected[col], rtol=1e-6)
+    print(f"\n✓ Lab features for {len(expected):,} admissions agree to float32 precision")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Throughput: UI-style per-row scoring vs. the chunked, multi-process batch scorer.
+
+Usage:
+    python benchmarks/bench_scoring.py [--rows 50000] [--workers 4] [--chunksize 10000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from readmission.artifacts import load_model_artifacts  # noqa: E402
+from readmission.scoring import encode_features, score_file  # noqa: E402
+
+
+def synthetic_features(n_rows, encoders, seed=42):
+    """Discharge rows in the training feature schema"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'PatientID': np.char.add('P', np.arange(n_rows).astype(str)),
+        'AdmissionID': rng.integers(1, 6, n_rows),
+        'LengthOfStay': rng.integers(0, 30, n_rows),
+        'PreviousAdmissions': rng.integers(0, 8, n_rows),
+        'PatientAge': rng.uniform(18, 95, n_rows).round(1),
+        'PatientGender': rng.choice(encoders['PatientGender'].classes_, n_rows),
+        'DiagnosisChapter': rng.choice(encoders['DiagnosisChapter'].classes_, n_rows),
+        'NumLabs': rng.integers(5, 400, n_rows),
+        'hemoglobin_avg': rng.normal(13, 2, n_rows).round(1),
+        'glucose_avg': rng.normal(110, 30, n_rows).round(1),
+        'creatinine_avg': rng.normal(1.1, 0.4, n_rows).round(2),
+        'wbc_avg': rng.normal(8, 3, n_rows).round(1)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--per-row-sample', type=int, default=200, help='rows timed for the per-row baseline')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--chunksize', type=int, default=10000)
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    features_df = synthetic_features(args.rows, encoders)
+
+    # Baseline: what ui/app.py does per patient (one-row frame, predict + predict_proba)
+    X, _ = encode_features(features_df.head(args.per_row_sample), encoders, feature_names)
+    start = time.perf_counter()
+    for i in range(len(X)):
+        row = X.iloc[[i]]
+        model.predict(row)
+        model.predict_proba(row)
+    per_row_rate = len(X) / (time.perf_counter() - start)
+    print(f"{'Per-row predict + predict_proba':<36} {per_row_rate:>12,.0f} rows/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / 'discharges.csv'
+        output_path = Path(tmp) / 'scores.csv'
+        features_df.to_csv(input_path, index=False)
+        for workers in args.workers:
+            rows, seconds = score_file(input_path, output_path, chunksize=args.chunksize, workers=workers)
+            print(f"{f'Batch scorer, {workers} worker(s)':<36} {rows / seconds:>12,.0f} rows/s  ({rows:,} rows)")
+
+        scores = pd.read_csv(output_path)
+        X_all, _ = encode_features(features_df, encoders, feature_names)
+        assert np.allclose(scores['readmission_probability'], model.predict_proba(X_all)[:, 1])
+        assert (scores['prediction'] == model.predict(X_all)).all()
+        print("✓ Batch output matches model.predict / predict_proba")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Latency and parity: batched what-if sensitivity sweeps vs. one prediction.
+
+Usage:
+    python benchmarks/bench_sensitivity.py [--patients 50] [--repeats 20]
+
+For each feature in ``SENSITIVITY_GRIDS`` and a sample of synthetic
+patients, the batched sweep (one ``predict_proba`` call over the whole
+grid) must match scoring the grid one row at a time. Reports the median
+time of a single-row prediction, a batched sweep and a row-by-row sweep.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_model_artifacts  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+from readmission.sensitivity import SENSITIVITY_GRIDS, grid_values, sensitivity_curve, sensitivity_grid  # noqa: E402
+
+
+def median_ms(func, repeats):
+    func()
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        times[i] = time.perf_counter() - start
+    return float(np.median(times) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=50, help='synthetic patients swept for the parity check')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    model.n_jobs = 1
+    X, _ = encode_features(synthetic_features(args.patients, encoders), encoders, feature_names)
+
+    for feature in SENSITIVITY_GRIDS:
+        for i in range(len(X)):
+            row = X.iloc[[i]]
+            curve = sensitivity_curve(model.predict_proba, row, feature)
+            grid = sensitivity_grid(row, feature, curve[feature].to_numpy())
+            expected = [model.predict_proba(grid.iloc[[j]])[0, 1] for j in range(len(grid))]
+            np.testing.assert_allclose(curve['probability'], expected, atol=1e-12)
+    print(f"✓ Batched sweeps match row-by-row scoring for {len(X)} patients x {len(SENSITIVITY_GRIDS)} features")
+
+    row = X.iloc[[0]]
+    single = median_ms(lambda: model.predict_proba(row), args.repeats)
+    print(f"\nSingle prediction: {single:8.2f} ms\n")
+    print(f"{'Feature':<16} {'grid':>5} {'batched ms':>11} {'x single':>9} {'row-by-row ms':>14}")
+    for feature in SENSITIVITY_GRIDS:
+        values = grid_values(feature, float(row[feature].iloc[0]))
+        grid = sensitivity_grid(row, feature, values)
+        batched = median_ms(lambda: sensitivity_curve(model.predict_proba, row, feature, values), args.repeats)
+        row_by_row = median_ms(lambda: [model.predict_proba(grid.iloc[[j]]) for j in range(len(grid))], 1)
+        print(f"{feature:<16} {len(values):>5} {batched:>11.2f} {batched / single:>8.1f}x {row_by_row:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
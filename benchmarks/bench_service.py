@@ -0,0 +1,128 @@
+"""Load test of the HTTP scoring service with micro-batching on and off.
+
+Starts ``python -m readmission serve`` in a subprocess per configuration and
+drives it with concurrent keep-alive clients sending one admission per
+request. Reports p50/p99 latency and throughput, and checks the service's
+probabilities against ``model.predict_proba``.
+
+Usage:
+    python benchmarks/bench_service.py [--requests 2000] [--concurrency 32] [--engines sklearn flat]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import load_model_artifacts  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+
+
+def start_server(extra_args):
+    """Launch the service on a free port; returns (process, port)."""
+    process = subprocess.Popen([sys.executable, '-m', 'readmission', 'serve', '--port', '0', *extra_args],
+                               cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True,
+                               env={**os.environ, 'PYTHONWARNINGS': 'ignore'})
+    line = process.stdout.readline()
+    match = re.search(r':(\d+) ', line)
+    if not match:
+        process.kill()
+        raise RuntimeError(f"service did not start: {line!r}")
+    return process, int(match.group(1))
+
+
+def request(connection, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def load_test(port, instances, n_requests, concurrency):
+    """Send ``n_requests`` single-instance requests from ``concurrency`` threads."""
+    latencies = np.empty(n_requests)
+    probabilities = np.empty(n_requests)
+    next_index = iter(range(n_requests))
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        while True:
+            with lock:
+                i = next(next_index, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            status, result = request(connection, 'POST', '/predict', instances[i % len(instances)])
+            latencies[i] = time.perf_counter() - start
+            assert status == 200, result
+            probabilities[i] = result['predictions'][0]['probability']
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, probabilities, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--engines', nargs='+', default=['sklearn'], choices=['sklearn', 'flat'])
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    features_df = synthetic_features(1000, encoders)
+    instances = features_df[feature_names].to_dict(orient='records')
+    X, _ = encode_features(features_df, encoders, feature_names)
+    expected = model.predict_proba(X)[:, 1]
+
+    print(f"{args.requests:,} single-row requests from {args.concurrency} concurrent clients\n")
+    print(f"{'Configuration':<28} {'p50':>9} {'p99':>9} {'req/s':>9} {'rows/batch':>11}")
+    for engine in args.engines:
+        configs = [
+            ('off', ['--no-batching']),
+            ('on', ['--max-batch-size', str(args.max_batch_size), '--max-wait-ms', str(args.max_wait_ms)]),
+        ]
+        for label, batching_args in configs:
+            process, port = start_server(['--engine', engine, *batching_args])
+            try:
+                # Warm up the connection path and the model
+                load_test(port, instances, 50, 4)
+                latencies, probabilities, seconds = load_test(port, instances, args.requests, args.concurrency)
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                _, stats = request(connection, 'GET', '/stats')
+                connection.close()
+            finally:
+                process.terminate()
+                process.wait()
+
+            assert np.array_equal(probabilities, expected[np.arange(args.requests) % len(expected)])
+            p50, p99 = np.percentile(latencies * 1000, [50, 99])
+            batch_rows = f"{stats['mean_batch_rows']:.1f}" if 'mean_batch_rows' in stats else '1.0'
+            print(f"{f'{engine}, batching {label}':<28} {p50:>7.1f}ms {p99:>7.1f}ms "
+                  f"{args.requests / seconds:>9,.0f} {batch_rows:>11}")
+    print("\n✓ Service probabilities match model.predict_proba")
+
+
+if __name__ == '__main__':
+    main()
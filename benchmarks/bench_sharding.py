@@ -0,0 +1,79 @@
+"""Parity and scaling: PatientID-sharded feature engineering vs. the serial path.
+
+Usage:
+    python benchmarks/bench_sharding.py [--patients 50000] [--workers 1 2 4 8]
+    python benchmarks/bench_sharding.py --dataset dataset/
+
+Builds ``model_df`` (lab aggregation, labels and merges) serially and with
+``build_model_df_parallel`` for each worker count, checks the frames are
+identical, and reports speedup and parallel efficiency per core count.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.cleaning import clean_tables, load_raw_tables  # noqa: E402
+from readmission.features import build_model_df, create_readmission_labels  # noqa: E402
+from readmission.lab_features import aggregate_lab_features  # noqa: E402
+from readmission.sharding import build_model_df_parallel  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+REFERENCE_DATE = '2024-01-01'
+
+
+def serial_model_df(tables):
+    lab_features = aggregate_lab_features(tables['labs'])
+    labelled = create_readmission_labels(tables['admissions'])
+    return build_model_df(labelled, tables['patients'], tables['diagnoses'], lab_features, REFERENCE_DATE)
+
+
+def default_worker_counts():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=50_000, help='synthetic patients when --dataset is not given')
+    parser.add_argument('--labs-per-admission', type=int, default=30)
+    parser.add_argument('--dataset', default=None, help='directory with the raw *CorePopulatedTable.txt files')
+    parser.add_argument('--workers', type=int, nargs='+', default=None, help='worker counts (default: 1, 2, 4 ... cores)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dataset is None:
+            generate_emr(tmp, args.patients, labs_per_admission=args.labs_per_admission)
+        tables = clean_tables(load_raw_tables(args.dataset or tmp))
+    print(f"Admissions: {len(tables['admissions']):,}  lab rows: {len(tables['labs']):,}  "
+          f"cores: {os.cpu_count()}")
+
+    start = time.perf_counter()
+    expected = serial_model_df(tables)
+    serial_seconds = time.perf_counter() - start
+    print(f"\n{'Workers':>7} {'seconds':>9} {'speedup':>8} {'efficiency':>11}")
+    print(f"{'serial':>7} {serial_seconds:9.3f} {1:8.2f}x")
+
+    for workers in args.workers or default_worker_counts():
+        start = time.perf_counter()
+        actual = build_model_df_parallel(tables, reference_date=REFERENCE_DATE, workers=workers)
+        seconds = time.perf_counter() - start
+        pd.testing.assert_frame_equal(actual, expected)
+        speedup = serial_seconds / seconds
+        print(f"{workers:>7} {seconds:9.3f} {speedup:8.2f}x {speedup / workers:10.0%}")
+    print(f"\n✓ Parity: {len(expected):,} model_df rows identical for every worker count")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Per-worker memory and start-up: shared-memory model hosting vs. per-process pickle loads.
+
+Usage:
+    python benchmarks/bench_shared_model.py [--workers 4]
+
+The forest is published once (``readmission.shared_model.publish_artifacts``).
+Then ``--workers`` fresh interpreters either load the three pickles (as
+each scoring worker and Streamlit process does today) or attach to the
+segment. Each worker times its load/attach plus the first single-row
+prediction, then waits until all workers are up and reports its memory
+from ``/proc/self/smaps_rollup``:
+
+- RSS counts shared pages in full in every process
+- PSS splits shared pages between the processes that map them, so the sum
+  of PSS over workers is what the host actually spends
+
+Also checks that an attached worker's probabilities equal the pickled
+model's, and runs ``python -m readmission score --shared-memory`` end to
+end against the same command loading the pickles.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_scoring import synthetic_features  # noqa: E402
+from readmission.artifacts import DEFAULT_MODELS, load_model_artifacts  # noqa: E402
+from readmission.scoring import encode_features  # noqa: E402
+from readmission.shared_model import SharedModel, publish_artifacts  # noqa: E402
+
+ROW = {'LengthOfStay': 5, 'PreviousAdmissions': 2, 'PatientAge': 70.0, 'PatientGender': 1, 'DiagnosisChapter': 8,
+       'NumLabs': 100, 'hemoglobin_avg': 12.0, 'glucose_avg': 130.0, 'creatinine_avg': 1.4, 'wbc_avg': 9.0}
+
+LOADERS = {
+    'pickles per process': '''
+from readmission.artifacts import load_model_artifacts
+import pandas as pd
+model, encoders, feature_names = load_model_artifacts()
+model.n_jobs = 1
+model.predict_proba(pd.DataFrame([{row!r}])[feature_names])
+''',
+    'shared memory': '''
+from readmission.shared_model import SharedModel
+import numpy as np
+model = SharedModel.attach({name!r})
+model.predict_proba(np.array([[{row!r}[name] for name in model.feature_names]]))
+''',
+}
+
+# Prints the load time, waits for a line on stdin (all workers up), then prints memory
+WORKER = '''
+import json, sys, time
+start = time.perf_counter()
+{body}
+print(json.dumps({{"seconds": time.perf_counter() - start}}), flush=True)
+sys.stdin.readline()
+memory = {{}}
+for line in open('/proc/self/smaps_rollup'):
+    key, _, rest = line.partition(':')
+    if key in ('Rss', 'Pss', 'Shared_Clean', 'Private_Clean', 'Private_Dirty'):
+        memory[key] = int(rest.split()[0]) / 1024
+print(json.dumps(memory), flush=True)
+'''
+
+
+def run_workers(body, workers):
+    procs = [subprocess.Popen([sys.executable, '-c', WORKER.format(body=body)], cwd=REPO_ROOT, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              env={**os.environ, 'PYTHONWARNINGS': 'ignore'})
+             for _ in range(workers)]
+    seconds = [json.loads(proc.stdout.readline())['seconds'] for proc in procs]
+    for proc in procs:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+    memory = [json.loads(proc.stdout.readline()) for proc in procs]
+    for proc in procs:
+        proc.wait()
+    return np.array(seconds) * 1000, memory
+
+
+def check_score_command(rows, workers):
+    """Run ``score --shared-memory`` and ``score --no-bundle`` on the same file; True if the outputs match."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rows.to_csv(tmp / 'discharges.csv', index=False)
+        outputs = []
+        for flag in ('--shared-memory', '--no-bundle'):
+            output = tmp / f'scores{flag}.csv'
+            subprocess.run([sys.executable, '-m', 'readmission', 'score', str(tmp / 'discharges.csv'), str(output),
+                            '--models-dir', str(DEFAULT_MODELS), '--workers', str(workers),
+                            '--chunksize', str(-(-len(rows) // (2 * workers))), flag],
+                           check=True, capture_output=True, cwd=REPO_ROOT,
+                           env={**os.environ, 'PYTHONWARNINGS': 'ignore'})
+            outputs.append(output.read_bytes())
+    return outputs[0] == outputs[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    model, encoders, feature_names = load_model_artifacts()
+    with publish_artifacts(DEFAULT_MODELS, f'readmission_bench_{os.getpid()}') as host:
+        attached = SharedModel.attach(host.name)
+        rows = synthetic_features(5_000, encoders)
+        X, _ = encode_features(rows, attached.vocabularies, attached.feature_names)
+        assert np.array_equal(attached.predict_proba(X), model.predict_proba(X))
+        print(f"✓ Shared model {host.version} ({host.size / 2**20:.1f} MiB segment) matches the pickled model "
+              f"on {len(X):,} rows")
+        assert check_score_command(rows, args.workers), "score --shared-memory differs from score --no-bundle"
+        print(f"✓ score --shared-memory with {args.workers} workers writes the same scores as score --no-bundle\n")
+
+        print(f"{args.workers} workers{'':<14} {'load+1st ms':>12} {'RSS MB':>8} {'PSS MB':>8} "
+              f"{'private MB':>11} {'sum PSS MB':>11}")
+        for label, template in LOADERS.items():
+            seconds, memory = run_workers(template.format(name=host.name, row=ROW), args.workers)
+            rss = np.mean([m['Rss'] for m in memory])
+            pss = np.array([m['Pss'] for m in memory])
+            private = np.mean([m['Private_Clean'] + m['Private_Dirty'] for m in memory])
+            print(f"{label:<24} {np.median(seconds):>12.0f} {rss:>8.0f} {pss.mean():>8.0f} {private:>11.0f} "
+                  f"{pss.sum():>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
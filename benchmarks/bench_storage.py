@@ -0,0 +1,75 @@
+"""Load time and memory: columnar cleaned_data store vs. the CSV round-trip.
+
+Usage:
+    python benchmarks/bench_storage.py [--admissions 20000] [--partitions 16]
+
+Writes a synthetic labs table both as labs_cleaned.csv and into the
+columnar store, then compares a full CSV load (plus date parsing), a CSV
+load restricted with ``usecols`` and column-projected columnar reads.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_lab_features import synthetic_labs  # noqa: E402
+from readmission.storage import read_table, write_cleaned_tables  # noqa: E402
+
+PROJECTED = ['PatientID', 'AdmissionID', 'LabName', 'LabValue']
+
+
+def measure(func):
+    """Return (seconds, peak traced MiB, resident MiB of the result)"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2**20, result.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--admissions', type=int, default=20000)
+    parser.add_argument('--partitions', type=int, default=16)
+    args = parser.parse_args()
+
+    labs_df = synthetic_labs(args.admissions)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'labs_cleaned.csv'
+        store = Path(tmp) / 'columnar'
+        labs_df.to_csv(csv_path, index=False)
+        write_cleaned_tables({'labs': labs_df}, store, args.partitions)
+
+        def csv_full():
+            df = pd.read_csv(csv_path)
+            df['LabDateTime'] = pd.to_datetime(df['LabDateTime'])
+            return df
+
+        cases = {
+            'CSV, all columns + to_datetime': csv_full,
+            'CSV, usecols (4 columns)': lambda: pd.read_csv(csv_path, usecols=PROJECTED),
+            'Columnar, all columns': lambda: read_table(store, 'labs'),
+            'Columnar, 4 columns': lambda: read_table(store, 'labs', PROJECTED),
+            'Columnar, 4 columns, 1 partition': lambda: read_table(store, 'labs', PROJECTED, partitions=[0]),
+        }
+
+        print(f"Labs rows: {len(labs_df):,}")
+        print(f"{'Path':<36} {'Load s':>8} {'Peak MiB':>9} {'Frame MiB':>10}")
+        for label, func in cases.items():
+            seconds, peak, size = measure(func)
+            print(f"{label:<36} {seconds:>8.3f} {peak:>9.1f} {size:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
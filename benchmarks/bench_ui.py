@@ -0,0 +1,174 @@
+"""Cold-start and per-rerun timings of the Streamlit app, now and at an earlier git revision.
+
+Usage:
+    python benchmarks/bench_ui.py [--ref HEAD~1] [--cold-runs 5] [--reruns 20]
+
+The app runs headless under ``streamlit.testing.v1.AppTest``, each
+measurement in a fresh interpreter:
+
+- cold start: wall time of a process that runs the app once (all
+  imports, the model load and the first render), and of that first
+  script run alone. With first-paint instrumentation the app also records
+  when the header was on screen.
+- reruns: after a first run and one analysis, each interaction is
+  repeated ``--reruns`` times and the median is reported. The interactions
+  are editing a form field, clicking analyze and changing the what-if
+  feature. AppTest re-runs the whole script on every interaction, even
+  for a widget inside an ``st.fragment``. So the bench also reports the
+  served cost: in a real session, an interaction inside a fragment re-runs
+  only that fragment, and the app times each fragment run
+  (``ui_fragment_seconds``). Without fragments, the served cost is the
+  full rerun.
+
+``--ref`` checks out ``ui/app.py`` of that revision next to the current
+one (so its imports resolve) and measures both.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+UI_DIR = REPO_ROOT / 'ui'
+sys.path.insert(0, str(REPO_ROOT))
+
+ANALYZE_LABEL = "🔮 Analyze Readmission Risk"
+TIMEOUT = 300
+
+
+def _widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def child_cold(app):
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    from readmission import metrics
+
+    # Some streamlit releases import plotly themselves; only an import by the app counts against it
+    plotly_preloaded = 'plotly' in sys.modules
+    at = AppTest.from_file(app, default_timeout=TIMEOUT)
+    run_start = time.perf_counter()
+    at.run()
+    assert not at.exception, at.exception
+    histograms = metrics.REGISTRY.snapshot()['histograms']
+    first_paint = histograms.get('ui_first_paint_seconds')
+    return {'first_run': time.perf_counter() - run_start, 'in_process': time.perf_counter() - start,
+            'first_paint': first_paint['mean'] if first_paint else None,
+            'plotly_loaded': 'plotly' in sys.modules, 'plotly_preloaded': plotly_preloaded}
+
+
+def child_reruns(app, reruns):
+    from streamlit.testing.v1 import AppTest
+    from readmission import metrics
+
+    at = AppTest.from_file(app, default_timeout=TIMEOUT)
+    at.run()
+    _widget(at.button, ANALYZE_LABEL).click().run()
+    assert not at.exception, at.exception
+    options = _widget(at.selectbox, "Feature to vary").options
+
+    def form_edit(i):
+        _widget(at.number_input, "Previous Admissions").set_value(i % 10).run()
+
+    def analyze(i):
+        _widget(at.button, ANALYZE_LABEL).click().run()
+
+    def what_if(i):
+        _widget(at.selectbox, "Feature to vary").set_value(options[(i + 1) % len(options)]).run()
+
+    def fragment_time(fragment):
+        histogram = metrics.REGISTRY.snapshot()['histograms'].get(f'ui_fragment_seconds{{fragment="{fragment}"}}')
+        return (histogram['sum'], histogram['count']) if histogram else (0.0, 0)
+
+    results = {}
+    # The fragment that owns each interaction's widget; analyze re-runs the page by design
+    for name, interact, fragment in (('form edit', form_edit, 'patient_form'), ('analyze', analyze, None),
+                                     ('what-if feature', what_if, 'risk_analysis')):
+        fragment_before = fragment_time(fragment)
+        times = []
+        for i in range(reruns):
+            start = time.perf_counter()
+            interact(i)
+            times.append(time.perf_counter() - start)
+            assert not at.exception, (name, at.exception)
+        fragment_sum, fragment_count = (after - before for after, before in zip(fragment_time(fragment),
+                                                                                fragment_before))
+        median = statistics.median(times)
+        results[name] = {'median': median, 'served': fragment_sum / fragment_count if fragment_count else median}
+    return results
+
+
+def measure(app, mode, reruns=0):
+    """Run one measurement in a fresh interpreter; returns (parsed result, process wall seconds)."""
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, __file__, '--child', mode, '--app', str(app), '--reruns', str(reruns)],
+                         check=True, capture_output=True, text=True, cwd=UI_DIR).stdout
+    return json.loads(out.strip().splitlines()[-1]), time.perf_counter() - start
+
+
+def bench(app, cold_runs, reruns):
+    cold = [measure(app, 'cold') for _ in range(cold_runs)]
+    paints = [result['first_paint'] for result, _ in cold if result['first_paint'] is not None]
+    return {
+        'process': statistics.median(wall for _, wall in cold),
+        'first_run': statistics.median(result['first_run'] for result, _ in cold),
+        'first_paint': statistics.median(paints) if paints else None,
+        'plotly_loaded': ('by streamlit' if cold[0][0]['plotly_preloaded'] else
+                          'by app' if cold[0][0]['plotly_loaded'] else 'no'),
+        'reruns': measure(app, 'reruns', reruns)[0]
+    }
+
+
+def ms(seconds):
+    return f"{seconds * 1000:,.0f} ms" if seconds is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ref', default=None, help='git revision to compare against (e.g. HEAD~1)')
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--child', choices=['cold', 'reruns'], help=argparse.SUPPRESS)
+    parser.add_argument('--app', default=str(UI_DIR / 'app.py'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = child_cold(args.app) if args.child == 'cold' else child_reruns(args.app, args.reruns)
+        print(json.dumps(result))
+        return
+
+    apps = {'current': UI_DIR / 'app.py'}
+    if args.ref:
+        source = subprocess.run(['git', 'show', f'{args.ref}:ui/app.py'], check=True, capture_output=True,
+                                text=True, cwd=REPO_ROOT).stdout
+        apps[args.ref] = UI_DIR / f'_bench_app_{args.ref.replace("~", "_").replace("/", "_")}.py'
+        apps[args.ref].write_text(source)
+    try:
+        results = {label: bench(app, args.cold_runs, args.reruns) for label, app in apps.items()}
+    finally:
+        for label, app in apps.items():
+            if label != 'current':
+                app.unlink()
+
+    labels = list(results)
+    print(f"{'':<34}" + ''.join(f"{label:>16}" for label in labels))
+    for key, title in (('process', 'cold start (process)'), ('first_run', 'cold start (first script run)'),
+                       ('first_paint', 'header on screen')):
+        print(f"{title:<34}" + ''.join(f"{ms(results[label][key]):>16}" for label in labels))
+    print(f"{'plotly imported at cold start':<34}" + ''.join(f"{results[label]['plotly_loaded']:>16}"
+                                                             for label in labels))
+    for interaction in results['current']['reruns']:
+        print(f"{'rerun: ' + interaction:<34}" + ''.join(
+            f"{ms(results[label]['reruns'][interaction]['median']):>16}" for label in labels))
+        print(f"{'  served (fragment only)':<34}" + ''.join(
+            f"{ms(results[label]['reruns'][interaction]['served']):>16}" for label in labels))
+    print("rerun = full script run under AppTest; served = what a browser session re-runs for that interaction")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""End-to-end benchmark suite on synthetic (or real) raw EMR tables.
+
+Times and memory-profiles each step of the pipeline: ingest (full read and
+streaming labs), cleaning, lab aggregation, label creation, merge, the
+same three steps sharded over all cores, training, and single-row and
+batch inference. Memory is the peak RSS during the step (the kernel's
+high-water mark is reset before each step), so steps are not slowed by
+allocation tracing.
+
+Results are written as JSON together with the dataset size, library
+versions and git commit; ``--compare`` prints the ratio against an
+earlier result file.
+
+Usage:
+    python benchmarks/run_suite.py --patients 10000
+    python benchmarks/run_suite.py --patients 100000 --compare benchmarks/results/suite-10000-....json
+    python benchmarks/run_suite.py --dataset dataset/
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from readmission.cleaning import clean_tables, load_raw_tables, raw_paths  # noqa: E402
+from readmission.encoding import FeatureEncoder  # noqa: E402
+from readmission.features import build_model_df, create_readmission_labels  # noqa: E402
+from readmission.forest import FlatForest  # noqa: E402
+from readmission.ingest import stream_lab_features  # noqa: E402
+from readmission.lab_features import aggregate_lab_features  # noqa: E402
+from readmission.scoring import encode_features, score_frame  # noqa: E402
+from readmission.sharding import build_model_df_parallel  # noqa: E402
+from readmission.training import balance_dataset, prepare_features, split_features, train_random_forest  # noqa: E402
+from synthetic_emr import generate_emr  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+SINGLE_ROW_CALLS = 200
+
+
+def _status_mb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM (Linux >= 4.0); elsewhere the peak is cumulative
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class Suite:
+    """Runs steps and collects one result dict per step."""
+
+    def __init__(self):
+        self.results = []
+
+    def step(self, name, func, *args, rows=None, **kwargs):
+        _reset_peak_rss()
+        rss_before = _status_mb('VmRSS')
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        peak = _status_mb('VmHWM')
+        entry = {
+            'step': name,
+            'seconds': round(seconds, 4),
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            'peak_rss_delta_mb': round(peak - rss_before, 1) if peak is not None else None,
+        }
+        if rows is not None:
+            entry.update(rows=int(rows), rows_per_second=round(rows / seconds) if seconds else None)
+        self.results.append(entry)
+        print(f"✓ {name:<24} {seconds:9.3f}s  peak RSS {entry['peak_rss_mb'] or float('nan'):8.1f} MB"
+              + (f"  {rows / seconds:>12,.0f} rows/s" if rows else ''), flush=True)
+        return result
+
+    def latency(self, name, func, calls=SINGLE_ROW_CALLS):
+        """Per-call latency percentiles of ``func()``."""
+        func()
+        times = np.empty(calls)
+        for i in range(calls):
+            start = time.perf_counter()
+            func()
+            times[i] = time.perf_counter() - start
+        p50, p99 = np.percentile(times * 1000, [50, 99])
+        self.results.append({'step': name, 'calls': calls, 'p50_ms': round(p50, 4), 'p99_ms': round(p99, 4)})
+        print(f"✓ {name:<24} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms", flush=True)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(suite, dataset_path, n_healthy):
+    suite.step('ingest_full_default_dtypes', load_raw_tables, dataset_path, compact=False)
+    raw = suite.step('ingest_full', load_raw_tables, dataset_path)
+    raw_rows = {name: len(df) for name, df in raw.items()}
+    suite.step('ingest_stream_labs', stream_lab_features, raw_paths(dataset_path)['labs'], rows=raw_rows['labs'])
+
+    cleaned = suite.step('clean', clean_tables, raw, rows=sum(raw_rows.values()))
+    del raw
+    lab_features = suite.step('lab_aggregation', aggregate_lab_features, cleaned['labs'], rows=len(cleaned['labs']))
+    labelled = suite.step('labels', create_readmission_labels, cleaned['admissions'], rows=len(cleaned['admissions']))
+    model_df = suite.step('merge', build_model_df, labelled, cleaned['patients'], cleaned['diagnoses'], lab_features,
+                          rows=len(labelled))
+    suite.step('features_sharded', build_model_df_parallel, cleaned, workers=os.cpu_count(), rows=len(labelled))
+
+    def train():
+        X, y, label_encoders, lab_medians = prepare_features(balance_dataset(model_df, n_healthy))
+        X_train, _, y_train, _ = split_features(X, y)
+        return train_random_forest(X_train, y_train), label_encoders, list(X.columns), lab_medians
+
+    model, encoders, feature_names, lab_medians = suite.step('train', train)
+
+    # Inference on the full merged table, in the raw feature schema the scorers accept
+    features_df = model_df[['PatientID', 'AdmissionID'] + feature_names]
+    model.n_jobs = 1
+    forest = FlatForest.from_sklearn(model)
+    single_df = features_df.head(1)
+    encoder = FeatureEncoder.from_encoders(encoders, feature_names, lab_medians)
+    single_X, _ = encode_features(single_df, encoders, feature_names, lab_medians)
+    suite.latency('predict_single_sklearn', lambda: model.predict_proba(single_X))
+    suite.latency('predict_single_flat', lambda: forest.predict_proba(single_X))
+    suite.latency('score_single_end_to_end', lambda: score_frame(single_df, model, encoder))
+    suite.step('score_batch', score_frame, features_df, model, encoder, rows=len(features_df))
+    X, _ = encode_features(features_df, encoders, feature_names, lab_medians)
+    suite.step('predict_batch_flat', forest.predict_proba, X, rows=len(X))
+    return raw_rows, len(model_df)
+
+
+def compare(results, baseline_path):
+    baseline = {entry['step']: entry for entry in json.loads(Path(baseline_path).read_text())['results']}
+    print(f"\nCompared with {baseline_path} (ratio > 1: slower now)")
+    print(f"{'Step':<26} {'baseline':>12} {'now':>12} {'ratio':>8}")
+    for entry in results:
+        old = baseline.get(entry['step'])
+        key = 'seconds' if 'seconds' in entry else 'p50_ms'
+        if old is None or not old.get(key):
+            continue
+        unit = 's' if key == 'seconds' else 'ms'
+        print(f"{entry['step']:<26} {old[key]:>11.3f}{unit} {entry[key]:>11.3f}{unit} {entry[key] / old[key]:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=10_000, help='synthetic patients to generate')
+    parser.add_argument('--labs-per-admission', type=int, default=30)
+    parser.add_argument('--dataset', default=None, help='use existing raw tables instead of generating')
+    parser.add_argument('--keep-dataset', default=None, help='generate into this directory and keep it')
+    parser.add_argument('--n-healthy', type=int, default=200, help='non-readmitted rows kept for training')
+    parser.add_argument('--output', default=None, help='result JSON (default: benchmarks/results/suite-<N>-<time>.json)')
+    parser.add_argument('--compare', default=None, help='earlier result JSON to compare against')
+    args = parser.parse_args()
+
+    suite = Suite()
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset_path = args.dataset
+        if dataset_path is None:
+            dataset_path = args.keep_dataset or tmp
+            suite.step('generate', generate_emr, dataset_path, args.patients, labs_per_admission=args.labs_per_admission)
+        raw_rows, model_rows = run(suite, dataset_path, args.n_healthy)
+
+    report = {
+        'environment': environment(),
+        'dataset': {
+            'source': args.dataset or 'synthetic',
+            'patients': raw_rows['patients'],
+            'labs_per_admission': None if args.dataset else args.labs_per_admission,
+            'rows': raw_rows,
+            'model_rows': model_rows,
+        },
+        'results': suite.results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"suite-{raw_rows['patients']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n✓ Results: {output}")
+    if args.compare:
+        compare(suite.results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
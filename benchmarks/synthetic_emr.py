@@ -0,0 +1,208 @@
+"""Synthetic EMR generator matching the four raw tables data-cleaning.ipynb reads.
+
+Writes PatientCorePopulatedTable.txt, AdmissionsCorePopulatedTable.txt,
+AdmissionsDiagnosesCorePopulatedTable.txt and LabsCorePopulatedTable.txt
+(tab-separated, same columns and value formats as the real dataset) into
+an output directory. Patients are generated and appended in chunks, so
+memory stays bounded from 10k up to 1M patients and hundreds of millions
+of lab rows. Output is deterministic for a given seed and chunk size.
+
+Realism where the pipeline cares about it: several admissions per patient
+with ~15% of gaps inside the 30-day readmission window, ICD-10 codes
+spread over chapters (including ones the model has never seen), critical
+and non-critical labs with plausible units and ranges, and a small share
+of 'Unknown'/empty values for the cleaning step to handle.
+
+Usage:
+    python benchmarks/synthetic_emr.py dataset_synthetic/ --patients 100000 --labs-per-admission 30
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from readmission.cleaning import RAW_FILES  # noqa: E402
+
+# LabName -> (LabUnits, mean, standard deviation)
+LAB_SPECS = {
+    'CBC: HEMOGLOBIN': ('gm/dL', 13.5, 2.0),
+    'CBC: MEAN CORPUSCULAR HEMOGLOBIN': ('pg', 30.0, 2.0),
+    'CBC: WHITE BLOOD CELL COUNT': ('k/cumm', 7.5, 2.5),
+    'CBC: RED BLOOD CELL COUNT': ('m/cumm', 4.7, 0.5),
+    'CBC: PLATELET COUNT': ('k/cumm', 250.0, 60.0),
+    'METABOLIC: GLUCOSE': ('mg/dL', 105.0, 30.0),
+    'METABOLIC: CREATININE': ('mg/dL', 1.0, 0.3),
+    'METABOLIC: SODIUM': ('mmol/L', 140.0, 3.0),
+    'METABOLIC: POTASSIUM': ('mmol/L', 4.2, 0.4),
+    'METABOLIC: ALBUMIN': ('gm/dL', 4.0, 0.5),
+    'METABOLIC: CALCIUM': ('mg/dL', 9.5, 0.5),
+    'URINALYSIS: PH': ('no unit', 6.0, 0.8),
+    'URINALYSIS: SPECIFIC GRAVITY': ('no unit', 1.02, 0.005),
+}
+
+# PrimaryDiagnosisCode -> PrimaryDiagnosisDescription
+DIAGNOSES = {
+    'A41.9': 'Sepsis, unspecified organism',
+    'B20': 'Human immunodeficiency virus [HIV] disease',
+    'C50.9': 'Malignant neoplasm of breast of unspecified site',
+    'D64.9': 'Anemia, unspecified',
+    'E11.9': 'Type 2 diabetes mellitus without complications',
+    'F32.9': 'Major depressive disorder, single episode, unspecified',
+    'G40.909': 'Epilepsy, unspecified, not intractable',
+    'H40.9': 'Unspecified glaucoma',
+    'I10': 'Essential (primary) hypertension',
+    'I50.9': 'Heart failure, unspecified',
+    'J44.1': 'Chronic obstructive pulmonary disease with (acute) exacerbation',
+    'J18.9': 'Pneumonia, unspecified organism',
+    'K21.9': 'Gastro-esophageal reflux disease without esophagitis',
+    'M54.5': 'Low back pain',
+    'N18.3': 'Chronic kidney disease, stage 3 (moderate)',
+    'O80': 'Encounter for full-term uncomplicated delivery',
+    'P07.30': 'Preterm newborn, unspecified weeks of gestation',
+    'Q21.0': 'Ventricular septal defect',
+    'R07.9': 'Chest pain, unspecified',
+    'T78.40XA': 'Allergy, unspecified, initial encounter',
+    'Z00.00': 'Encounter for general adult medical examination without abnormal findings',
+    # Chapters absent from the trained encoder
+    'L03.90': 'Cellulitis, unspecified',
+    'S72.001A': 'Fracture of unspecified part of neck of right femur, initial encounter',
+}
+
+RACES = ['White', 'African American', 'Asian', 'Unknown']
+MARITAL_STATUSES = ['Married', 'Single', 'Divorced', 'Separated', 'Unknown']
+LANGUAGES = ['English', 'Spanish', 'Icelandic', 'Unknown']
+
+FIRST_ADMISSION = np.datetime64('2000-01-01T00:00:00', 'ms')
+DAY_MS = 24 * 3600 * 1000
+READMIT_SHARE = 0.15
+MISSING_SHARE = 0.01
+DEFAULT_CHUNK_PATIENTS = 50_000
+
+
+def format_datetimes(values):
+    """datetime64[ms] -> 'YYYY-MM-DD HH:MM:SS.mmm' strings, as in the raw tables."""
+    text = np.datetime_as_string(values.astype('datetime64[ms]'), unit='ms').astype('S23')
+    # Swap the ISO 'T' separator for a space in place, without per-string Python calls
+    text.view(np.uint8).reshape(-1, 23)[:, 10] = ord(' ')
+    return text.astype(str).astype(object)
+
+
+def patient_ids(rng, n):
+    """Upper-case UUID-style identifiers."""
+    raw = rng.integers(0, 2 ** 63, size=(n, 2))
+    hexes = (f'{a:016X}{b:016X}' for a, b in raw)
+    return np.array([f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}' for h in hexes], dtype=object)
+
+
+def with_missing(rng, values, placeholder, share=MISSING_SHARE):
+    values = values.copy()
+    values[rng.random(len(values)) < share] = placeholder
+    return values
+
+
+def generate_chunk(rng, n_patients, mean_admissions=3.0, labs_per_admission=30):
+    """One chunk of patients with their admissions, diagnoses and labs; returns four DataFrames."""
+    ids = patient_ids(rng, n_patients)
+    birth = np.datetime64('1920-01-01', 'ms') + rng.integers(0, 85 * 365, n_patients) * DAY_MS
+    patients = pd.DataFrame({
+        'PatientID': ids,
+        'PatientGender': with_missing(rng, rng.choice(np.array(['Male', 'Female'], dtype=object), n_patients), 'Unknown'),
+        'PatientDateOfBirth': format_datetimes(birth + rng.integers(0, DAY_MS, n_patients)),
+        'PatientRace': rng.choice(np.array(RACES, dtype=object), n_patients, p=[0.6, 0.2, 0.15, 0.05]),
+        'PatientMaritalStatus': rng.choice(np.array(MARITAL_STATUSES, dtype=object), n_patients),
+        'PatientLanguage': rng.choice(np.array(LANGUAGES, dtype=object), n_patients, p=[0.7, 0.15, 0.1, 0.05]),
+        'PatientPopulationPercentageBelowPoverty': with_missing(rng, rng.uniform(0, 40, n_patients).round(2), np.nan),
+    })
+
+    # Admissions: consecutive stays per patient, some gaps inside the 30-day window
+    n_admissions = 1 + rng.poisson(mean_admissions - 1, n_patients)
+    patient = np.repeat(np.arange(n_patients), n_admissions)
+    first = np.repeat(np.cumsum(n_admissions) - n_admissions, n_admissions)
+    sequence = np.arange(len(patient)) - first
+    stay_ms = np.maximum(rng.lognormal(1.3, 0.7, len(patient)), 0.1) * DAY_MS
+    gap_days = np.where(rng.random(len(patient)) < READMIT_SHARE, rng.uniform(1, 30, len(patient)),
+                        31 + rng.exponential(300, len(patient)))
+    step = (stay_ms + gap_days * DAY_MS).astype(np.int64)
+    elapsed = np.cumsum(step) - step
+    elapsed -= elapsed[first]
+    start = (FIRST_ADMISSION + rng.integers(0, 15 * 365, n_patients)[patient] * DAY_MS
+             + rng.integers(0, DAY_MS, len(patient)) + elapsed)
+    end = start + stay_ms.astype(np.int64)
+    admissions = pd.DataFrame({
+        'PatientID': ids[patient],
+        'AdmissionID': sequence + 1,
+        'AdmissionStartDate': format_datetimes(start),
+        'AdmissionEndDate': format_datetimes(end),
+    })
+
+    codes = np.array(list(DIAGNOSES), dtype=object)
+    code = codes[rng.integers(0, len(codes), len(patient))]
+    diagnoses = pd.DataFrame({
+        'PatientID': admissions['PatientID'],
+        'AdmissionID': admissions['AdmissionID'],
+        'PrimaryDiagnosisCode': with_missing(rng, code, np.nan),
+        'PrimaryDiagnosisDescription': pd.Series(code).map(DIAGNOSES).to_numpy(dtype=object),
+    })
+
+    # Labs: Poisson count per admission, taken at random times during the stay, in file order shuffled
+    n_labs = rng.poisson(labs_per_admission, len(patient))
+    admission = rng.permutation(np.repeat(np.arange(len(patient)), n_labs))
+    lab_names = np.array(list(LAB_SPECS), dtype=object)
+    units, means, sds = (np.array(column) for column in zip(*LAB_SPECS.values()))
+    lab = rng.integers(0, len(lab_names), len(admission))
+    value = rng.normal(means[lab], sds[lab]).round(3)
+    value = np.abs(with_missing(rng, value, np.nan, MISSING_SHARE / 10))
+    taken = start[admission] + (rng.random(len(admission)) * stay_ms[admission]).astype(np.int64)
+    labs = pd.DataFrame({
+        'PatientID': admissions['PatientID'].to_numpy()[admission],
+        'AdmissionID': admissions['AdmissionID'].to_numpy()[admission],
+        'LabName': lab_names[lab],
+        'LabValue': value,
+        'LabUnits': units.astype(object)[lab],
+        'LabDateTime': format_datetimes(taken),
+    })
+    return {'patients': patients, 'admissions': admissions, 'diagnoses': diagnoses, 'labs': labs}
+
+
+def generate_emr(out_dir, n_patients, mean_admissions=3.0, labs_per_admission=30,
+                 chunk_patients=DEFAULT_CHUNK_PATIENTS, seed=42):
+    """Write the four raw tables for ``n_patients`` into ``out_dir``; returns rows written per table."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, filename) for name, filename in RAW_FILES.items()}
+    rows = dict.fromkeys(RAW_FILES, 0)
+    for index, offset in enumerate(range(0, n_patients, chunk_patients)):
+        rng = np.random.default_rng([seed, index])
+        tables = generate_chunk(rng, min(chunk_patients, n_patients - offset), mean_admissions, labs_per_admission)
+        for name, df in tables.items():
+            df.to_csv(paths[name], sep='\t', index=False, mode='a' if index else 'w', header=not index)
+            rows[name] += len(df)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--patients', type=int, default=10_000)
+    parser.add_argument('--mean-admissions', type=float, default=3.0)
+    parser.add_argument('--labs-per-admission', type=int, default=30)
+    parser.add_argument('--chunk-patients', type=int, default=DEFAULT_CHUNK_PATIENTS)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = generate_emr(args.out_dir, args.patients, args.mean_admissions, args.labs_per_admission,
+                        args.chunk_patients, args.seed)
+    for name, count in rows.items():
+        print(f"✓ {RAW_FILES[name]:<45} {count:>14,} rows")
+    print(f"✓ Generated in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""Patient readmission prediction - reusable pipeline components.
+
+The notebooks in ``src-cleaning/`` and the Streamlit UI in ``ui/`` import
+from this package so that feature engineering is defined in one place.
+"""
+
+from readmission.lab_features import CRITICAL_LABS, aggregate_lab_features
+
+__all__ = ['CRITICAL_LABS', 'aggregate_lab_features']
@@ -0,0 +1,32 @@
+"""Command line entry point: ``python -m readmission <command> [options]``."""
+
+import importlib
+import sys
+
+# command -> module exposing main(argv)
+COMMANDS = {
+    'pipeline': 'readmission.pipeline',
+    'ingest': 'readmission.ingest',
+    'incremental': 'readmission.incremental',
+    'score': 'readmission.scoring',
+    'serve': 'readmission.service',
+    'bundle': 'readmission.bundle',
+    'share': 'readmission.shared_model',
+    'watch': 'readmission.watch',
+    'profile': 'readmission.profiling',
+    'history': 'readmission.history_store',
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print("usage: python -m readmission <command> [options]\n\ncommands:")
+        for name, module in COMMANDS.items():
+            print(f"  {name:<12} {module}")
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+    return importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
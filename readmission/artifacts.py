@@ -0,0 +1,95 @@
+"""Loading the trained model artifacts outside Streamlit.
+
+A model has one version: the first 12 hex digits of the sha256 of its
+pickle (``model_version``). Export writes the bundle (``readmission.bundle``)
+with the same version, so a bundle whose version differs from the pickles
+next to it is left over from an earlier model and is not used.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+from readmission import metrics
+from readmission.bundle import BUNDLE_DIR, MANIFEST_FILE, load_bundle
+
+DEFAULT_MODELS = Path(__file__).resolve().parents[1] / 'models'
+
+# Same file name for every engine; the UI, scorer and service load it. Defined here rather than in
+# training so that loading a model does not import sklearn's training code
+MODEL_FILE = 'random_forest_readmission_model.pkl'
+ENCODERS_FILE = 'label_encoders.pkl'
+FEATURE_NAMES_FILE = 'feature_names.pkl'
+LAB_MEDIANS_FILE = 'lab_medians.json'
+METRICS_FILE = 'metrics.json'
+
+
+@metrics.timed('model_load_seconds', source='pickles')
+def load_model_artifacts(models_path=DEFAULT_MODELS):
+    """Load trained model, encoders, and feature names"""
+    with open(os.path.join(models_path, MODEL_FILE), 'rb') as f:
+        model = pickle.load(f)
+    # The saved forest was trained with verbose=1; silence per-call joblib progress output
+    model.verbose = 0
+
+    with open(os.path.join(models_path, ENCODERS_FILE), 'rb') as f:
+        encoders = pickle.load(f)
+
+    with open(os.path.join(models_path, FEATURE_NAMES_FILE), 'rb') as f:
+        feature_names = pickle.load(f)
+
+    return model, encoders, feature_names
+
+
+def model_version(models_path=DEFAULT_MODELS):
+    """Short content hash of the pickled model, identifying it in cache keys, registries and bundles."""
+    path = os.path.join(models_path, MODEL_FILE)
+    stat = os.stat(path)
+    return _file_version(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=32)
+def _file_version(path, size, mtime_ns):
+    # Keyed on size and mtime: a re-exported pickle is hashed again, an unchanged one only once
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def bundle_manifest(models_path=DEFAULT_MODELS):
+    """Manifest of the bundle in ``models_path`` if it holds the same model as the pickles, else None."""
+    path = os.path.join(models_path, BUNDLE_DIR, MANIFEST_FILE)
+    if not os.path.exists(path) or not os.path.exists(os.path.join(models_path, MODEL_FILE)):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest if manifest.get('model_version') == model_version(models_path) else None
+
+
+def load_model_bundle(models_path=DEFAULT_MODELS, verify=True):
+    """The memory-mapped bundle of the model in ``models_path``, or None when there is no current one."""
+    if bundle_manifest(models_path) is None:
+        return None
+    return load_bundle(os.path.join(models_path, BUNDLE_DIR), verify=verify)
+
+
+def _recorded(models_path, filename, manifest_key):
+    path = os.path.join(models_path, filename)
+    if os.path.exists(path):
+        with open(path) as f:
+            recorded = json.load(f)
+        if recorded:
+            return recorded
+    return (bundle_manifest(models_path) or {}).get(manifest_key) or None
+
+
+def load_lab_medians(models_path=DEFAULT_MODELS):
+    """Training lab medians (``lab_medians.json``, else the current bundle's manifest), or None if not recorded."""
+    return _recorded(models_path, LAB_MEDIANS_FILE, 'lab_medians')
+
+
+def load_metrics(models_path=DEFAULT_MODELS):
+    """Evaluation metrics recorded at export (``metrics.json``, else the current bundle's manifest), or None."""
+    return _recorded(models_path, METRICS_FILE, 'metrics')
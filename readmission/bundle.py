@@ -0,0 +1,218 @@
+"""Single versioned model bundle with memory-mapped tree arrays.
+
+A bundle is a directory holding everything inference needs from one
+training run:
+
+    <bundle>/manifest.json   format version, model version, checksum, feature
+                             order, encoder vocabularies, lab imputation
+                             medians, evaluation metrics, array index
+    <bundle>/<array>.npy     FlatForest node arrays (forest.ARRAY_NAMES)
+
+The checksum is a sha256 over the arrays and the manifest content. The
+model version is the one of the pickles the bundle was exported from
+(``artifacts.model_version``), so the bundle, the registry and prediction
+caches all name a model the same way; a bundle written without pickles
+falls back to the checksum's first 12 hex digits. Arrays are opened with ``mmap_mode='r'``: loading reads only
+the manifest, and worker processes share the tree pages through the OS page
+cache instead of each unpickling its own copy.
+
+Usage:
+    python -m readmission bundle --models-dir models/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from readmission import metrics
+from readmission.forest import ARRAY_NAMES, FlatForest
+
+BUNDLE_DIR = 'bundle'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+# Manifest keys covered by the checksum (everything but provenance fields)
+CHECKSUM_KEYS = ['format_version', 'classes', 'feature_names', 'vocabularies', 'lab_medians', 'metrics',
+                 'max_depth', 'arrays']
+
+
+class BundleError(Exception):
+    """Raised for unreadable, incompatible or corrupted bundles."""
+
+
+def _checksum(manifest, arrays):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({key: manifest[key] for key in CHECKSUM_KEYS}, sort_keys=True).encode())
+    for name in ARRAY_NAMES:
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return digest.hexdigest()
+
+
+def write_bundle(path, model, label_encoders, feature_names, lab_medians=None, metrics=None, model_version=None):
+    """Export a fitted forest and its preprocessing into a bundle at ``path``.
+
+    Returns the manifest. The directory is written next to ``path`` and
+    renamed into place, so readers never see a partial bundle.
+    """
+    path = Path(path)
+    forest = FlatForest.from_sklearn(model)
+    arrays = forest.arrays()
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'classes': forest.classes_.tolist(),
+        'feature_names': list(feature_names),
+        'vocabularies': {col: [str(value) for value in encoder.classes_] for col, encoder in label_encoders.items()},
+        'lab_medians': {col: float(value) for col, value in lab_medians.items()} if lab_medians else None,
+        'metrics': metrics or {},
+        'max_depth': forest.max_depth,
+        'arrays': {name: {'dtype': str(arrays[name].dtype), 'shape': list(arrays[name].shape)}
+                   for name in ARRAY_NAMES},
+    }
+    manifest['checksum'] = _checksum(manifest, arrays)
+    manifest['model_version'] = model_version or manifest['checksum'][:12]
+    manifest['created'] = datetime.now().isoformat(timespec='seconds')
+
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.mkdir(parents=True, exist_ok=True)
+    for name in ARRAY_NAMES:
+        np.save(tmp / f'{name}.npy', arrays[name])
+    (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    if path.exists():
+        old = path.with_name(path.name + '.old')
+        os.replace(path, old)
+        os.replace(tmp, path)
+        for child in old.iterdir():
+            child.unlink()
+        old.rmdir()
+    else:
+        os.replace(tmp, path)
+    return manifest
+
+
+class ModelBundle:
+    """A loaded bundle; tree arrays are mapped on first use of ``forest``."""
+
+    def __init__(self, path, manifest, mmap=True):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.mmap = mmap
+        self._forest = None
+
+    @property
+    def version(self):
+        return self.manifest['model_version']
+
+    @property
+    def checksum(self):
+        return self.manifest['checksum']
+
+    @property
+    def feature_names(self):
+        return self.manifest['feature_names']
+
+    @property
+    def vocabularies(self):
+        return self.manifest['vocabularies']
+
+    @property
+    def lab_medians(self):
+        return self.manifest['lab_medians']
+
+    @property
+    def metrics(self):
+        return self.manifest['metrics']
+
+    def arrays(self):
+        """Node arrays keyed by ``ARRAY_NAMES``, memory-mapped read-only unless ``mmap=False``."""
+        arrays = {}
+        for name in ARRAY_NAMES:
+            array = np.load(self.path / f'{name}.npy', mmap_mode='r' if self.mmap else None)
+            spec = self.manifest['arrays'][name]
+            if str(array.dtype) != spec['dtype'] or list(array.shape) != spec['shape']:
+                raise BundleError(f"{self.path}: {name}.npy does not match the manifest")
+            arrays[name] = array
+        return arrays
+
+    @property
+    def forest(self):
+        if self._forest is None:
+            self._forest = FlatForest(self.arrays(), self.manifest['classes'], self.feature_names,
+                                      self.manifest['max_depth'])
+        return self._forest
+
+    def verify(self):
+        """Recompute the checksum over the stored arrays; raises BundleError on mismatch."""
+        if _checksum(self.manifest, self.arrays()) != self.checksum:
+            raise BundleError(f"{self.path}: checksum mismatch, bundle is corrupted or was modified")
+
+    def label_encoders(self):
+        """sklearn LabelEncoders rebuilt from the vocabularies (for code using ``transform``)."""
+        # Loading a bundle for inference does not need sklearn
+        from sklearn.preprocessing import LabelEncoder
+
+        encoders = {}
+        for col, classes in self.vocabularies.items():
+            encoder = LabelEncoder()
+            encoder.classes_ = np.asarray(classes, dtype=object)
+            encoders[col] = encoder
+        return encoders
+
+    def predict_proba(self, X):
+        """Class probabilities for encoded rows; identical to the source model."""
+        return self.forest.predict_proba(X)
+
+
+@metrics.timed('model_load_seconds', source='bundle')
+def load_bundle(path, mmap=True, verify=True):
+    """Open a bundle written by ``write_bundle``.
+
+    Only the manifest is read up front (plus the arrays when ``verify``
+    checks the checksum); tree arrays are memory-mapped on first use.
+    """
+    path = Path(path)
+    try:
+        manifest = json.loads((path / MANIFEST_FILE).read_text())
+    except (OSError, ValueError) as exc:
+        raise BundleError(f"{path}: cannot read {MANIFEST_FILE}: {exc}") from exc
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise BundleError(f"{path}: unsupported bundle format {manifest.get('format_version')!r}")
+    bundle = ModelBundle(path, manifest, mmap)
+    if verify:
+        bundle.verify()
+    return bundle
+
+
+def main(argv=None):
+    # Not at module level: artifacts imports training, which imports this module
+    from readmission.artifacts import (
+        DEFAULT_MODELS, load_lab_medians, load_metrics, load_model_artifacts, model_version
+    )
+
+    parser = argparse.ArgumentParser(prog='python -m readmission bundle',
+                                     description='Build a model bundle from the pickled artifacts')
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS))
+    parser.add_argument('--output', default=None, help=f'bundle directory (default: <models-dir>/{BUNDLE_DIR})')
+    parser.add_argument('--lab-medians', default=None,
+                        help='JSON file with the training lab medians (default: <models-dir>/lab_medians.json)')
+    parser.add_argument('--metrics', default=None,
+                        help='JSON file with evaluation metrics (default: <models-dir>/metrics.json)')
+    parser.add_argument('--model-version', default=None, help='version label (default: the pickle hash)')
+    args = parser.parse_args(argv)
+
+    model, encoders, feature_names = load_model_artifacts(args.models_dir)
+    version = args.model_version or model_version(args.models_dir)
+    # Default to what export recorded next to the pickles
+    lab_medians = (json.loads(Path(args.lab_medians).read_text()) if args.lab_medians
+                   else load_lab_medians(args.models_dir))
+    metrics = json.loads(Path(args.metrics).read_text()) if args.metrics else load_metrics(args.models_dir)
+    output = args.output or os.path.join(args.models_dir, BUNDLE_DIR)
+    manifest = write_bundle(output, model, encoders, feature_names, lab_medians, metrics, version)
+
+    print(f"✓ Bundle {manifest['model_version']} written to {output}")
+    print(f"  checksum: {manifest['checksum']}")
+    if lab_medians is None:
+        print("  ⚠ no lab medians recorded; scoring rows with a missing lab value will fail")
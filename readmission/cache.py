@@ -0,0 +1,97 @@
+"""Bounded prediction cache with LRU eviction and a TTL.
+
+Entries are keyed on the model version plus the encoded feature vector
+(float64 bytes of the 10 model inputs, with -0.0 folded into 0.0), so the
+same admission scored by the UI, the HTTP service or a batch scorer hits
+the same entry, and a retrained model never serves stale probabilities.
+
+    cache = PredictionCache(maxsize=4096, ttl_seconds=3600)
+    proba = cache.predict_proba(X_encoded, model.predict_proba, model_version)
+    cache.stats()   # hits, misses, evictions, expirations, size, hit_rate
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+def feature_key(model_version, row):
+    """Cache key for one encoded feature vector."""
+    # Adding 0.0 turns -0.0 into 0.0, which would otherwise hash differently
+    return model_version, (np.asarray(row, dtype=np.float64) + 0.0).tobytes()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of per-row class probabilities with a time-to-live."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached value for ``key``, or None (counted as a miss) when absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires >= self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def predict_proba(self, X, predict_fn, model_version):
+        """Probabilities for encoded rows ``X``; only cache misses go to ``predict_fn``, in one call."""
+        values = X.to_numpy(dtype=np.float64) if hasattr(X, 'to_numpy') else np.asarray(X, dtype=np.float64)
+        keys = [feature_key(model_version, row) for row in values]
+        cached = [self.get(key) for key in keys]
+        missing = [i for i, value in enumerate(cached) if value is None]
+        if missing:
+            scored = predict_fn(X.iloc[missing] if hasattr(X, 'iloc') else values[missing])
+            for i, proba in zip(missing, scored):
+                # Copy, so the entry does not keep the whole batch result alive
+                cached[i] = proba.copy()
+                self.put(keys[i], cached[i])
+        return np.vstack(cached)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,107 @@
+"""Raw EMR table loading and cleaning (data-cleaning.ipynb, sections 2 and 9)."""
+
+import os
+
+import pandas as pd
+
+from readmission.schema import read_emr_table
+
+RAW_FILES = {
+    'patients': 'PatientCorePopulatedTable.txt',
+    'admissions': 'AdmissionsCorePopulatedTable.txt',
+    'diagnoses': 'AdmissionsDiagnosesCorePopulatedTable.txt',
+    'labs': 'LabsCorePopulatedTable.txt'
+}
+
+
+def raw_paths(dataset_path):
+    """Full paths of the four raw TSV files in ``dataset_path``."""
+    return {name: os.path.join(dataset_path, filename) for name, filename in RAW_FILES.items()}
+
+
+def load_raw_tables(dataset_path, compact=True):
+    """Load the four raw tab-separated tables.
+
+    By default with the compact schema (``readmission.schema``); pass
+    ``compact=False`` for pandas' default inference.
+    """
+    return {name: read_emr_table(path, name, compact=compact) for name, path in raw_paths(dataset_path).items()}
+
+
+# Values the data-cleaning notebook treats as missing in the patients table
+MISSING_VALUES = ['Unknown', '']
+
+# Fill value per demographic column once missing values are cleared
+PATIENT_FILLS = {
+    'PatientGender': 'Unknown',
+    'PatientRace': 'Unknown',
+    'PatientMaritalStatus': 'Unknown',
+    'PatientLanguage': 'English'
+}
+
+
+def _clear_missing(series):
+    """``series`` with 'Unknown' and empty strings set to NaN."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Dropping the categories clears every matching row without touching the others
+        return series.cat.remove_categories([value for value in MISSING_VALUES if value in series.cat.categories])
+    if series.dtype == object:
+        return series.mask(series.isin(MISSING_VALUES))
+    return series
+
+
+def _fill_missing(series, value):
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def clean_patients(patients_df):
+    """Replace 'Unknown'/empty values and fill demographic gaps.
+
+    Works column by column on the category dictionaries (compact schema)
+    or with one ``isin`` mask per string column, instead of rewriting the
+    whole frame with ``replace``; the result equals the notebook's.
+    """
+    patients_cleaned = patients_df.copy()
+    for col in patients_cleaned.columns:
+        series = _clear_missing(patients_cleaned[col])
+        if col in PATIENT_FILLS:
+            series = _fill_missing(series, PATIENT_FILLS[col])
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Same dictionary as re-categorizing the cleaned values: used values, sorted
+            series = series.cat.remove_unused_categories()
+            series = series.cat.reorder_categories(sorted(series.cat.categories))
+        patients_cleaned[col] = series
+
+    # Fill missing poverty percentage with median
+    median_poverty = patients_df['PatientPopulationPercentageBelowPoverty'].median()
+    patients_cleaned['PatientPopulationPercentageBelowPoverty'] = (
+        patients_cleaned['PatientPopulationPercentageBelowPoverty'].fillna(median_poverty)
+    )
+    return patients_cleaned
+
+
+def clean_admissions(admissions_df):
+    """Remove records with null dates."""
+    return admissions_df.dropna(subset=['AdmissionStartDate', 'AdmissionEndDate'])
+
+
+def clean_diagnoses(diagnoses_df):
+    """Remove records with null diagnosis."""
+    return diagnoses_df.dropna(subset=['PrimaryDiagnosisCode', 'PrimaryDiagnosisDescription'])
+
+
+def clean_labs(labs_df):
+    """Remove records with null essential fields."""
+    return labs_df.dropna(subset=['LabName', 'LabValue'])
+
+
+def clean_tables(raw_tables):
+    """Clean all four tables; returns a dict keyed like ``RAW_FILES``."""
+    return {
+        'patients': clean_patients(raw_tables['patients']),
+        'admissions': clean_admissions(raw_tables['admissions']),
+        'diagnoses': clean_diagnoses(raw_tables['diagnoses']),
+        'labs': clean_labs(raw_tables['labs'])
+    }
@@ -0,0 +1,198 @@
+"""Compiled feature encoding for single requests and batches.
+
+``FeatureEncoder`` turns raw feature rows (``PatientGender`` as
+"Male"/"Female", ``DiagnosisChapter`` as the ICD-10 letter the model was
+trained on) into the model's input frame. The lookups are built once from
+the saved encoder classes (or a bundle's vocabularies), so encoding a batch
+is one hash lookup per value instead of a ``LabelEncoder.transform`` call
+per column and request:
+
+    encoder = FeatureEncoder.from_encoders(encoders, feature_names, load_lab_medians())
+    X, unknown = encoder.transform(raw_df, on_unknown='flag')
+    X, unknown = encoder.encode_records([{...}], on_unknown='raise')   # small requests
+
+``encode_records`` applies the same rules to a list of feature dicts with
+plain dict lookups; building a DataFrame costs more than scoring a small
+request.
+
+Training encodes ``DiagnosisChapter`` as the first letter of the primary
+ICD-10 code. The UI offers chapter labels such as "IX - Circulatory
+system" instead, so each label in ``CHAPTER_LABELS`` is an alias for the
+first of its chapter's letters that is in the trained vocabulary. Bare
+letters are not aliased: "I" is always the letter I (circulatory), as in
+the batch scorer and the HTTP service.
+
+Unknown categories are never hidden: ``on_unknown='raise'`` raises
+``UnknownCategoryError``, ``'flag'`` encodes them as ``FALLBACK_CODE`` (the
+value the UI used to fall back to) and reports them; ``unknown_flags``
+turns the report into a per-row column. Missing labs get the training
+medians; without recorded medians a missing lab is an error.
+"""
+
+import numpy as np
+import pandas as pd
+
+from readmission.features import CATEGORICAL_COLUMNS, LAB_COLUMNS
+
+FALLBACK_CODE = 0
+
+# ICD-10 chapters as offered in the UI: (roman numeral, title, first letters of its codes)
+ICD10_CHAPTERS = [
+    ('I', 'Infectious diseases', 'AB'),
+    ('II', 'Neoplasms', 'CD'),
+    ('III', 'Blood/immune disorders', 'D'),
+    ('IV', 'Endocrine/nutritional/metabolic', 'E'),
+    ('V', 'Mental disorders', 'F'),
+    ('VI', 'Nervous system', 'G'),
+    ('VII', 'Eye disorders', 'H'),
+    ('VIII', 'Ear disorders', 'H'),
+    ('IX', 'Circulatory system', 'I'),
+    ('X', 'Respiratory system', 'J'),
+    ('XI', 'Digestive system', 'K'),
+    ('XII', 'Skin disorders', 'L'),
+    ('XIII', 'Musculoskeletal system', 'M'),
+    ('XIV', 'Genitourinary system', 'N'),
+    ('XV', 'Pregnancy/childbirth', 'O'),
+    ('XVI', 'Perinatal conditions', 'P'),
+    ('XVII', 'Congenital abnormalities', 'Q'),
+    ('XVIII', 'Symptoms/signs', 'R'),
+    ('XIX', 'Injury/poisoning', 'ST'),
+    ('XX', 'External causes', 'VWXY'),
+    ('XXI', 'Health status factors', 'Z'),
+]
+CHAPTER_LABELS = [f'{roman} - {title}' for roman, title, _ in ICD10_CHAPTERS]
+
+
+class UnknownCategoryError(ValueError):
+    """Raised for categorical values outside the trained vocabulary."""
+
+    def __init__(self, unknown):
+        self.unknown = unknown
+        details = '; '.join(f"{col}: {', '.join(map(repr, values))}" for col, values in unknown.items())
+        super().__init__(f"values not seen in training: {details}")
+
+
+def unknown_flags(features_df, unknown):
+    """Per-row ``;``-separated names of the columns holding an unknown value ('' when none)."""
+    flags = pd.Series('', index=features_df.index, dtype=object)
+    for col, values in unknown.items():
+        flags = flags.where(~features_df[col].astype(str).isin(values), flags + col + ';')
+    return flags.str.rstrip(';')
+
+
+def chapter_aliases(vocabulary):
+    """UI chapter label -> trained DiagnosisChapter letter, for chapters the model has seen."""
+    vocabulary = set(vocabulary)
+    aliases = {}
+    for label, (_, _, letters) in zip(CHAPTER_LABELS, ICD10_CHAPTERS):
+        trained = [letter for letter in letters if letter in vocabulary]
+        if trained:
+            aliases[label] = trained[0]
+    return aliases
+
+
+class FeatureEncoder:
+    """Raw feature rows -> the model's encoded input frame, with explicit unknown handling."""
+
+    def __init__(self, feature_names, vocabularies, lab_medians=None):
+        self.feature_names = list(feature_names)
+        self.vocabularies = {col: [str(value) for value in classes] for col, classes in vocabularies.items()
+                             if col in CATEGORICAL_COLUMNS}
+        self.lab_medians = {col: float(value) for col, value in lab_medians.items()} if lab_medians else None
+        self.lookups = {col: {value: code for code, value in enumerate(classes)}
+                        for col, classes in self.vocabularies.items()}
+        if 'DiagnosisChapter' in self.lookups:
+            lookup = self.lookups['DiagnosisChapter']
+            for label, letter in chapter_aliases(lookup).items():
+                lookup.setdefault(label, lookup[letter])
+
+    @classmethod
+    def from_encoders(cls, encoders, feature_names, lab_medians=None):
+        """From fitted LabelEncoders (or vocabulary lists) as saved by training."""
+        return cls(feature_names, {col: getattr(encoder, 'classes_', encoder) for col, encoder in encoders.items()},
+                   lab_medians)
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls(bundle.feature_names, bundle.vocabularies, bundle.lab_medians)
+
+    def code(self, col, value):
+        """Code of one raw categorical value, or None when it is unknown."""
+        return self.lookups[col].get(str(value))
+
+    def transform(self, features_df, on_unknown='raise'):
+        """Encode raw rows; returns ``(X, unknown)``.
+
+        ``X`` has the model's columns in training order. ``unknown`` maps
+        each categorical column with unseen values to the sorted distinct
+        raw values (empty when all were known). With ``on_unknown='raise'``
+        any unseen value raises ``UnknownCategoryError`` instead.
+        """
+        if on_unknown not in ('raise', 'flag'):
+            raise ValueError(f"on_unknown must be 'raise' or 'flag', got {on_unknown!r}")
+        missing = [col for col in self.feature_names if col not in features_df.columns]
+        if missing:
+            raise ValueError(f"missing features: {', '.join(missing)}")
+
+        X = features_df[self.feature_names].copy()
+        unknown = {}
+        for col, lookup in self.lookups.items():
+            if col not in X.columns:
+                continue
+            raw = X[col].astype(str)
+            codes = raw.map(lookup)
+            unseen = codes.isna().to_numpy()
+            if unseen.any():
+                unknown[col] = sorted(raw[unseen].unique())
+            X[col] = codes.fillna(FALLBACK_CODE).astype(np.int64)
+        if unknown and on_unknown == 'raise':
+            raise UnknownCategoryError(unknown)
+
+        for col in LAB_COLUMNS:
+            if col not in X.columns or not X[col].isna().any():
+                continue
+            if self.lab_medians is None:
+                raise ValueError(f"missing {col} and no training lab medians were recorded for this model")
+            X[col] = X[col].fillna(self.lab_medians[col])
+        numeric = [col for col in self.feature_names if col not in self.lookups]
+        nulls = [col for col in numeric if X[col].isna().any()]
+        if nulls:
+            raise ValueError(f"null values for {', '.join(nulls)}")
+        return X, unknown
+
+    def transform_records(self, records, on_unknown='raise'):
+        """``transform`` for a list of feature dicts (one per row)."""
+        return self.transform(pd.DataFrame.from_records(records), on_unknown)
+
+    def encode_records(self, records, on_unknown='raise'):
+        """Encode a list of feature dicts into a float array; returns ``(X, unknown)`` as ``transform``."""
+        if on_unknown not in ('raise', 'flag'):
+            raise ValueError(f"on_unknown must be 'raise' or 'flag', got {on_unknown!r}")
+        if not records:
+            raise ValueError("no instances given")
+        X = np.empty((len(records), len(self.feature_names)))
+        unknown = {}
+        for i, record in enumerate(records):
+            missing = [col for col in self.feature_names if col not in record]
+            if missing:
+                raise ValueError(f"missing features: {', '.join(missing)}")
+            for j, col in enumerate(self.feature_names):
+                value = record[col]
+                if col in self.lookups:
+                    code = self.lookups[col].get(str(value))
+                    if code is None:
+                        unknown.setdefault(col, set()).add(str(value))
+                        code = FALLBACK_CODE
+                    X[i, j] = code
+                elif value is None or value != value:
+                    if col not in LAB_COLUMNS:
+                        raise ValueError(f"null values for {col}")
+                    if self.lab_medians is None:
+                        raise ValueError(f"missing {col} and no training lab medians were recorded for this model")
+                    X[i, j] = self.lab_medians[col]
+                else:
+                    X[i, j] = float(value)
+        unknown = {col: sorted(values) for col, values in unknown.items()}
+        if unknown and on_unknown == 'raise':
+            raise UnknownCategoryError(unknown)
+        return X, unknown
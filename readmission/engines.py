@@ -0,0 +1,90 @@
+"""Pluggable model engines for the training stage.
+
+An engine is an estimator family with its default parameters and the
+training set it expects:
+
+- ``random_forest``: the original ``RandomForestClassifier`` config, trained
+  on every readmitted admission plus 200 sampled non-readmitted ones.
+- ``hist_gb``: ``HistGradientBoostingClassifier`` on the full admission set.
+  Features are binned into histograms, classes are weighted instead of
+  subsampled, PatientGender/DiagnosisChapter are split as native
+  categoricals (on their label codes), and boosting stops early on a
+  held-out validation fraction.
+
+Every engine returns a fitted sklearn classifier with ``predict_proba`` and
+``classes_``, so scoring, the service and the UI work with either.
+"""
+
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from readmission.features import CATEGORICAL_COLUMNS
+
+DEFAULT_ENGINE = 'random_forest'
+
+RF_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 10,
+    'min_samples_leaf': 5,
+    'class_weight': 'balanced',
+    'random_state': 42,
+    'n_jobs': -1
+}
+
+HGB_PARAMS = {
+    'learning_rate': 0.1,
+    'max_iter': 500,
+    'max_leaf_nodes': 31,
+    'min_samples_leaf': 20,
+    'l2_regularization': 1.0,
+    'class_weight': 'balanced',
+    'early_stopping': True,
+    'validation_fraction': 0.1,
+    'n_iter_no_change': 20,
+    'random_state': 42
+}
+
+
+def fit_random_forest(X_train, y_train, params=None):
+    model = RandomForestClassifier(**{**RF_PARAMS, **(params or {})})
+    model.fit(X_train, y_train)
+    return model
+
+
+def fit_hist_gb(X_train, y_train, params=None):
+    # Label codes are small non-negative ints, as native categorical splits require
+    categorical = [col in CATEGORICAL_COLUMNS for col in X_train.columns]
+    model = HistGradientBoostingClassifier(categorical_features=categorical, **{**HGB_PARAMS, **(params or {})})
+    model.fit(X_train, y_train)
+    return model
+
+
+class Engine:
+    """A trainable estimator family.
+
+    ``param_key`` is the sub-dict of the pipeline's train parameters that
+    holds this engine's estimator parameters; ``full_data`` engines skip the
+    healthy-row subsampling in the balance stage.
+    """
+
+    def __init__(self, name, fit, default_params, param_key, full_data=False):
+        self.name = name
+        self.fit = fit
+        self.default_params = default_params
+        self.param_key = param_key
+        self.full_data = full_data
+
+
+ENGINES = {
+    'random_forest': Engine('random_forest', fit_random_forest, RF_PARAMS, 'rf'),
+    'hist_gb': Engine('hist_gb', fit_hist_gb, HGB_PARAMS, 'hgb', full_data=True),
+}
+
+
+def get_engine(name):
+    """Look up an engine by name; raises ValueError for unknown names."""
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown model engine {name!r}; expected one of {list(ENGINES)}") from None
+
@@ -0,0 +1,166 @@
+"""Cross-validated metrics and bootstrap confidence intervals for a trained model.
+
+The test-set metrics printed by the training notebook come from one
+80/20 split. This module adds two estimates of how much they vary:
+
+- ``cross_validate``: stratified k-fold CV of the engine on the training
+  frame, one fold per process.
+- ``bootstrap_metrics``: percentile confidence intervals over thousands
+  of bootstrap resamples of the test set.
+
+Metrics are computed from label counts per distinct score, so all
+resamples are evaluated with a few array operations instead of one
+sklearn call per metric and resample. A resample is a row of two count
+matrices: how many label-1 and label-0 test rows it drew at each distinct
+predicted probability, in ascending order. Accuracy, precision, recall
+and F1 are sums over the groups predicted positive (probability above
+0.5, as ``predict`` on a binary forest). ROC-AUC is the Mann-Whitney
+statistic: each positive beats the negatives below it and ties count one
+half, which is the value ``roc_auc_score`` returns. ``binary_metrics``
+applies the same counts to the whole test set and matches
+``training.evaluate_model``.
+
+Resamples are drawn in fixed-size tasks, each seeded from one
+``SeedSequence``, so intervals depend on ``random_state`` and not on the
+number of workers.
+"""
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from readmission.engines import get_engine
+from readmission.training import train_model
+
+METRIC_NAMES = ['accuracy', 'precision', 'recall', 'f1', 'roc_auc']
+THRESHOLD = 0.5
+DEFAULT_FOLDS = 5
+DEFAULT_RESAMPLES = 2000
+DEFAULT_CONFIDENCE = 0.95
+# Resample-by-row cells per bootstrap task (bounds the index matrix at ~32 MB)
+TASK_CELLS = 4_000_000
+
+
+def score_groups(proba):
+    """Group of each row (index into the ascending distinct scores) and whether each group is predicted 1."""
+    scores, groups = np.unique(np.asarray(proba, dtype=np.float64), return_inverse=True)
+    return groups.ravel(), scores > THRESHOLD
+
+
+def metrics_from_counts(positives, negatives, predicted):
+    """Metric arrays from ``(resamples, groups)`` label-1 / label-0 counts per ascending score group."""
+    positives = np.asarray(positives, dtype=np.float64)
+    negatives = np.asarray(negatives, dtype=np.float64)
+    n_pos = positives.sum(axis=1)
+    n_neg = negatives.sum(axis=1)
+    tp = positives[:, predicted].sum(axis=1)
+    fp = negatives[:, predicted].sum(axis=1)
+    fn = n_pos - tp
+    tn = n_neg - fp
+    # Positives outscore the negatives in lower groups; ties within a group count one half
+    below = np.cumsum(negatives, axis=1) - negatives
+    wins = (positives * (below + 0.5 * negatives)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'accuracy': (tp + tn) / (n_pos + n_neg),
+            # zero_division=0, as evaluate_model
+            'precision': np.where(tp + fp > 0, tp / (tp + fp), 0.0),
+            'recall': np.where(n_pos > 0, tp / n_pos, 0.0),
+            'f1': np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0),
+            'roc_auc': np.where((n_pos > 0) & (n_neg > 0), wins / (n_pos * n_neg), np.nan)
+        }
+
+
+def binary_metrics(y_true, proba):
+    """Accuracy, precision, recall, F1 and ROC-AUC of probabilities ``proba`` for label 1."""
+    labels = np.asarray(y_true).astype(bool)
+    groups, predicted = score_groups(proba)
+    positives = np.bincount(groups[labels], minlength=len(predicted))[None, :]
+    negatives = np.bincount(groups[~labels], minlength=len(predicted))[None, :]
+    return {name: float(values[0]) for name, values in metrics_from_counts(positives, negatives, predicted).items()}
+
+
+def resample_metrics(labels, groups, predicted, rows):
+    """Metric arrays of the resamples in ``rows`` (one row of test-row indices per resample)."""
+    n_resamples, n_groups = len(rows), len(predicted)
+    # Flat bin of (resample, score group); one bincount per label fills the count matrices
+    bins = np.arange(n_resamples)[:, None] * n_groups + groups[rows]
+    drawn_positive = labels[rows]
+    positives = np.bincount(bins[drawn_positive], minlength=n_resamples * n_groups).reshape(n_resamples, n_groups)
+    negatives = np.bincount(bins[~drawn_positive], minlength=n_resamples * n_groups).reshape(n_resamples, n_groups)
+    return metrics_from_counts(positives, negatives, predicted)
+
+
+def _bootstrap_task(labels, groups, predicted, resamples, seed):
+    rows = np.random.default_rng(seed).integers(0, len(groups), size=(resamples, len(groups)))
+    return resample_metrics(labels, groups, predicted, rows)
+
+
+def bootstrap_samples(y_true, proba, resamples=DEFAULT_RESAMPLES, random_state=42, workers=1):
+    """Each metric over ``resamples`` bootstrap resamples of the rows; returns ``{metric: array}``."""
+    labels = np.asarray(y_true).astype(bool)
+    groups, predicted = score_groups(proba)
+    per_task = max(1, min(resamples, TASK_CELLS // max(len(groups), 1)))
+    sizes = [min(per_task, resamples - start) for start in range(0, resamples, per_task)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(sizes))
+    task = functools.partial(_bootstrap_task, labels, groups, predicted)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            parts = list(pool.map(task, sizes, seeds))
+    else:
+        parts = [task(size, seed) for size, seed in zip(sizes, seeds)]
+    return {name: np.concatenate([part[name] for part in parts]) for name in METRIC_NAMES}
+
+
+def bootstrap_metrics(y_true, proba, resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, random_state=42,
+                      workers=1):
+    """Point value, percentile interval and standard error of each metric.
+
+    Returns ``{metric: {'value', 'low', 'high', 'std'}}``. Resamples that
+    draw a single class have no ROC-AUC and are left out of its interval.
+    """
+    point = binary_metrics(y_true, proba)
+    samples = bootstrap_samples(y_true, proba, resamples, random_state, workers)
+    tail = (1 - confidence) / 2 * 100
+    summary = {}
+    for name in METRIC_NAMES:
+        values = samples[name][~np.isnan(samples[name])]
+        low, high = np.percentile(values, [tail, 100 - tail]) if len(values) else (np.nan, np.nan)
+        summary[name] = {'value': point[name], 'low': float(low), 'high': float(high),
+                         'std': float(values.std(ddof=1)) if len(values) > 1 else float('nan')}
+    return summary
+
+
+def _fit_fold(X, y, engine, params, split):
+    train_index, test_index = split
+    model = train_model(X.iloc[train_index], y.iloc[train_index], engine, params)
+    return binary_metrics(y.iloc[test_index], model.predict_proba(X.iloc[test_index])[:, 1])
+
+
+def cross_validate(X, y, engine, params=None, folds=DEFAULT_FOLDS, random_state=42, workers=1):
+    """Stratified k-fold metrics of ``engine``: ``{'folds', 'mean', 'std', 'per_fold'}``.
+
+    With ``workers > 1`` folds train in parallel processes and engines with
+    an ``n_jobs`` parameter are limited to one core each.
+    """
+    params = dict(params or {})
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and 'n_jobs' in get_engine(engine).default_params:
+        params['n_jobs'] = 1
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=random_state).split(X, y))
+    fit = functools.partial(_fit_fold, X, y, engine, params)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, folds)) as pool:
+            per_fold = list(pool.map(fit, splits))
+    else:
+        per_fold = [fit(split) for split in splits]
+    return {
+        'folds': folds,
+        'mean': {name: float(np.mean([fold[name] for fold in per_fold])) for name in METRIC_NAMES},
+        'std': {name: float(np.std([fold[name] for fold in per_fold], ddof=1)) for name in METRIC_NAMES},
+        'per_fold': per_fold
+    }
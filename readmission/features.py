@@ -0,0 +1,100 @@
+"""Readmission labels and the merged modelling frame (model-training.ipynb, sections 4-5)."""
+
+import pandas as pd
+
+# Model input columns, in the order the model was trained on
+FEATURE_COLUMNS = [
+    'LengthOfStay',           # Clinical: Longer stay = sicker patient
+    'PreviousAdmissions',     # Clinical: History of admissions = chronic issues
+    'PatientAge',             # Clinical: Age-related complications
+    'PatientGender',          # Clinical: Gender-specific conditions
+    'DiagnosisChapter',       # Clinical: Type of primary diagnosis
+    'NumLabs',                # Clinical: Lab intensity = monitoring needs
+    'hemoglobin_avg',         # Clinical: Anemia marker
+    'glucose_avg',            # Clinical: Diabetes/metabolic control
+    'creatinine_avg',         # Clinical: Kidney function
+    'wbc_avg'                 # Clinical: Infection/immune status
+]
+
+LAB_COLUMNS = ['hemoglobin_avg', 'glucose_avg', 'creatinine_avg', 'wbc_avg']
+CATEGORICAL_COLUMNS = ['PatientGender', 'DiagnosisChapter']
+TARGET_COLUMN = 'Readmitted_30days'
+
+READMISSION_WINDOW_DAYS = 30
+
+
+def create_readmission_labels(admissions_df):
+    """Add LengthOfStay, DaysToNextAdmission, Readmitted_30days and PreviousAdmissions.
+
+    Returns a copy sorted by PatientID and AdmissionStartDate.
+    """
+    admissions_df = admissions_df.copy()
+
+    # Convert dates
+    admissions_df['AdmissionStartDate'] = pd.to_datetime(admissions_df['AdmissionStartDate'])
+    admissions_df['AdmissionEndDate'] = pd.to_datetime(admissions_df['AdmissionEndDate'])
+
+    # Calculate length of stay
+    admissions_df['LengthOfStay'] = (admissions_df['AdmissionEndDate'] - admissions_df['AdmissionStartDate']).dt.days
+    admissions_df['LengthOfStay'] = admissions_df['LengthOfStay'].fillna(0)
+
+    # Sort by patient and date
+    admissions_df = admissions_df.sort_values(['PatientID', 'AdmissionStartDate'])
+
+    # Calculate days to next admission (observed=True: PatientID may be categorical)
+    by_patient = admissions_df.groupby('PatientID', observed=True)
+    admissions_df['NextAdmissionDate'] = by_patient['AdmissionStartDate'].shift(-1)
+    admissions_df['DaysToNextAdmission'] = (admissions_df['NextAdmissionDate'] - admissions_df['AdmissionEndDate']).dt.days
+
+    # Create 30-day readmission target
+    admissions_df[TARGET_COLUMN] = (admissions_df['DaysToNextAdmission'] <= READMISSION_WINDOW_DAYS).astype(int)
+
+    # Count previous admissions
+    admissions_df['PreviousAdmissions'] = by_patient.cumcount()
+
+    return admissions_df
+
+
+def patient_ages(patients_df, reference_date=None, fill_value=None):
+    """Age in years at ``reference_date`` (default: today).
+
+    Missing ages are filled with ``fill_value``, by default the median of
+    ``patients_df``.
+    """
+    reference = pd.Timestamp(reference_date) if reference_date is not None else pd.Timestamp('today')
+    dob = pd.to_datetime(patients_df['PatientDateOfBirth'])
+    ages = (reference - dob).dt.days / 365.25
+    return ages.fillna(ages.median() if fill_value is None else fill_value)
+
+
+def primary_diagnoses(diagnoses_df):
+    """First diagnosis row per admission."""
+    return diagnoses_df.groupby(['PatientID', 'AdmissionID'], observed=True).first().reset_index()
+
+
+def build_model_df(admissions_df, patients_df, diagnoses_df, lab_features, reference_date=None, age_fill=None):
+    """Merge labelled admissions with demographics, primary diagnosis and lab features.
+
+    ``age_fill`` replaces missing ages (default: the median age of ``patients_df``).
+    """
+    # Start with admissions
+    model_df = admissions_df[['PatientID', 'AdmissionID', 'LengthOfStay', 'PreviousAdmissions', TARGET_COLUMN]].copy()
+
+    # Merge with patients - ONLY MEDICAL INFO (Gender, Age)
+    patients = patients_df[['PatientID', 'PatientGender']].copy()
+    patients['PatientAge'] = patient_ages(patients_df, reference_date, age_fill)
+    model_df = model_df.merge(patients, on='PatientID', how='left')
+
+    # Merge with primary diagnosis
+    primary_diagnosis = primary_diagnoses(diagnoses_df)
+    model_df = model_df.merge(
+        primary_diagnosis[['PatientID', 'AdmissionID', 'PrimaryDiagnosisCode', 'PrimaryDiagnosisDescription']],
+        on=['PatientID', 'AdmissionID'],
+        how='left'
+    )
+
+    # Extract diagnosis chapter (first character of ICD code)
+    model_df['DiagnosisChapter'] = model_df['PrimaryDiagnosisCode'].str[0].fillna('Unknown')
+
+    # Merge with lab features
+    return model_df.merge(lab_features, on=['PatientID', 'AdmissionID'], how='left')
@@ -0,0 +1,205 @@
+"""Flattened NumPy inference engine for the fitted random forest.
+
+All estimators of a fitted ``RandomForestClassifier`` are exported into
+contiguous node arrays (feature, threshold, left child, missing_left and
+per-node class probabilities; the right child is always ``left + 1``) with
+child indices made global, so a batch
+is evaluated for every tree at once: one vectorized step per tree level
+instead of sklearn's per-call validation and per-estimator dispatch. This
+pays off for interactive and small-batch scoring (up to ~1k rows); larger
+chunks are faster through sklearn's compiled per-tree loops.
+
+Probabilities are bit-identical to ``model.predict_proba``: inputs are cast
+to float32 like sklearn does, leaf values are taken as sklearn returns them
+and per-tree probabilities are accumulated in estimator order.
+
+``contributions`` gives exact path-based per-row attributions from the
+same traversal: every split on a row's path moves the node value, and
+that change is credited to the split's feature.
+"""
+
+import numpy as np
+
+# Array names, in the order they are exported/attached
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'missing_left', 'value', 'roots']
+
+# Rows per traversal block in contributions(); bounds the (rows, trees, classes) temporaries
+CONTRIBUTION_BLOCK_ROWS = 2048
+
+
+class FlatForest:
+    """Random forest flattened into contiguous node arrays."""
+
+    def __init__(self, arrays, classes, feature_names=None, max_depth=None):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.missing_left = arrays['missing_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.classes_ = np.asarray(classes)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        if max_depth is None:
+            max_depth = _max_depth(self.left, self.roots)
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export a fitted RandomForestClassifier (single output)."""
+        parts = {name: [] for name in ARRAY_NAMES if name != 'roots'}
+        roots = []
+        offset = 0
+        for estimator in model.estimators_:
+            tree_arrays = _flatten_tree(estimator.tree_, model.n_classes_)
+            for name, values in tree_arrays.items():
+                parts[name].append(values)
+            parts['left'][-1] += offset
+            roots.append(offset)
+            offset += estimator.tree_.node_count
+
+        arrays = {name: np.concatenate(values) for name, values in parts.items()}
+        arrays['roots'] = np.asarray(roots, dtype=np.int32)
+        feature_names = getattr(model, 'feature_names_in_', None)
+        max_depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+        return cls(arrays, model.classes_, feature_names, max_depth)
+
+    def arrays(self):
+        """The node arrays, keyed by ``ARRAY_NAMES``."""
+        return {name: getattr(self, name) for name in ARRAY_NAMES}
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns') and self.feature_names is not None:
+            X = X[self.feature_names]
+        # sklearn evaluates trees on float32 inputs
+        return np.asarray(X, dtype=np.float32)
+
+    def apply(self, X):
+        """Global leaf index reached by every row in every tree, shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        flat_X = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, np.newaxis]
+        has_missing = np.isnan(flat_X).any()
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat_X[row_base + self.feature[nodes]]
+            # Right child is stored at left + 1; leaves have threshold +inf and loop on themselves
+            go_right = ~(x <= self.threshold[nodes])
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[nodes])
+            nodes = self.left[nodes] + go_right
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities, identical to the source forest's ``predict_proba``."""
+        leaves = self.apply(X)
+        # Reducing over the leading (tree) axis adds trees one after another in
+        # estimator order, as sklearn does, so rounding is identical
+        proba = np.add.reduce(self.value[leaves.T], axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def contributions(self, X):
+        """Exact path-based feature attributions of ``predict_proba``.
+
+        Returns ``(bias, contributions)``. ``bias`` has shape (n_classes,): the
+        root value averaged over trees, i.e. the training class balance the
+        forest starts from. ``contributions`` has shape (n_rows, n_features,
+        n_classes): for each feature, the change in node value over every
+        split on that feature along the row's path, averaged over trees.
+        ``bias + contributions.sum(axis=1)`` equals ``predict_proba(X)`` up to
+        floating-point rounding.
+        """
+        X = self._as_matrix(X)
+        n_rows, n_features = X.shape
+        n_classes = self.value.shape[1]
+        contributions = np.empty((n_rows, n_features, n_classes))
+        for start in range(0, n_rows, CONTRIBUTION_BLOCK_ROWS):
+            block = X[start:start + CONTRIBUTION_BLOCK_ROWS]
+            contributions[start:start + len(block)] = self._block_contributions(block)
+        return self.value[self.roots].mean(axis=0), contributions
+
+    def _block_contributions(self, X):
+        n_rows, n_features = X.shape
+        n_classes = self.value.shape[1]
+        flat_X = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_features)[:, np.newaxis]
+        has_missing = np.isnan(flat_X).any()
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        totals = np.zeros((n_classes, n_rows * n_features))
+        for _ in range(self.max_depth):
+            # (row, feature) slot of each split; also indexes the row's feature value
+            slots = row_base + self.feature[nodes]
+            x = flat_X[slots]
+            go_right = ~(x <= self.threshold[nodes])
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[nodes])
+            children = self.left[nodes] + go_right
+            # Leaves loop on themselves, so their change is zero
+            delta = self.value[children] - self.value[nodes]
+            for c in range(n_classes):
+                totals[c] += np.bincount(slots.ravel(), weights=delta[..., c].ravel(), minlength=totals.shape[1])
+            nodes = children
+        return totals.reshape(n_classes, n_rows, n_features).transpose(1, 2, 0) / self.n_trees
+
+
+def _flatten_tree(tree, n_classes):
+    """One tree's nodes renumbered so each right child sits right after its left sibling.
+
+    Returns per-node arrays with tree-local indices; leaves get feature 0
+    (gathers stay in bounds), threshold +inf, ``missing_left`` set and
+    ``left`` pointing to themselves, so extra traversal steps keep them in
+    place.
+    """
+    children_left = tree.children_left
+    children_right = tree.children_right
+    order = [0]
+    for node in order:
+        if children_left[node] != -1:
+            order.extend((children_left[node], children_right[node]))
+    order = np.asarray(order)
+    new_index = np.empty(tree.node_count, dtype=np.int32)
+    new_index[order] = np.arange(tree.node_count, dtype=np.int32)
+
+    is_leaf = children_left[order] == -1
+    missing_go_left = getattr(tree, 'missing_go_to_left', None)
+    missing_left = (np.zeros(tree.node_count, dtype=bool) if missing_go_left is None
+                    else np.asarray(missing_go_left, dtype=bool)[order])
+
+    # sklearn >= 1.4 stores class fractions and returns them as-is;
+    # older versions store counts and normalize in predict_proba
+    value = tree.value[order, 0, :n_classes].astype(np.float64)
+    normalizer = value.sum(axis=1)[:, np.newaxis]
+    if not np.allclose(normalizer, 1.0):
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+
+    return {
+        'feature': np.where(is_leaf, 0, tree.feature[order]).astype(np.int32),
+        'threshold': np.where(is_leaf, np.inf, tree.threshold[order]),
+        'left': np.where(is_leaf, np.arange(tree.node_count), new_index[np.maximum(children_left[order], 0)]).astype(np.int32),
+        'missing_left': missing_left | is_leaf,
+        'value': value
+    }
+
+
+def _max_depth(left, roots):
+    """Depth of the deepest leaf, following the global child arrays."""
+    nodes = np.asarray(roots)
+    depth = 0
+    while True:
+        moving = left[nodes] != nodes
+        if not moving.any():
+            return depth
+        nodes = np.concatenate([left[nodes[moving]], left[nodes[moving]] + 1])
+        depth += 1
@@ -0,0 +1,493 @@
+"""Indexed on-disk patient history for pre-filling the assessment form.
+
+One row per admission holds what the 10 model features need:
+``LengthOfStay`` and ``PreviousAdmissions`` (from
+``create_readmission_labels``), gender and date of birth, the primary
+diagnosis chapter, ``NumLabs`` and per-lab sums and counts. Storing sums
+and counts instead of averages keeps incremental lab updates additive,
+as in ``FeatureSnapshot``. The age is computed at lookup time, so it is
+always current.
+
+Rows are stored in sorted runs ("segments") of ``.npy`` column files,
+ordered by the 64-bit hash of PatientID (the hash ``storage`` partitions
+on) and AdmissionID. A lookup hashes the ID once, binary-searches the
+memory-mapped hash column and reads one row, with no table load and no
+query engine. A lookup takes well under a millisecond (p50 of about
+200-300 µs on a 50,000-patient store, ``benchmarks/bench_history_store.py``)
+and only the touched pages are read.
+
+Demographics (gender and date of birth) of every patient, including
+patients with no admission yet, are kept in their own segments of the
+same kind, one row per patient. A patient's first admission can then
+arrive in an update without the patient row being sent again.
+
+``update`` applies a delta of admissions, labs, diagnoses and patients.
+It re-labels every touched patient over their full stored history and
+writes all of that patient's rows into a new segment (and patient rows
+into a new demographics segment). A patient's rows in the newest segment
+that has the patient therefore replace older ones. Once there are more
+than ``MAX_SEGMENTS`` segments they are merged. ``store.json`` is
+replaced atomically after each change.
+
+Layout::
+
+    <root>/store.json
+    <root>/seg-00003/segment.json           categories of the coded columns
+    <root>/seg-00003/<column>.npy
+    <root>/pat-00000/...                    demographics, same format
+
+Usage:
+    python -m readmission history build --dataset dataset/ --out history_store/
+    python -m readmission history update --out history_store/ --admissions new.tsv --labs new_labs.tsv
+    python -m readmission history lookup --out history_store/ PATIENT_ID [ADMISSION_ID]
+"""
+
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from readmission import storage
+from readmission.cleaning import clean_admissions, clean_diagnoses, clean_labs, clean_patients, raw_paths
+from readmission.features import LAB_COLUMNS, create_readmission_labels, primary_diagnoses
+from readmission.ingest import LabSumsAccumulator, iter_lab_chunks
+from readmission.lab_features import KEY_COLUMNS, aggregate_lab_sums
+from readmission.schema import parse_dates, read_emr_table
+
+DEFAULT_STORE = Path(__file__).resolve().parents[1] / 'history_store'
+STORE_FILE = 'store.json'
+SEGMENT_FILE = 'segment.json'
+MAX_SEGMENTS = 8
+
+# Feature labs ('hemoglobin' for 'hemoglobin_avg', ...)
+LABS = [col[:-len('_avg')] for col in LAB_COLUMNS]
+SUM_COLUMNS = ['NumLabs'] + [f'{lab}_{part}' for lab in LABS for part in ('sum', 'count')]
+ADMISSION_COLUMNS = ['PatientID', 'AdmissionID', 'AdmissionStartDate', 'AdmissionEndDate']
+DEMOGRAPHIC_COLUMNS = ['PatientID', 'PatientGender', 'PatientDateOfBirth']
+CODED_COLUMNS = ['PatientGender', 'DiagnosisChapter']
+ROW_COLUMNS = (ADMISSION_COLUMNS + ['LengthOfStay', 'PreviousAdmissions', 'PatientGender', 'PatientDateOfBirth',
+                                    'DiagnosisChapter'] + SUM_COLUMNS)
+DATE_COLUMNS = ['AdmissionStartDate', 'AdmissionEndDate', 'PatientDateOfBirth']
+NS_PER_DAY = 86_400 * 10**9
+
+
+def patient_hash(patient_ids):
+    """64-bit hash of PatientID strings (the hash ``storage.partition_of`` uses)."""
+    return pd.util.hash_array(np.asarray(patient_ids, dtype=object))
+
+
+def _text(series):
+    return series.astype(str) if isinstance(series.dtype, pd.CategoricalDtype) else series
+
+
+def _prepare_admissions(admissions):
+    admissions = clean_admissions(admissions)[ADMISSION_COLUMNS].copy()
+    admissions['PatientID'] = _text(admissions['PatientID'])
+    admissions['AdmissionID'] = admissions['AdmissionID'].astype('int64')
+    return parse_dates(admissions, 'admissions')
+
+
+def _demographics(patients):
+    demographics = patients[DEMOGRAPHIC_COLUMNS].copy()
+    demographics['PatientID'] = _text(demographics['PatientID'])
+    demographics['PatientGender'] = _text(demographics['PatientGender'])
+    return parse_dates(demographics, 'patients').drop_duplicates('PatientID', keep='last')
+
+
+def _chapters(diagnoses):
+    primary = primary_diagnoses(clean_diagnoses(diagnoses))
+    chapters = primary[KEY_COLUMNS].copy()
+    chapters['PatientID'] = _text(chapters['PatientID'])
+    chapters['AdmissionID'] = chapters['AdmissionID'].astype('int64')
+    chapters['DiagnosisChapter'] = _text(primary['PrimaryDiagnosisCode']).str[0].to_numpy()
+    return chapters
+
+
+def _lab_sums(lab_sums):
+    sums = lab_sums[KEY_COLUMNS + SUM_COLUMNS].copy()
+    sums['PatientID'] = _text(sums['PatientID'])
+    sums['AdmissionID'] = sums['AdmissionID'].astype('int64')
+    return sums
+
+
+def history_rows(labelled, demographics, chapters, lab_sums):
+    """Store rows from labelled admissions and the per-patient / per-admission parts."""
+    rows = labelled[ADMISSION_COLUMNS + ['LengthOfStay', 'PreviousAdmissions']]
+    rows = rows.merge(demographics, on='PatientID', how='left')
+    rows = rows.merge(chapters, on=KEY_COLUMNS, how='left')
+    rows = rows.merge(lab_sums, on=KEY_COLUMNS, how='left')
+    # No lab rows for an admission: no tests were done
+    rows[SUM_COLUMNS] = rows[SUM_COLUMNS].fillna(0).astype('float64')
+    return rows[ROW_COLUMNS]
+
+
+class Segment:
+    """One sorted, memory-mapped run of store rows (or of demographics rows)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / SEGMENT_FILE).read_text())
+        self.categories = meta['categories']
+        self.arrays = {name: np.load(self.path / f'{name}.npy', mmap_mode='r') for name in meta['arrays']}
+        self.hashes = self.arrays['patient_hash']
+        self.columns = [name for name in meta['arrays'] if name != 'patient_hash']
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def write(path, rows, columns=ROW_COLUMNS):
+        """Sort ``rows`` (``columns``, PatientID first) and write them as a segment at ``path``."""
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+
+        ids = rows['PatientID'].to_numpy(dtype=object)
+        hashes = patient_hash(ids)
+        order = (np.lexsort((rows['AdmissionID'].to_numpy(), hashes)) if 'AdmissionID' in columns
+                 else np.argsort(hashes, kind='stable'))
+        arrays = {'patient_hash': hashes[order],
+                  'PatientID': np.char.encode(ids.astype(str), 'utf-8')[order]}
+        categories = {}
+        for col in columns[1:]:
+            values = rows[col]
+            if col in CODED_COLUMNS:
+                codes, uniques = pd.factorize(values, sort=True)
+                arrays[col] = codes.astype(np.int16)[order]
+                categories[col] = [str(value) for value in uniques]
+            elif col in DATE_COLUMNS:
+                arrays[col] = pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')[order]
+            else:
+                arrays[col] = values.to_numpy()[order]
+        for name, values in arrays.items():
+            np.save(tmp / f'{name}.npy', values)
+        (tmp / SEGMENT_FILE).write_text(json.dumps({'arrays': list(arrays), 'categories': categories,
+                                                     'rows': len(rows)}))
+        tmp.rename(path)
+
+    def positions(self, patient_id, hashed):
+        """Row positions of ``patient_id`` (empty when this segment does not have the patient)."""
+        lo = np.searchsorted(self.hashes, hashed, 'left')
+        hi = np.searchsorted(self.hashes, hashed, 'right')
+        if lo == hi:
+            return np.empty(0, dtype=np.intp)
+        # Distinct IDs may share a hash; keep only this patient's rows
+        return lo + np.flatnonzero(self.arrays['PatientID'][lo:hi] == patient_id.encode())
+
+    def rows(self, positions):
+        """Rows at ``positions`` as a DataFrame (the segment's columns)."""
+        positions = np.asarray(positions)
+        data = {'PatientID': np.char.decode(np.asarray(self.arrays['PatientID'][positions]), 'utf-8').astype(object)}
+        for col in self.columns[1:]:
+            values = np.asarray(self.arrays[col][positions])
+            if col in CODED_COLUMNS:
+                categories = np.append(np.array(self.categories[col], dtype=object), np.nan)
+                values = categories[values]
+            data[col] = values
+        return pd.DataFrame(data, columns=self.columns)
+
+
+class PatientHistoryStore:
+    """Segments of a store directory (admission rows and demographics), newest first for lookups."""
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = Path(root)
+        self._load()
+
+    def _load(self):
+        path = self.root / STORE_FILE
+        self.meta = json.loads(path.read_text())
+        self._mtime = os.stat(path).st_mtime_ns
+        self.segments = [Segment(self.root / name) for name in self.meta['segments']]
+        self.patient_segments = [Segment(self.root / name) for name in self.meta.get('patient_segments', [])]
+
+    def refresh(self):
+        """Reopen the segments if another process updated the store; returns True when it did."""
+        if os.stat(self.root / STORE_FILE).st_mtime_ns == self._mtime:
+            return False
+        self._load()
+        return True
+
+    @classmethod
+    def build(cls, root, admissions, patients, diagnoses, lab_sums):
+        """Write a new store at ``root`` from cleaned tables and ``aggregate_lab_sums`` output."""
+        root = Path(root)
+        if root.exists():
+            shutil.rmtree(root)
+        root.mkdir(parents=True)
+        labelled = create_readmission_labels(_prepare_admissions(admissions))
+        demographics = _demographics(patients)
+        rows = history_rows(labelled, demographics, _chapters(diagnoses), _lab_sums(lab_sums))
+        Segment.write(root / 'seg-00000', rows)
+        Segment.write(root / 'pat-00000', demographics, DEMOGRAPHIC_COLUMNS)
+        # Missing ages are filled with the median age, as in training: the mean age of the
+        # one or two middle birth dates, which gives the median at any reference date
+        births = demographics['PatientDateOfBirth'].dropna().sort_values()
+        middle = births.iloc[[(len(births) - 1) // 2, len(births) // 2]] if len(births) else []
+        meta = {'segments': ['seg-00000'], 'patient_segments': ['pat-00000'], 'next_segment': 1,
+                'median_birth_dates': [birth.isoformat() for birth in middle]}
+        cls._write_meta(root, meta)
+        return cls(root)
+
+    @staticmethod
+    def _write_meta(root, meta):
+        tmp = Path(root) / (STORE_FILE + '.tmp')
+        tmp.write_text(json.dumps(meta, indent=2))
+        os.replace(tmp, Path(root) / STORE_FILE)
+
+    def _write_segment(self, rows, prefix='seg', columns=ROW_COLUMNS):
+        """Write ``rows`` as the next segment and return its name once it opens; a bad segment is removed."""
+        name = f"{prefix}-{self.meta['next_segment']:05d}"
+        Segment.write(self.root / name, rows, columns)
+        try:
+            Segment(self.root / name)
+        except Exception:
+            shutil.rmtree(self.root / name, ignore_errors=True)
+            raise
+        return name
+
+    def _find(self, patient_id, segments=None):
+        """(segment, positions) of the newest segment holding ``patient_id``, or (None, empty).
+
+        Searches the admission segments, or ``segments``.
+        """
+        hashed = patient_hash([patient_id])[0]
+        for segment in reversed(self.segments if segments is None else segments):
+            positions = segment.positions(patient_id, hashed)
+            if len(positions):
+                return segment, positions
+        return None, np.empty(0, dtype=np.intp)
+
+    def admissions_of(self, patient_id):
+        """Stored AdmissionIDs of a patient, in ascending order."""
+        segment, positions = self._find(str(patient_id))
+        return [int(value) for value in segment.arrays['AdmissionID'][positions]] if segment else []
+
+    def lookup(self, patient_id, admission_id=None, reference_date=None):
+        """The 10 raw model features of one admission (default: the patient's latest), or None.
+
+        Also returns PatientID, AdmissionID and the admission dates. Lab
+        averages are NaN when the lab was not measured; the age is at
+        ``reference_date`` (default: today).
+        """
+        segment, positions = self._find(str(patient_id))
+        if segment is None:
+            return None
+        admissions = segment.arrays['AdmissionID'][positions]
+        if admission_id is None:
+            position = positions[np.argmax(segment.arrays['PreviousAdmissions'][positions])]
+        else:
+            match = positions[admissions == int(admission_id)]
+            if not len(match):
+                return None
+            position = match[0]
+        arrays = segment.arrays
+
+        def category(col):
+            code = int(arrays[col][position])
+            return segment.categories[col][code] if code >= 0 else None
+
+        reference = pd.Timestamp(reference_date) if reference_date is not None else pd.Timestamp('today')
+        birth = pd.Timestamp(arrays['PatientDateOfBirth'][position])
+        if pd.isna(birth):
+            ages = [(reference - pd.Timestamp(value)).days / 365.25 for value in self.meta['median_birth_dates']]
+            age = float(np.mean(ages)) if ages else np.nan
+        else:
+            age = (reference - birth).days / 365.25
+        record = {
+            'PatientID': str(patient_id),
+            'AdmissionID': int(arrays['AdmissionID'][position]),
+            'AdmissionStartDate': pd.Timestamp(arrays['AdmissionStartDate'][position]),
+            'AdmissionEndDate': pd.Timestamp(arrays['AdmissionEndDate'][position]),
+            'LengthOfStay': int(arrays['LengthOfStay'][position]),
+            'PreviousAdmissions': int(arrays['PreviousAdmissions'][position]),
+            'PatientAge': age,
+            'PatientGender': category('PatientGender'),
+            'DiagnosisChapter': category('DiagnosisChapter') or 'Unknown',
+            'NumLabs': float(arrays['NumLabs'][position]),
+        }
+        for lab in LABS:
+            count = arrays[f'{lab}_count'][position]
+            record[f'{lab}_avg'] = float(arrays[f'{lab}_sum'][position] / count) if count > 0 else np.nan
+        return record
+
+    def patient_rows(self, patient_ids):
+        """Current stored rows of ``patient_ids`` (``ROW_COLUMNS``)."""
+        frames = []
+        for patient_id in patient_ids:
+            segment, positions = self._find(patient_id)
+            if segment is not None:
+                frames.append(segment.rows(positions))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ROW_COLUMNS)
+
+    def demographics_of(self, patient_ids):
+        """Stored demographics of ``patient_ids`` (``DEMOGRAPHIC_COLUMNS``; unknown patients are left out)."""
+        frames = []
+        for patient_id in patient_ids:
+            segment, positions = self._find(patient_id, self.patient_segments)
+            if segment is not None:
+                frames.append(segment.rows(positions[-1:]))
+        return (pd.concat(frames, ignore_index=True) if frames
+                else pd.DataFrame(columns=DEMOGRAPHIC_COLUMNS).astype({'PatientDateOfBirth': 'datetime64[ns]'}))
+
+    def update(self, admissions=None, labs=None, diagnoses=None, patients=None):
+        """Apply a delta of raw (uncleaned) tables; returns the number of rows rewritten.
+
+        Admissions replace stored ones with the same (PatientID,
+        AdmissionID); lab rows are added to their admission's sums; a
+        diagnosis sets the chapter only of admissions that have none yet
+        (the first diagnosis row is the primary one); patient rows replace
+        demographics. Labs and diagnoses of admissions the store does not
+        know are dropped.
+        """
+        parts = {}
+        touched = set()
+        if admissions is not None and len(admissions):
+            parts['admissions'] = _prepare_admissions(admissions)
+        if labs is not None and len(labs):
+            parts['labs'] = _lab_sums(aggregate_lab_sums(clean_labs(labs)))
+        if diagnoses is not None and len(diagnoses):
+            parts['diagnoses'] = _chapters(diagnoses)
+        if patients is not None and len(patients):
+            parts['patients'] = _demographics(clean_patients(patients))
+        for part in parts.values():
+            touched.update(part['PatientID'].unique())
+        if not touched:
+            return 0
+
+        current = self.patient_rows(sorted(touched))
+        stored_admissions = parse_dates(current[ADMISSION_COLUMNS].astype({'AdmissionID': 'int64'}), 'admissions')
+        admissions = pd.concat([stored_admissions, parts.get('admissions')], ignore_index=True)
+        labelled = create_readmission_labels(admissions.drop_duplicates(KEY_COLUMNS, keep='last'))
+
+        # Stores built before the demographics segments only have them on admission rows
+        demographics = pd.concat([current[DEMOGRAPHIC_COLUMNS].drop_duplicates('PatientID'),
+                                  self.demographics_of(sorted(touched)), parts.get('patients')],
+                                 ignore_index=True).drop_duplicates('PatientID', keep='last')
+        chapters = pd.concat([current[KEY_COLUMNS + ['DiagnosisChapter']].dropna(subset=['DiagnosisChapter']),
+                              parts.get('diagnoses')], ignore_index=True).drop_duplicates(KEY_COLUMNS, keep='first')
+        # Patients new to the store have no current rows, whose empty frame is all object columns
+        sums = pd.concat([current[KEY_COLUMNS + SUM_COLUMNS], parts.get('labs')], ignore_index=True)
+        sums = sums.astype({'AdmissionID': 'int64', **{col: 'float64' for col in SUM_COLUMNS}})
+        sums = sums.groupby(KEY_COLUMNS, sort=False).sum().reset_index()
+
+        rows = history_rows(labelled, demographics.astype({'PatientGender': object}),
+                            chapters.astype({'AdmissionID': 'int64'}), sums)
+        meta = dict(self.meta, next_segment=self.meta['next_segment'] + 1)
+        # Patient rows of patients without admissions only go to the demographics
+        if len(rows):
+            meta['segments'] = self.meta['segments'] + [self._write_segment(rows)]
+        if 'patients' in parts:
+            patient_name = self._write_segment(parts['patients'].astype({'PatientGender': object}), 'pat',
+                                               DEMOGRAPHIC_COLUMNS)
+            meta['patient_segments'] = self.meta.get('patient_segments', []) + [patient_name]
+        self._write_meta(self.root, meta)
+        self._load()
+        if len(self.segments) > MAX_SEGMENTS or len(self.patient_segments) > MAX_SEGMENTS:
+            self.compact()
+        return len(rows)
+
+    def compact(self):
+        """Merge all segments into one (and the demographics segments into one).
+
+        Each patient's rows are kept from the newest segment that has them.
+        """
+        meta, old = dict(self.meta, next_segment=self.meta['next_segment'] + 1), []
+        for key, prefix, columns in (('segments', 'seg', ROW_COLUMNS),
+                                     ('patient_segments', 'pat', DEMOGRAPHIC_COLUMNS)):
+            segments = self.segments if key == 'segments' else self.patient_segments
+            if len(segments) <= 1:
+                continue
+            frames, newer = [], np.empty(0, dtype=np.uint64)
+            for segment in reversed(segments):
+                keep = ~np.isin(segment.hashes, newer)
+                frames.append(segment.rows(np.flatnonzero(keep)))
+                newer = np.union1d(newer, np.unique(segment.hashes))
+            meta[key] = [self._write_segment(pd.concat(frames[::-1], ignore_index=True), prefix, columns)]
+            old += self.meta[key]
+        if not old:
+            return
+        self._write_meta(self.root, meta)
+        self._load()
+        # Readers that still map the old files keep them until they reopen
+        for segment_name in old:
+            shutil.rmtree(self.root / segment_name, ignore_errors=True)
+
+
+def build_from_dataset(dataset_path, root=DEFAULT_STORE):
+    """Build from the raw dataset; labs are streamed, so they never have to fit in memory."""
+    paths = raw_paths(dataset_path)
+    accumulator = LabSumsAccumulator()
+    for chunk in iter_lab_chunks(paths['labs']):
+        accumulator.add(chunk)
+    tables = {name: read_emr_table(paths[name], name) for name in ('patients', 'admissions', 'diagnoses')}
+    return PatientHistoryStore.build(root, tables['admissions'], clean_patients(tables['patients']),
+                                     tables['diagnoses'], accumulator.sums())
+
+
+def build_from_tables(tables_root, root=DEFAULT_STORE):
+    """Build from a cleaned-table store, aggregating labs one PatientID partition at a time."""
+    n_partitions = storage.read_schema(tables_root, 'labs')['n_partitions']
+    lab_sums = pd.concat([
+        aggregate_lab_sums(storage.read_table(tables_root, 'labs', KEY_COLUMNS + ['LabName', 'LabValue'],
+                                              partitions=[partition]))
+        for partition in range(n_partitions)
+    ], ignore_index=True)
+    tables = {name: storage.read_table(tables_root, name) for name in ('patients', 'admissions', 'diagnoses')}
+    return PatientHistoryStore.build(root, tables['admissions'], tables['patients'], tables['diagnoses'], lab_sums)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission history',
+                                     description='Build, update or query the patient-history store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='build the store from the full tables')
+    source = build.add_mutually_exclusive_group(required=True)
+    source.add_argument('--dataset', help='directory with the raw *CorePopulatedTable.txt files')
+    source.add_argument('--tables', help='cleaned-table store (readmission.storage)')
+    build.add_argument('--out', default=str(DEFAULT_STORE), help='store directory to write')
+
+    update = commands.add_parser('update', help='apply a delta of new rows')
+    update.add_argument('--out', default=str(DEFAULT_STORE), help='store directory to update in place')
+    update.add_argument('--admissions', help='TSV shaped like AdmissionsCorePopulatedTable')
+    update.add_argument('--labs', help='TSV shaped like LabsCorePopulatedTable')
+    update.add_argument('--diagnoses', help='TSV shaped like AdmissionsDiagnosesCorePopulatedTable')
+    update.add_argument('--patients', help='TSV shaped like PatientCorePopulatedTable')
+
+    lookup = commands.add_parser('lookup', help='print the features of one admission')
+    lookup.add_argument('--out', default=str(DEFAULT_STORE), help='store directory')
+    lookup.add_argument('patient_id')
+    lookup.add_argument('admission_id', nargs='?', type=int, default=None, help='default: the latest admission')
+
+    compact = commands.add_parser('compact', help='merge all segments into one')
+    compact.add_argument('--out', default=str(DEFAULT_STORE), help='store directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        store = build_from_dataset(args.dataset, args.out) if args.dataset else build_from_tables(args.tables, args.out)
+        print(f"✓ Patient history store: {sum(len(s) for s in store.segments):,} admissions in {args.out}")
+    elif args.command == 'update':
+        store = PatientHistoryStore(args.out)
+        delta = {name: read_emr_table(path, name) if path else None
+                 for name, path in (('admissions', args.admissions), ('labs', args.labs),
+                                    ('diagnoses', args.diagnoses), ('patients', args.patients))}
+        rows = store.update(**delta)
+        print(f"✓ Rewrote {rows:,} admissions of the touched patients ({len(store.segments)} segments)")
+    elif args.command == 'lookup':
+        record = PatientHistoryStore(args.out).lookup(args.patient_id, args.admission_id)
+        if record is None:
+            print("✗ Not found")
+            return 1
+        print(json.dumps(record, indent=2, default=str))
+    else:
+        store = PatientHistoryStore(args.out)
+        store.compact()
+        print(f"✓ Compacted into {store.meta['segments'][0]}: {len(store.segments[0]):,} admissions")
+    return 0
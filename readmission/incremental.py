@@ -0,0 +1,164 @@
+"""Incremental label and lab-feature updates for daily admission deltas.
+
+A ``FeatureSnapshot`` holds the labelled admissions table (output of
+``create_readmission_labels``) and per-admission lab sums/counts. Applying a
+delta of new admissions and labs re-labels only the patients the delta
+touches, adds the delta's lab sums to the affected admissions, and refreshes
+``LabelClosed`` for every admission: a label is closed once the next
+admission is known or the 30-day window after discharge has passed, so the
+provisional 0 of an open window can still become 1 later.
+
+The updated snapshot is identical to a full recompute over all admissions
+and labs seen so far.
+
+Usage:
+    python -m readmission incremental init --dataset dataset/ --snapshot snapshot/
+    python -m readmission incremental update --snapshot snapshot/ --admissions new_admissions.txt --labs new_labs.txt
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from readmission import storage
+from readmission.cleaning import clean_admissions, clean_labs, raw_paths
+from readmission.features import READMISSION_WINDOW_DAYS, create_readmission_labels
+from readmission.ingest import LabSumsAccumulator, iter_lab_chunks
+from readmission.lab_features import CRITICAL_LABS, KEY_COLUMNS, aggregate_lab_sums, finalize_lab_features
+
+# Columns create_readmission_labels derives; stripped before re-labelling
+DERIVED_COLUMNS = ['LengthOfStay', 'NextAdmissionDate', 'DaysToNextAdmission',
+                   'Readmitted_30days', 'PreviousAdmissions', 'LabelClosed']
+DATE_COLUMNS = ['AdmissionStartDate', 'AdmissionEndDate']
+SNAPSHOT_FILE = 'snapshot.json'
+
+
+def close_labels(admissions_df, as_of):
+    """True where the 30-day label can no longer change as of ``as_of``."""
+    window_passed = (pd.Timestamp(as_of) - admissions_df['AdmissionEndDate']).dt.days > READMISSION_WINDOW_DAYS
+    return admissions_df['DaysToNextAdmission'].notna() | window_passed
+
+
+def _label(admissions_df, as_of):
+    labelled = create_readmission_labels(admissions_df)
+    labelled['LabelClosed'] = close_labels(labelled, as_of)
+    return labelled
+
+
+def _prepare_admissions(admissions_df):
+    admissions_df = clean_admissions(admissions_df).copy()
+    for col in DATE_COLUMNS:
+        admissions_df[col] = pd.to_datetime(admissions_df[col])
+    return admissions_df
+
+
+def _sorted_sums(lab_sums):
+    lab_sums = lab_sums.sort_values(KEY_COLUMNS).reset_index(drop=True)
+    lab_sums['AdmissionID'] = lab_sums['AdmissionID'].astype('int64')
+    return lab_sums
+
+
+class FeatureSnapshot:
+    """Labelled admissions plus per-admission lab sums, as of a date."""
+
+    def __init__(self, admissions, lab_sums, as_of, critical_labs=CRITICAL_LABS):
+        self.admissions = admissions
+        self.lab_sums = lab_sums
+        self.as_of = pd.Timestamp(as_of)
+        self.critical_labs = critical_labs
+
+    @classmethod
+    def build(cls, admissions_df, lab_sums, as_of, critical_labs=CRITICAL_LABS):
+        """Full computation from cleaned admissions and lab sums (``aggregate_lab_sums``)."""
+        return cls(_label(_prepare_admissions(admissions_df), as_of), _sorted_sums(lab_sums), as_of, critical_labs)
+
+    def update(self, delta_admissions=None, delta_labs=None, as_of=None):
+        """Return a new snapshot with the delta applied.
+
+        Admissions in the delta replace any stored admission with the same
+        (PatientID, AdmissionID). Only the delta's patients are re-labelled.
+        """
+        as_of = pd.Timestamp(as_of) if as_of is not None else self.as_of
+        admissions = self.admissions
+
+        if delta_admissions is not None and len(delta_admissions):
+            delta = _prepare_admissions(delta_admissions)
+            touched = admissions['PatientID'].isin(delta['PatientID'].unique())
+            patient_rows = pd.concat(
+                [admissions.loc[touched].drop(columns=DERIVED_COLUMNS), delta], ignore_index=True
+            ).drop_duplicates(subset=KEY_COLUMNS, keep='last')
+            admissions = pd.concat([admissions.loc[~touched], _label(patient_rows, as_of)], ignore_index=True)
+            admissions = admissions.sort_values(['PatientID', 'AdmissionStartDate']).reset_index(drop=True)
+
+        # Windows that have passed since the last snapshot close for every patient
+        admissions = admissions.copy()
+        admissions['LabelClosed'] = close_labels(admissions, as_of)
+
+        lab_sums = self.lab_sums
+        if delta_labs is not None and len(delta_labs):
+            delta_sums = aggregate_lab_sums(clean_labs(delta_labs), self.critical_labs)
+            touched = lab_sums['PatientID'].isin(delta_sums['PatientID'].unique())
+            merged = pd.concat([lab_sums.loc[touched], delta_sums], ignore_index=True)
+            merged = merged.groupby(KEY_COLUMNS, sort=False, observed=True).sum().reset_index()
+            lab_sums = _sorted_sums(pd.concat([lab_sums.loc[~touched], merged], ignore_index=True))
+
+        return FeatureSnapshot(admissions, lab_sums, as_of, self.critical_labs)
+
+    def lab_features(self):
+        """The ``lab_features`` frame for all admissions in the snapshot."""
+        return finalize_lab_features(self.lab_sums, self.critical_labs)
+
+    def save(self, path):
+        """Persist to ``path`` using the columnar store."""
+        storage.write_table(self.admissions, path, 'admissions')
+        storage.write_table(self.lab_sums, path, 'lab_sums')
+        meta = {'as_of': self.as_of.isoformat(), 'critical_labs': self.critical_labs}
+        (Path(path) / SNAPSHOT_FILE).write_text(json.dumps(meta, indent=2))
+
+    @classmethod
+    def load(cls, path):
+        """Load a snapshot written by ``save``."""
+        meta = json.loads((Path(path) / SNAPSHOT_FILE).read_text())
+        admissions = storage.read_table(path, 'admissions')
+        admissions = admissions.sort_values(['PatientID', 'AdmissionStartDate']).reset_index(drop=True)
+        lab_sums = _sorted_sums(storage.read_table(path, 'lab_sums'))
+        return cls(admissions, lab_sums, meta['as_of'], meta['critical_labs'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission incremental',
+                                     description='Build or update the incremental feature snapshot')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    init = commands.add_parser('init', help='full computation from the raw dataset')
+    init.add_argument('--dataset', required=True, help='directory with the raw *CorePopulatedTable.txt files')
+    init.add_argument('--snapshot', required=True, help='snapshot directory to write')
+    init.add_argument('--as-of', default=None, help='snapshot date (default: today)')
+
+    update = commands.add_parser('update', help='apply a delta of new admissions and labs')
+    update.add_argument('--snapshot', required=True, help='snapshot directory to update in place')
+    update.add_argument('--admissions', help='TSV shaped like AdmissionsCorePopulatedTable')
+    update.add_argument('--labs', help='TSV shaped like LabsCorePopulatedTable')
+    update.add_argument('--as-of', default=None, help='new snapshot date (default: today)')
+    args = parser.parse_args(argv)
+
+    as_of = pd.Timestamp(args.as_of) if args.as_of else pd.Timestamp('today').normalize()
+    if args.command == 'init':
+        paths = raw_paths(args.dataset)
+        accumulator = LabSumsAccumulator()
+        for chunk in iter_lab_chunks(paths['labs']):
+            accumulator.add(chunk)
+        admissions_df = pd.read_csv(paths['admissions'], sep='\t')
+        snapshot = FeatureSnapshot.build(admissions_df, accumulator.sums(), as_of)
+    else:
+        previous = FeatureSnapshot.load(args.snapshot)
+        delta_admissions = pd.read_csv(args.admissions, sep='\t') if args.admissions else None
+        delta_labs = pd.read_csv(args.labs, sep='\t') if args.labs else None
+        snapshot = previous.update(delta_admissions, delta_labs, as_of)
+
+    snapshot.save(args.snapshot)
+    print(f"✓ Snapshot as of {snapshot.as_of.date()}: {len(snapshot.admissions):,} admissions")
+    print(f"  Readmitted (1): {int(snapshot.admissions['Readmitted_30days'].sum()):,}")
+    print(f"  Open labels:    {int((~snapshot.admissions['LabelClosed']).sum()):,}")
@@ -0,0 +1,118 @@
+"""Bounded-memory streaming ingestion of LabsCorePopulatedTable.txt.
+
+The raw labs extract is read in chunks with explicit dtypes and only the
+columns lab aggregation needs. Each chunk is cleaned the same way as the
+data-cleaning notebook (``dropna(subset=['LabName', 'LabValue'])``) and
+folded into running per-admission sums and counts, so peak memory depends
+on the number of admissions and the chunk size, not on the number of lab
+rows.
+
+Usage:
+    python -m readmission ingest dataset/LabsCorePopulatedTable.txt cleaned_data/lab_features.csv
+"""
+
+import argparse
+
+import pandas as pd
+
+from readmission.lab_features import (
+    CRITICAL_LABS, KEY_COLUMNS, aggregate_lab_sums, finalize_lab_features, resolve_lab_categories
+)
+
+LAB_COLUMNS = ['PatientID', 'AdmissionID', 'LabName', 'LabValue']
+
+LAB_DTYPES = {
+    'PatientID': 'object',
+    'AdmissionID': 'Int64',
+    'LabName': 'object',
+    'LabValue': 'float64'
+}
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def iter_lab_chunks(path, chunksize=DEFAULT_CHUNKSIZE, sep='\t'):
+    """Yield cleaned lab chunks (needed columns only, nulls dropped)."""
+    reader = pd.read_csv(path, sep=sep, usecols=LAB_COLUMNS, dtype=LAB_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        yield chunk.dropna(subset=['LabName', 'LabValue'])
+
+
+class LabSumsAccumulator:
+    """Running per-admission lab sums and counts.
+
+    Partial results are buffered and collapsed with a grouped sum once the
+    buffer grows past the size of the collapsed state, which keeps memory
+    proportional to the number of distinct admissions.
+    """
+
+    def __init__(self, critical_labs=CRITICAL_LABS):
+        self.critical_labs = critical_labs
+        self.categories = resolve_lab_categories([], critical_labs)
+        self.rows_seen = 0
+        self._state = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def add(self, labs_chunk):
+        """Fold one cleaned chunk of lab rows into the running totals."""
+        new_names = pd.Index(labs_chunk['LabName'].unique()).difference(self.categories.index)
+        if len(new_names):
+            self.categories = pd.concat([self.categories, resolve_lab_categories(new_names, self.critical_labs)])
+
+        partial = aggregate_lab_sums(labs_chunk, self.critical_labs, self.categories)
+        self.rows_seen += len(labs_chunk)
+        self._pending.append(partial)
+        self._pending_rows += len(partial)
+        if self._pending_rows > max(len(self._state) if self._state is not None else 0, 100_000):
+            self._collapse()
+
+    def _collapse(self):
+        frames = ([self._state] if self._state is not None else []) + self._pending
+        if frames:
+            self._state = pd.concat(frames, ignore_index=True).groupby(KEY_COLUMNS, sort=True).sum().reset_index()
+        self._pending = []
+        self._pending_rows = 0
+
+    def sums(self):
+        """Collapsed per-admission sums, sorted by PatientID and AdmissionID."""
+        self._collapse()
+        if self._state is None:
+            return aggregate_lab_sums(pd.DataFrame(columns=LAB_COLUMNS), self.critical_labs, self.categories)
+        return self._state
+
+    def lab_features(self):
+        """The ``lab_features`` frame (NumLabs and ``<lab>_avg`` columns)."""
+        lab_features = finalize_lab_features(self.sums(), self.critical_labs)
+        lab_features['AdmissionID'] = lab_features['AdmissionID'].astype('int64')
+        return lab_features
+
+
+def stream_lab_features(path, chunksize=DEFAULT_CHUNKSIZE, critical_labs=CRITICAL_LABS, sep='\t'):
+    """Build ``lab_features`` from the raw labs TSV without loading it whole."""
+    accumulator = LabSumsAccumulator(critical_labs)
+    for chunk in iter_lab_chunks(path, chunksize=chunksize, sep=sep):
+        accumulator.add(chunk)
+    return accumulator.lab_features()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission ingest',
+                                     description='Stream the raw labs TSV into per-admission lab features')
+    parser.add_argument('labs_path', help='LabsCorePopulatedTable.txt')
+    parser.add_argument('output_path', help='CSV file to write lab features to')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='lab rows per chunk')
+    args = parser.parse_args(argv)
+
+    accumulator = LabSumsAccumulator()
+    for chunk in iter_lab_chunks(args.labs_path, chunksize=args.chunksize):
+        accumulator.add(chunk)
+    lab_features = accumulator.lab_features()
+    lab_features.to_csv(args.output_path, index=False)
+
+    print(f"✓ Streamed {accumulator.rows_seen:,} lab rows")
+    print(f"✓ Lab features for {len(lab_features):,} admissions saved: {args.output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Per-admission lab feature aggregation.
+
+Builds the ``lab_features`` frame used by model-training: one row per
+(PatientID, AdmissionID) with ``NumLabs`` and one ``<lab>_avg`` column per
+entry in ``CRITICAL_LABS``.
+
+Aggregation is split into ``aggregate_lab_sums`` (additive per-admission
+sums and counts) and ``finalize_lab_features`` (sums -> averages) so that
+partial results from chunked reads can be folded together before the
+division.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Key lab tests to extract (keywords are matched against the upper-cased LabName)
+CRITICAL_LABS = {
+    'hemoglobin': ['HEMOGLOBIN', 'HGB'],
+    'glucose': ['GLUCOSE'],
+    'creatinine': ['CREATININE'],
+    'wbc': ['WHITE BLOOD CELL', 'WBC'],
+    'sodium': ['SODIUM'],
+    'potassium': ['POTASSIUM']
+}
+
+KEY_COLUMNS = ['PatientID', 'AdmissionID']
+
+
+def resolve_lab_categories(lab_names, critical_labs=CRITICAL_LABS):
+    """Map each distinct LabName to the critical lab categories it belongs to.
+
+    Returns a boolean DataFrame indexed by lab name with one column per
+    category. A name may match several categories (e.g. "MEAN CORPUSCULAR
+    HEMOGLOBIN" counts as hemoglobin), exactly as the regex match did.
+    """
+    names = pd.Series(pd.unique(pd.Series(lab_names, dtype=object).dropna()), dtype=object)
+    upper = names.str.upper()
+    matches = {
+        lab_name: upper.str.contains('|'.join(keywords), na=False).to_numpy(dtype=bool)
+        for lab_name, keywords in critical_labs.items()
+    }
+    return pd.DataFrame(matches, index=pd.Index(names, name='LabName'))
+
+
+def aggregate_lab_sums(labs_df, critical_labs=CRITICAL_LABS, categories=None):
+    """Per-admission NumLabs plus ``<lab>_sum`` / ``<lab>_count`` columns.
+
+    ``categories`` is an optional lookup from ``resolve_lab_categories``;
+    it must cover every LabName in ``labs_df``. Rows are sorted by the keys.
+    """
+    labs = labs_df.dropna(subset=KEY_COLUMNS)
+
+    # Combine per-key codes instead of hashing (PatientID, AdmissionID) tuples
+    patient_codes, patient_ids = pd.factorize(labs['PatientID'], sort=True)
+    admission_codes, admission_ids = pd.factorize(labs['AdmissionID'], sort=True)
+    pair_codes = patient_codes.astype(np.int64) * len(admission_ids) + admission_codes
+    pairs, group_codes = np.unique(pair_codes, return_inverse=True)
+    n_groups = len(pairs)
+
+    if isinstance(labs['LabName'].dtype, pd.CategoricalDtype):
+        # Compact schema: the category codes already are a factorization of the names
+        name_codes, names = labs['LabName'].cat.codes.to_numpy(), labs['LabName'].cat.categories
+    else:
+        name_codes, names = pd.factorize(labs['LabName'])
+    if categories is None:
+        categories = resolve_lab_categories(names, critical_labs)
+    categories = categories.reindex(names)
+
+    values = pd.to_numeric(labs['LabValue'], errors='coerce').to_numpy(dtype=np.float64)
+    has_value = ~np.isnan(values)
+
+    sums = pd.DataFrame({
+        'PatientID': patient_ids.take(pairs // len(admission_ids)),
+        'AdmissionID': admission_ids.take(pairs % len(admission_ids)),
+        'NumLabs': np.bincount(group_codes, minlength=n_groups)
+    })
+
+    for lab_name in critical_labs:
+        # name_codes == -1 marks a missing LabName, which never matches
+        in_category = np.append(categories[lab_name].to_numpy(dtype=bool), False)[name_codes]
+        mask = in_category & has_value
+        sums[f'{lab_name}_sum'] = np.bincount(group_codes[mask], weights=values[mask], minlength=n_groups)
+        sums[f'{lab_name}_count'] = np.bincount(group_codes[mask], minlength=n_groups)
+
+    return sums
+
+
+def finalize_lab_features(sums, critical_labs=CRITICAL_LABS):
+    """Turn the output of ``aggregate_lab_sums`` into ``<lab>_avg`` columns."""
+    lab_features = sums[KEY_COLUMNS + ['NumLabs']].copy()
+    for lab_name in critical_labs:
+        total = sums[f'{lab_name}_sum'].to_numpy(dtype=np.float64)
+        count = sums[f'{lab_name}_count'].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lab_features[f'{lab_name}_avg'] = np.where(count > 0, total / count, np.nan)
+    return lab_features
+
+
+def aggregate_lab_features(labs_df, critical_labs=CRITICAL_LABS):
+    """Compute NumLabs and every ``<lab>_avg`` column per admission.
+
+    Each distinct LabName is resolved to its categories once; the per-row
+    category masks are then gathered from that lookup and all averages are
+    computed with a single grouping of the (PatientID, AdmissionID) keys.
+    Output matches the original per-group loop: rows sorted by the keys,
+    NaN where an admission has no value for a lab.
+    """
+    return finalize_lab_features(aggregate_lab_sums(labs_df, critical_labs), critical_labs)
@@ -0,0 +1,229 @@
+"""Lightweight in-process timers, counters and latency histograms.
+
+Hot paths record into one process-wide ``REGISTRY``:
+
+    with metrics.timer('predict_seconds', engine='sklearn'):
+        proba = model.predict_proba(X)
+    metrics.increment('rows_scored_total', len(X))
+
+    @metrics.timed('model_load_seconds')
+    def load_model_artifacts(...): ...
+
+Histograms have fixed latency buckets, so recording an observation is a
+bisect plus three additions under a lock (a few microseconds, see
+``benchmarks/bench_metrics.py``). Every timed block also appends a
+complete event to a bounded trace buffer.
+
+Exports:
+
+- ``REGISTRY.to_prometheus()``: Prometheus text exposition format (what
+  ``GET /metrics`` of the scoring service returns)
+- ``REGISTRY.trace()``: Chrome trace-event JSON (``chrome://tracing`` or
+  Perfetto)
+- ``REGISTRY.snapshot()``: counters and histogram summaries (count, sum,
+  mean, approximate p50/p90/p99) as a plain dict
+
+Set ``READMISSION_METRICS=0`` to turn recording off entirely.
+"""
+
+import bisect
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# Upper bounds in seconds, from 100 µs to 10 min; +Inf is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+TRACE_CAPACITY = 10_000
+METRIC_PREFIX = 'readmission_'
+
+
+def _series(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Cumulative-exportable bucket counts plus count and sum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile ``q`` (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.record(self.name, self.start, time.perf_counter_ns(), **self.labels)
+        return False
+
+
+_NULL_TIMER = nullcontext()
+
+
+class MetricsRegistry:
+    """Thread-safe counters, histograms and a bounded trace buffer."""
+
+    def __init__(self, enabled=True, trace_capacity=TRACE_CAPACITY, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._events = deque(maxlen=trace_capacity)
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _series(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = _series(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def record(self, name, start_ns, end_ns, **labels):
+        """Observe an interval in seconds and keep it as a trace event."""
+        if not self.enabled:
+            return
+        self.observe(name, (end_ns - start_ns) / 1e9, **labels)
+        self._events.append((name, start_ns, end_ns, threading.get_ident(), labels))
+
+    def timer(self, name, **labels):
+        """Time the ``with`` block into histogram ``name`` (recorded even if it raises)."""
+        return _Timer(self, name, labels) if self.enabled else _NULL_TIMER
+
+    def timed(self, name, **labels):
+        """Decorator form of ``timer``."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._events.clear()
+
+    def snapshot(self):
+        """Counters and histogram summaries keyed on ``name{label="value"}``."""
+        with self._lock:
+            counters = {name + _format_labels(labels): value for (name, labels), value in self._counters.items()}
+            histograms = {
+                name + _format_labels(labels): {
+                    'count': h.count,
+                    'sum': h.sum,
+                    'mean': h.sum / h.count if h.count else None,
+                    'p50': h.quantile(0.5),
+                    'p90': h.quantile(0.9),
+                    'p99': h.quantile(0.99),
+                }
+                for (name, labels), h in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self, prefix=METRIC_PREFIX):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(h.counts), h.count, h.sum) for key, h in self._histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {prefix}{name} counter")
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), counts, count, total in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {prefix}{name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == math.inf else f'{bound:g}'
+                lines.append(f"{prefix}{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {total:.9g}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def trace(self):
+        """Recorded intervals as a Chrome trace-event document (timestamps in µs)."""
+        with self._lock:
+            events = list(self._events)
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [
+                {'name': name, 'cat': 'readmission', 'ph': 'X', 'ts': start / 1000, 'dur': (end - start) / 1000,
+                 'pid': os.getpid(), 'tid': tid, 'args': labels}
+                for name, start, end, tid, labels in events
+            ],
+        }
+
+    def write_prometheus(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus())
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get('READMISSION_METRICS', '1') != '0')
+
+increment = REGISTRY.increment
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
@@ -0,0 +1,439 @@
+"""Staged training pipeline with content-keyed stage caching.
+
+Stages run in order::
+
+    profile -> clean -> lab_features -> labels -> merge -> balance -> train -> evaluate -> export
+
+Each stage's output is stored under ``<cache_dir>/<stage>/<key>/`` where the
+key hashes the stage name and version, its parameters and the keys of the
+stages it reads from (for ``profile`` and ``clean``: a fingerprint of the raw
+TSV files).
+A stage whose key already exists in the cache is skipped, so changing the
+RandomForest parameters re-runs only ``train``, ``evaluate`` and ``export``.
+
+``profile`` streams the raw files once through ``readmission.profiling``
+and stops the run with ``SchemaDriftError`` before ``clean`` when the
+tables have drifted from the expected schema; ``--quality-report`` writes
+its JSON report.
+
+``evaluate`` runs stratified k-fold CV of the engine and bootstrap
+confidence intervals of the test metrics (``readmission.evaluation``),
+both spread over ``--workers`` processes. ``export`` stores them with the
+model in ``metrics.json``, with the estimator parameters and train/test row
+counts, where the UI reads them.
+
+``--engine hist_gb`` trains histogram gradient boosting on the full
+admission set instead of the random forest on a balanced subsample (see
+``readmission.engines``).
+
+Usage:
+    python -m readmission pipeline --dataset dataset/ --param train.rf.n_estimators=200
+    python -m readmission pipeline --engine hist_gb --param train.hgb.learning_rate=0.05
+    python -m readmission pipeline --metrics-out stages.prom --trace-out stages.trace.json
+    python -m readmission pipeline --quality-report quality_report.json
+    python -m readmission pipeline --workers 8 --param evaluate.resamples=10000
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from readmission import metrics, sharding, storage
+from readmission.cleaning import clean_tables, load_raw_tables, raw_paths
+from readmission.engines import DEFAULT_ENGINE, ENGINES, get_engine
+from readmission.evaluation import (
+    DEFAULT_CONFIDENCE, DEFAULT_FOLDS, DEFAULT_RESAMPLES, METRIC_NAMES, bootstrap_metrics, cross_validate
+)
+from readmission.features import build_model_df, create_readmission_labels
+from readmission.lab_features import CRITICAL_LABS, aggregate_lab_features
+from readmission.profiling import MAX_INVALID_SHARE, SchemaDriftError, print_summary, profile_dataset, write_report
+from readmission.training import (
+    balance_dataset, evaluate_model, prepare_features, save_artifacts, split_features, train_model
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DATASET = REPO_ROOT / 'dataset'
+DEFAULT_MODELS = REPO_ROOT / 'models'
+DEFAULT_CACHE = REPO_ROOT / '.pipeline_cache'
+
+OUTPUT_PICKLE = 'output.pkl'
+TABLES_DIR = 'tables'
+
+
+def default_params(engine=DEFAULT_ENGINE):
+    """Parameters for every stage; override with ``--param stage.name=value``.
+
+    Full-data engines (``hist_gb``) keep every admission in the balance stage.
+    ``merge.reference_date`` (the date patient ages are computed at) defaults
+    to the latest admission end date in the data rather than today, so the
+    merge key and everything downstream stay cached from one day to the next.
+    """
+    engine = get_engine(engine)
+    return {
+        'profile': {'max_invalid_share': MAX_INVALID_SHARE},
+        'clean': {},
+        'lab_features': {'critical_labs': copy.deepcopy(CRITICAL_LABS)},
+        'labels': {},
+        'merge': {'reference_date': None},
+        'balance': {'n_healthy': None if engine.full_data else 200, 'random_state': 42},
+        'train': {'test_size': 0.2, 'random_state': 42, 'engine': engine.name,
+                  engine.param_key: dict(engine.default_params)},
+        'evaluate': {'folds': DEFAULT_FOLDS, 'resamples': DEFAULT_RESAMPLES, 'confidence': DEFAULT_CONFIDENCE,
+                     'random_state': 42},
+        'export': {}
+    }
+
+
+# ---------------------------------------------------------------------------
+# Stage functions: (inputs, params, context) -> output
+# ---------------------------------------------------------------------------
+
+def run_profile(inputs, params, context):
+    return profile_dataset(context['dataset_path'], max_invalid_share=params['max_invalid_share'])
+
+
+def run_clean(inputs, params, context):
+    return clean_tables(load_raw_tables(context['dataset_path']))
+
+
+def run_lab_features(inputs, params, context):
+    if context['workers'] > 1:
+        return sharding.aggregate_lab_features_parallel(inputs['clean']['labs'], params['critical_labs'],
+                                                        context['workers'])
+    return aggregate_lab_features(inputs['clean']['labs'], params['critical_labs'])
+
+
+def run_labels(inputs, params, context):
+    if context['workers'] > 1:
+        return sharding.create_readmission_labels_parallel(inputs['clean']['admissions'], context['workers'])
+    return create_readmission_labels(inputs['clean']['admissions'])
+
+
+def data_reference_date(admissions_df):
+    """Latest admission end date in the data (ISO date), the default age reference date."""
+    return pd.to_datetime(admissions_df['AdmissionEndDate']).max().date().isoformat()
+
+
+def run_merge(inputs, params, context):
+    reference_date = params['reference_date'] or data_reference_date(inputs['clean']['admissions'])
+    if context['workers'] > 1:
+        return sharding.merge_model_df_parallel(
+            inputs['labels'], inputs['clean']['patients'], inputs['clean']['diagnoses'],
+            inputs['lab_features'], reference_date, context['workers']
+        )
+    return build_model_df(
+        inputs['labels'], inputs['clean']['patients'], inputs['clean']['diagnoses'],
+        inputs['lab_features'], reference_date
+    )
+
+
+def run_balance(inputs, params, context):
+    return balance_dataset(inputs['merge'], params['n_healthy'], params['random_state'])
+
+
+def run_train(inputs, params, context):
+    X, y, label_encoders, lab_medians = prepare_features(inputs['balance'])
+    X_train, X_test, y_train, y_test = split_features(X, y, params['test_size'], params['random_state'])
+    engine = get_engine(params.get('engine', DEFAULT_ENGINE))
+    model = train_model(X_train, y_train, engine.name, params.get(engine.param_key))
+    return {
+        'model': model,
+        'label_encoders': label_encoders,
+        'feature_names': list(X.columns),
+        'lab_medians': lab_medians,
+        'engine': engine.name,
+        'engine_params': params.get(engine.param_key),
+        'test_index': X_test.index.to_numpy(),
+        'rows': {'train': len(X_train), 'test': len(X_test)},
+        'metrics': {
+            'train': evaluate_model(model, X_train, y_train),
+            'test': evaluate_model(model, X_test, y_test)
+        }
+    }
+
+
+def run_evaluate(inputs, params, context):
+    trained = inputs['train']
+    X, y, _, _ = prepare_features(inputs['balance'])
+    X_test, y_test = X.loc[trained['test_index']], y.loc[trained['test_index']]
+    proba = trained['model'].predict_proba(X_test)[:, 1]
+    return {
+        'test_rows': len(y_test),
+        'resamples': params['resamples'],
+        'confidence': params['confidence'],
+        'test': bootstrap_metrics(y_test, proba, params['resamples'], params['confidence'], params['random_state'],
+                                  context['workers']),
+        'cv': cross_validate(X, y, trained['engine'], trained['engine_params'], params['folds'],
+                             params['random_state'], context['workers'])
+    }
+
+
+def run_export(inputs, params, context):
+    trained = inputs['train']
+    # The UI describes the model from what is recorded here
+    recorded = {**trained['metrics'], 'engine': trained['engine'], 'evaluation': inputs['evaluate'],
+                'params': {**get_engine(trained['engine']).default_params, **(trained['engine_params'] or {})},
+                'rows': trained['rows']}
+    manifest = save_artifacts(context['models_path'], trained['model'], trained['label_encoders'],
+                              trained['feature_names'], trained['lab_medians'], recorded)
+    return {'models_path': str(context['models_path']), 'model_version': manifest['model_version']}
+
+
+class Stage:
+    """A pipeline step: name, upstream stage names, function and output format.
+
+    ``always_run`` stages have side effects outside the cache (writing the
+    model artifacts) and are re-run even when their key is cached.
+    """
+
+    def __init__(self, name, run, inputs=(), tables=False, always_run=False, version=1):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.tables = tables
+        self.always_run = always_run
+        self.version = version
+
+
+STAGES = [
+    Stage('profile', run_profile),
+    Stage('clean', run_clean, tables=True, version=2),
+    Stage('lab_features', run_lab_features, ['clean']),
+    Stage('labels', run_labels, ['clean']),
+    Stage('merge', run_merge, ['clean', 'labels', 'lab_features']),
+    Stage('balance', run_balance, ['merge']),
+    Stage('train', run_train, ['balance'], version=3),
+    Stage('evaluate', run_evaluate, ['balance', 'train']),
+    Stage('export', run_export, ['train', 'evaluate'], always_run=True),
+]
+
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+# Stages keyed on the raw files themselves
+RAW_STAGES = ('profile', 'clean')
+
+
+# ---------------------------------------------------------------------------
+# Keys and cache
+# ---------------------------------------------------------------------------
+
+def file_fingerprint(path, content=False):
+    """Size and mtime of a file, or a SHA-256 of its bytes when ``content``."""
+    if content:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def stage_key(stage, params, upstream):
+    """Hash of the stage identity, its parameters and its upstream keys/fingerprints."""
+    payload = json.dumps(
+        {'stage': stage.name, 'version': stage.version, 'params': params, 'upstream': upstream},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class StageCache:
+    """On-disk store of stage outputs under ``<root>/<stage>/<key>/``."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, stage, key):
+        return self.root / stage.name / key
+
+    def has(self, stage, key):
+        return (self.path(stage, key) / 'params.json').exists()
+
+    def load(self, stage, key):
+        path = self.path(stage, key)
+        if stage.tables:
+            return storage.read_cleaned_tables(path / TABLES_DIR)
+        with open(path / OUTPUT_PICKLE, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, stage, key, output, params):
+        path = self.path(stage, key)
+        tmp = path.with_name(key + '.tmp')
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        if stage.tables:
+            storage.write_cleaned_tables(output, tmp / TABLES_DIR)
+        else:
+            with open(tmp / OUTPUT_PICKLE, 'wb') as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # params.json is written last and marks the entry complete
+        (tmp / 'params.json').write_text(json.dumps(params, indent=2, sort_keys=True, default=str))
+        if path.exists():
+            shutil.rmtree(path)
+        tmp.rename(path)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run_pipeline(dataset_path=DEFAULT_DATASET, models_path=DEFAULT_MODELS, cache_dir=DEFAULT_CACHE,
+                 params=None, force=(), until=None, hash_raw=False, workers=1):
+    """Run the pipeline, skipping stages whose key is already cached.
+
+    ``force`` names stages to re-run regardless of the cache; ``until``
+    stops after the named stage. With ``workers > 1`` the lab_features,
+    labels and merge stages run PatientID-sharded in a process pool and
+    evaluate spreads its folds and resamples over processes; their output
+    is identical, so ``workers`` is not part of the stage keys.
+
+    Returns ``{stage: {'key', 'status', 'seconds'}}`` where status is
+    ``'cached'`` or ``'ran'``. Stage timings (``seconds`` includes loading
+    cached upstream outputs and saving the result) are also recorded in
+    ``metrics.REGISTRY``.
+    """
+    params = params or default_params()
+    cache = StageCache(cache_dir)
+    context = {'dataset_path': str(dataset_path), 'models_path': str(models_path), 'workers': workers or 1}
+
+    keys = {}
+    outputs = {}
+    report = {}
+
+    def output_of(name):
+        # Cached outputs are loaded only when a downstream stage actually runs
+        if name not in outputs:
+            stage = STAGES[STAGE_NAMES.index(name)]
+            outputs[name] = cache.load(stage, keys[name])
+        return outputs[name]
+
+    for stage in STAGES:
+        if stage.name in RAW_STAGES:
+            upstream = {name: file_fingerprint(path, hash_raw) for name, path in raw_paths(dataset_path).items()}
+        else:
+            upstream = {name: keys[name] for name in stage.inputs}
+        if stage.name == 'export':
+            upstream['models_path'] = str(Path(models_path).resolve())
+        stage_params = params.get(stage.name, {})
+        key = keys[stage.name] = stage_key(stage, stage_params, upstream)
+
+        start = time.perf_counter_ns()
+        if cache.has(stage, key) and not stage.always_run and stage.name not in force:
+            status = 'cached'
+        else:
+            stage_inputs = {name: output_of(name) for name in stage.inputs}
+            with metrics.timer('pipeline_stage_run_seconds', stage=stage.name):
+                output = stage.run(stage_inputs, stage_params, context)
+            cache.save(stage, key, output, stage_params)
+            outputs[stage.name] = output
+            status = 'ran'
+        end = time.perf_counter_ns()
+        metrics.REGISTRY.record('pipeline_stage_seconds', start, end, stage=stage.name, status=status)
+        metrics.increment('pipeline_stages_total', stage=stage.name, status=status)
+        report[stage.name] = {'key': key, 'status': status, 'seconds': (end - start) / 1e9}
+
+        if stage.name == until:
+            break
+
+    return report
+
+
+def load_stage_output(stage_name, report, cache_dir=DEFAULT_CACHE):
+    """Load a stage's cached output using the key from a ``run_pipeline`` report."""
+    stage = STAGES[STAGE_NAMES.index(stage_name)]
+    return StageCache(cache_dir).load(stage, report[stage_name]['key'])
+
+
+def apply_param_overrides(params, overrides):
+    """Apply ``stage.key[.subkey]=value`` overrides; values are parsed as JSON when possible."""
+    for override in overrides:
+        path, _, raw = override.partition('=')
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        *parents, leaf = path.split('.')
+        if not parents or parents[0] not in params:
+            raise ValueError(f"Unknown stage in --param {override!r}; expected one of {STAGE_NAMES}")
+        target = params
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission pipeline',
+                                     description='Run the staged readmission training pipeline')
+    parser.add_argument('--dataset', default=str(DEFAULT_DATASET), help='directory with the raw *CorePopulatedTable.txt files')
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS), help='where export writes the model artifacts')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE), help='stage output cache')
+    parser.add_argument('--engine', choices=list(ENGINES), default=DEFAULT_ENGINE,
+                        help='model engine for the train stage (hist_gb trains on every admission)')
+    parser.add_argument('--param', action='append', default=[], metavar='STAGE.KEY=VALUE',
+                        help='override a stage parameter, e.g. train.rf.n_estimators=200')
+    parser.add_argument('--force', action='append', default=[], choices=STAGE_NAMES,
+                        help='re-run a stage even if cached')
+    parser.add_argument('--until', choices=STAGE_NAMES, help='stop after this stage')
+    parser.add_argument('--hash-raw', action='store_true',
+                        help='key the clean stage on raw file contents instead of size/mtime')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes for PatientID-sharded feature engineering and evaluation (default: serial)')
+    parser.add_argument('--metrics-out', help='write stage timings in Prometheus text format to this file')
+    parser.add_argument('--trace-out', help='write a Chrome trace-event JSON of the run to this file')
+    parser.add_argument('--quality-report', help='write the profile stage\'s JSON data-quality report to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        params = apply_param_overrides(default_params(args.engine), args.param)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 80)
+    print("READMISSION TRAINING PIPELINE")
+    print("=" * 80)
+    try:
+        report = run_pipeline(args.dataset, args.models_dir, args.cache_dir, params,
+                              force=set(args.force), until=args.until, hash_raw=args.hash_raw,
+                              workers=args.workers)
+    except SchemaDriftError as e:
+        print("✗ profile: the raw tables do not match the expected schema; no stage after profile ran")
+        if e.report is not None:
+            print_summary(e.report)
+            if args.quality_report:
+                write_report(e.report, args.quality_report)
+        return 1
+    for name, entry in report.items():
+        marker = '✓' if entry['status'] == 'cached' else '▶'
+        print(f"{marker} {name:<13} {entry['status']:<7} {entry['seconds']:8.2f}s  key={entry['key']}")
+    if args.quality_report and 'profile' in report:
+        write_report(load_stage_output('profile', report, args.cache_dir), args.quality_report)
+    if args.metrics_out:
+        metrics.REGISTRY.write_prometheus(args.metrics_out)
+    if args.trace_out:
+        metrics.REGISTRY.write_trace(args.trace_out)
+
+    if 'train' in report:
+        trained = load_stage_output('train', report, args.cache_dir)
+        test_metrics = trained['metrics']['test']
+        print(f"\nTEST SET PERFORMANCE ({trained['engine']}):")
+        for name, value in test_metrics.items():
+            print(f"{name:<10} {value:.4f}")
+    if 'evaluate' in report:
+        evaluation = load_stage_output('evaluate', report, args.cache_dir)
+        print(f"\n{evaluation['confidence']:.0%} BOOTSTRAP INTERVALS ({evaluation['resamples']:,} resamples of "
+              f"{evaluation['test_rows']:,} test rows) AND {evaluation['cv']['folds']}-FOLD CV:")
+        for name in METRIC_NAMES:
+            interval = evaluation['test'][name]
+            print(f"{name:<10} {interval['value']:.4f}  [{interval['low']:.4f}, {interval['high']:.4f}]  "
+                  f"cv {evaluation['cv']['mean'][name]:.4f} ± {evaluation['cv']['std'][name]:.4f}")
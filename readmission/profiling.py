@@ -0,0 +1,365 @@
+"""Single-pass profiling and validation of the four raw EMR tables.
+
+``TableProfile`` accumulates, per column, everything the data-cleaning
+notebook looked at and more, scanning each column once per chunk:
+
+- string columns: one ``pd.factorize`` (free for categoricals) gives the
+  null count; counts per distinct value come from a ``bincount`` of the
+  codes, so the 'Unknown'/empty sentinels, the cardinality and the top
+  values are read off the (small) dictionary instead of extra
+  full-column comparisons
+- numeric columns: one ``pd.to_numeric``, giving nulls, values that are
+  not numbers (type drift), min/max/mean and values outside the
+  plausible range
+- date columns: one ISO-8601 parse, giving nulls, unparseable values, the
+  date range and dates before 1900 or after ``as_of``
+
+plus table checks: duplicate keys in patients and admissions, and
+admissions that end before they start. Profiles of chunks merge, so
+``profile_dataset`` streams the raw files in bounded memory.
+
+``validate`` turns a report into errors (missing columns, a numeric or
+date column with more than ``max_invalid_share`` unparseable values, an
+empty table) and warnings. ``profile_dataset`` checks all four headers
+before reading any rows and raises ``SchemaDriftError`` on errors, which
+is how the pipeline's ``profile`` stage stops a run before cleaning.
+
+Usage:
+    python -m readmission profile --dataset dataset/ --out quality_report.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from readmission.cleaning import MISSING_VALUES, RAW_FILES, raw_paths
+from readmission.schema import DATE_FORMAT, TABLE_DTYPES
+from readmission.storage import DATE_COLUMNS
+
+DEFAULT_DATASET = Path(__file__).resolve().parents[1] / 'dataset'
+DEFAULT_CHUNKSIZE = 1_000_000
+MAX_INVALID_SHARE = 0.01
+TOP_VALUES = 10
+MIN_DATE = pd.Timestamp('1900-01-01')
+
+# Columns expected in each raw table (extra columns are reported, not rejected)
+EXPECTED_COLUMNS = {table: list(dtypes) + DATE_COLUMNS[table] for table, dtypes in TABLE_DTYPES.items()}
+
+# Plausible (min, max) per numeric column; None leaves a side open
+VALUE_RANGES = {
+    'PatientPopulationPercentageBelowPoverty': (0, 100),
+    'AdmissionID': (1, None),
+    'LabValue': (0, None),
+}
+
+# Columns that identify a row, checked for duplicates
+UNIQUE_KEYS = {
+    'patients': ['PatientID'],
+    'admissions': ['PatientID', 'AdmissionID'],
+}
+
+# IDs: cardinality only, no top values
+ID_COLUMNS = {'PatientID', 'AdmissionID'}
+
+
+class SchemaDriftError(ValueError):
+    """Raised when raw tables do not match the expected schema; ``report`` holds the quality report."""
+
+    def __init__(self, errors, report=None):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+        self.report = report
+
+
+def column_kind(table, col):
+    """'date', 'numeric' or 'string' for an expected column (unexpected ones are profiled as strings)."""
+    if col in DATE_COLUMNS.get(table, ()):
+        return 'date'
+    dtype = TABLE_DTYPES.get(table, {}).get(col)
+    if dtype is not None and dtype != 'category':
+        return 'numeric'
+    return 'string'
+
+
+class StringStats:
+    """Nulls and per-value counts (sentinels, cardinality, top values) of a string column."""
+
+    def __init__(self):
+        self.nulls = 0
+        self.counts = pd.Series(dtype='int64')
+
+    def add(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+        valid = codes >= 0
+        self.nulls += int(len(codes) - valid.sum())
+        counts = pd.Series(np.bincount(codes[valid], minlength=len(uniques)), index=pd.Index(uniques, dtype=object))
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64') if len(self.counts) else counts
+        return series
+
+    def report(self, top=True):
+        counts = self.counts[self.counts > 0]
+        sentinels = {value: int(counts.get(value, 0)) for value in MISSING_VALUES}
+        report = {'kind': 'string', 'nulls': self.nulls, 'sentinels': sentinels,
+                  'missing': self.nulls + sum(sentinels.values()), 'distinct': len(counts),
+                  'max_count': int(counts.max()) if len(counts) else 0}
+        if top:
+            largest = counts.nlargest(TOP_VALUES)
+            report['top'] = [[str(value), int(count)] for value, count in largest.items()]
+        return report
+
+
+class NumericStats:
+    """Nulls, non-numeric values, range and out-of-range count of a numeric column."""
+
+    def __init__(self, value_range=None):
+        self.value_range = value_range
+        self.nulls = self.invalid = self.count = self.out_of_range = 0
+        self.total = 0.0
+        self.min = self.max = None
+
+    def add(self, series):
+        values = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(values)
+        nulls = int(series.isna().sum())
+        self.nulls += nulls
+        self.invalid += int(missing.sum()) - nulls
+        present = values[~missing]
+        if len(present):
+            self.count += len(present)
+            self.total += float(present.sum())
+            low, high = float(present.min()), float(present.max())
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            if self.value_range is not None:
+                lower, upper = self.value_range
+                outside = np.zeros(len(present), dtype=bool)
+                if lower is not None:
+                    outside |= present < lower
+                if upper is not None:
+                    outside |= present > upper
+                self.out_of_range += int(outside.sum())
+        return pd.Series(values, index=series.index)
+
+    def report(self):
+        return {'kind': 'numeric', 'nulls': self.nulls, 'invalid': self.invalid, 'missing': self.nulls,
+                'min': self.min, 'max': self.max, 'mean': self.total / self.count if self.count else None,
+                'range': list(self.value_range) if self.value_range else None, 'out_of_range': self.out_of_range}
+
+
+class DateStats:
+    """Nulls, unparseable values and implausible dates of a date column."""
+
+    def __init__(self, as_of):
+        self.as_of = as_of
+        self.nulls = self.invalid = self.before_min = self.after_as_of = 0
+        self.min = self.max = None
+
+    def add(self, series):
+        parsed = (series if pd.api.types.is_datetime64_any_dtype(series)
+                  else pd.to_datetime(series, format=DATE_FORMAT, errors='coerce'))
+        missing = parsed.isna().to_numpy()
+        nulls = int(series.isna().sum())
+        self.nulls += nulls
+        self.invalid += int(missing.sum()) - nulls
+        present = parsed[~missing]
+        if len(present):
+            low, high = present.min(), present.max()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            self.before_min += int((present < MIN_DATE).sum())
+            self.after_as_of += int((present > self.as_of).sum())
+        return parsed
+
+    def report(self):
+        return {'kind': 'date', 'nulls': self.nulls, 'invalid': self.invalid, 'missing': self.nulls,
+                'min': self.min.isoformat() if self.min is not None else None,
+                'max': self.max.isoformat() if self.max is not None else None,
+                'before_1900': self.before_min, 'after_as_of': self.after_as_of}
+
+
+class TableProfile:
+    """Column statistics and table checks of one raw table, accumulated over chunks."""
+
+    def __init__(self, table, as_of=None):
+        self.table = table
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp('today')
+        self.rows = 0
+        self.columns = None
+        self.stats = {}
+        self.end_before_start = 0
+        self._key_hashes = []
+
+    def _stats_for(self, col):
+        kind = column_kind(self.table, col)
+        if kind == 'date':
+            return DateStats(self.as_of)
+        if kind == 'numeric':
+            return NumericStats(VALUE_RANGES.get(col))
+        return StringStats()
+
+    def add(self, chunk):
+        """Fold one chunk (raw text or compact dtypes) into the profile; returns ``self``."""
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.stats = {col: self._stats_for(col) for col in self.columns}
+        elif list(chunk.columns) != self.columns:
+            raise SchemaDriftError([f"{self.table}: columns changed between chunks"])
+        self.rows += len(chunk)
+        converted = {col: self.stats[col].add(chunk[col]) for col in self.columns}
+
+        key = UNIQUE_KEYS.get(self.table)
+        if key and all(col in chunk.columns for col in key):
+            self._key_hashes.append(pd.util.hash_pandas_object(chunk[key].astype(str), index=False).to_numpy())
+        if self.table == 'admissions' and {'AdmissionStartDate', 'AdmissionEndDate'} <= set(self.columns):
+            self.end_before_start += int((converted['AdmissionEndDate'] < converted['AdmissionStartDate']).sum())
+        return self
+
+    def report(self):
+        columns = self.columns or []
+        expected = EXPECTED_COLUMNS.get(self.table, [])
+        checks = {}
+        if self._key_hashes:
+            hashes = np.concatenate(self._key_hashes)
+            checks['duplicate_keys'] = int(len(hashes) - len(np.unique(hashes)))
+        if self.table == 'admissions':
+            checks['end_before_start'] = self.end_before_start
+        column_stats = {}
+        for col, stats in self.stats.items():
+            if isinstance(stats, StringStats):
+                column_stats[col] = stats.report(top=col not in ID_COLUMNS)
+            else:
+                column_stats[col] = stats.report()
+            column_stats[col]['missing_share'] = column_stats[col]['missing'] / self.rows if self.rows else 0.0
+        return {
+            'rows': self.rows,
+            'columns': columns,
+            'missing_columns': [col for col in expected if col not in columns],
+            'unexpected_columns': [col for col in columns if col not in expected],
+            'column_stats': column_stats,
+            'checks': checks,
+        }
+
+
+def profile_frame(df, table, as_of=None):
+    """Report for an in-memory table (e.g. from ``load_raw_tables``)."""
+    return TableProfile(table, as_of).add(df).report()
+
+
+def check_headers(dataset_path):
+    """Errors for raw files that are missing or lack expected columns, reading only the header rows."""
+    errors = []
+    for table, path in raw_paths(dataset_path).items():
+        try:
+            columns = list(pd.read_csv(path, sep='\t', nrows=0).columns)
+        except FileNotFoundError:
+            errors.append(f"{table}: {RAW_FILES[table]} not found")
+            continue
+        missing = [col for col in EXPECTED_COLUMNS[table] if col not in columns]
+        if missing:
+            errors.append(f"{table}: missing columns {missing}")
+    return errors
+
+
+def validate(table_reports, max_invalid_share=MAX_INVALID_SHARE):
+    """``(errors, warnings)`` for a ``{table: report}`` dict."""
+    errors, warnings = [], []
+    for table, report in table_reports.items():
+        if report['missing_columns']:
+            errors.append(f"{table}: missing columns {report['missing_columns']}")
+        if report['unexpected_columns']:
+            warnings.append(f"{table}: unexpected columns {report['unexpected_columns']}")
+        if not report['rows']:
+            errors.append(f"{table}: no rows")
+            continue
+        for col, stats in report['column_stats'].items():
+            invalid = stats.get('invalid', 0)
+            if invalid > max_invalid_share * report['rows']:
+                errors.append(f"{table}.{col}: {invalid:,} values are not a valid {stats['kind']} "
+                              f"(more than {max_invalid_share:.0%} of rows)")
+            elif invalid:
+                warnings.append(f"{table}.{col}: {invalid:,} values are not a valid {stats['kind']}")
+            if col in ID_COLUMNS and stats['nulls']:
+                warnings.append(f"{table}.{col}: {stats['nulls']:,} missing IDs")
+            if stats.get('out_of_range'):
+                warnings.append(f"{table}.{col}: {stats['out_of_range']:,} values outside {stats['range']}")
+            if stats.get('before_1900') or stats.get('after_as_of'):
+                warnings.append(f"{table}.{col}: {stats['before_1900']:,} dates before 1900, "
+                                f"{stats['after_as_of']:,} in the future")
+        for check, count in report['checks'].items():
+            if count:
+                warnings.append(f"{table}: {count:,} rows fail {check}")
+    return errors, warnings
+
+
+def profile_dataset(dataset_path, chunksize=DEFAULT_CHUNKSIZE, as_of=None, max_invalid_share=MAX_INVALID_SHARE,
+                    raise_on_error=True):
+    """Quality report for the four raw tables, streamed in chunks.
+
+    Headers are checked first, so a dropped or renamed column fails
+    before any rows are read. Returns ``{'as_of', 'tables', 'errors',
+    'warnings'}``; with ``raise_on_error`` errors raise ``SchemaDriftError``.
+    """
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp('today')
+    report = {'as_of': as_of.isoformat(), 'tables': {}, 'errors': check_headers(dataset_path), 'warnings': []}
+    if report['errors']:
+        if raise_on_error:
+            raise SchemaDriftError(report['errors'], report)
+        return report
+
+    for table, path in raw_paths(dataset_path).items():
+        profile = TableProfile(table, as_of)
+        # Raw text: numbers and dates are parsed once by the profile, so bad values are counted, not lost
+        for chunk in pd.read_csv(path, sep='\t', dtype=str, chunksize=chunksize):
+            profile.add(chunk)
+        report['tables'][table] = profile.report()
+    report['errors'], report['warnings'] = validate(report['tables'], max_invalid_share)
+    if report['errors'] and raise_on_error:
+        raise SchemaDriftError(report['errors'], report)
+    return report
+
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def print_summary(report):
+    for table, table_report in report['tables'].items():
+        worst = sorted(table_report['column_stats'].items(), key=lambda item: -item[1]['missing_share'])[:3]
+        missing = ', '.join(f"{col} {stats['missing_share']:.1%}" for col, stats in worst if stats['missing'])
+        print(f"  {table:<11} {table_report['rows']:>12,} rows   missing: {missing or 'none'}")
+    for warning in report['warnings']:
+        print(f"  ! {warning}")
+    for error in report['errors']:
+        print(f"  ✗ {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission profile',
+                                     description='Profile and validate the raw EMR tables')
+    parser.add_argument('--dataset', default=str(DEFAULT_DATASET),
+                        help='directory with the raw *CorePopulatedTable.txt files')
+    parser.add_argument('--out', default=None, help='write the JSON quality report here')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows read per chunk')
+    parser.add_argument('--max-invalid-share', type=float, default=MAX_INVALID_SHARE,
+                        help='share of unparseable numbers/dates in a column that counts as schema drift')
+    args = parser.parse_args(argv)
+
+    report = profile_dataset(args.dataset, args.chunksize, max_invalid_share=args.max_invalid_share,
+                             raise_on_error=False)
+    print_summary(report)
+    if args.out:
+        write_report(report, args.out)
+        print(f"✓ Saved: {args.out}")
+    if report['errors']:
+        print(f"✗ Schema drift: {len(report['errors'])} errors")
+        return 1
+    print(f"✓ {len(report['tables'])} tables valid ({len(report['warnings'])} warnings)")
+    return 0
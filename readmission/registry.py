@@ -0,0 +1,293 @@
+"""Hot-reloadable model registry with optional shadow scoring.
+
+``ModelRegistry`` serves the artifacts in a models directory and watches
+it from a background thread. When the directory has a bundle of the same
+model (``readmission.bundle``), a version serves its memory-mapped forest
+instead of unpickling the model. When the pickles change (a retrained
+model was exported) and have stayed unchanged for one more poll, the new
+version is loaded off the request path and swapped in by replacing one
+reference. Requests take ``registry.current()`` once and finish on that
+version, so a swap never interrupts one in flight; the previous versions
+stay loaded for ``activate`` (rollback). A rollback holds until the
+directory changes again: polls compare against the files last loaded,
+not the active version.
+
+A shadow models directory (a candidate model) can be watched too. Inputs
+passed to ``submit_shadow`` are scored by the shadow version in a
+separate thread through a bounded queue (full queue: the comparison is
+dropped, never the request). The shadow's probabilities are compared
+with what the active model returned; ``shadow_stats`` and the metrics
+registry record the differences, tier disagreements and per-version
+latency (``predict_seconds{caller="registry",version=...,role=...}``).
+
+    registry = ModelRegistry('models/', shadow_path='models_candidate/').start()
+    current = registry.current()
+    X, unknown = current.encoder.transform(raw_df)
+    proba = current.predict_proba(X)
+    registry.submit_shadow(raw_df, proba)
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from readmission import metrics
+from readmission.artifacts import (
+    DEFAULT_MODELS, ENCODERS_FILE, FEATURE_NAMES_FILE, MODEL_FILE, load_lab_medians, load_metrics,
+    load_model_artifacts, load_model_bundle, model_version
+)
+from readmission.encoding import FeatureEncoder
+from readmission.scoring import risk_tier
+
+DEFAULT_POLL_SECONDS = 5.0
+SHADOW_QUEUE_SIZE = 256
+KEEP_VERSIONS = 3
+
+
+class RegistryError(Exception):
+    """Raised when a models directory cannot be loaded as a consistent version."""
+
+
+def artifacts_fingerprint(models_path):
+    """(size, mtime_ns) of the three model pickles, or None while any of them is missing."""
+    fingerprint = []
+    for name in (MODEL_FILE, ENCODERS_FILE, FEATURE_NAMES_FILE):
+        try:
+            stat = os.stat(os.path.join(models_path, name))
+        except FileNotFoundError:
+            return None
+        fingerprint.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+
+class ModelVersion:
+    """One loaded set of artifacts: model, encoders, compiled encoder and version hash.
+
+    With a current bundle in the directory ``model`` is its memory-mapped
+    ``FlatForest`` and ``encoders`` its vocabulary lists; otherwise the
+    pickles are loaded (``bundle=False`` forces that).
+    """
+
+    def __init__(self, models_path, bundle=True):
+        self.models_path = str(models_path)
+        self.fingerprint = artifacts_fingerprint(self.models_path)
+        if self.fingerprint is None:
+            raise RegistryError(f"{self.models_path}: model artifacts are missing")
+        self.bundle = load_model_bundle(self.models_path) if bundle else None
+        if self.bundle is not None:
+            self.model, self.encoders, self.feature_names = (self.bundle.forest, self.bundle.vocabularies,
+                                                             self.bundle.feature_names)
+        else:
+            self.model, self.encoders, self.feature_names = load_model_artifacts(self.models_path)
+        self.version = model_version(self.models_path)
+        self.lab_medians = load_lab_medians(self.models_path)
+        self.metrics = load_metrics(self.models_path)
+        if artifacts_fingerprint(self.models_path) != self.fingerprint:
+            raise RegistryError(f"{self.models_path}: artifacts changed while loading")
+        self.encoder = FeatureEncoder.from_encoders(self.encoders, self.feature_names, self.lab_medians)
+        self.loaded_at = time.time()
+
+    def predict_proba(self, X, role='active'):
+        """``model.predict_proba`` on encoded rows, timed per version."""
+        with metrics.timer('predict_seconds', caller='registry', version=self.version, role=role):
+            return self.model.predict_proba(X)
+
+    def info(self):
+        return {
+            'version': self.version,
+            'models_path': self.models_path,
+            'estimator': type(self.model).__name__ + (' (bundle)' if self.bundle is not None else ''),
+            'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at)),
+        }
+
+
+class ShadowStats:
+    """Running comparison of shadow and active readmission probabilities."""
+
+    def __init__(self):
+        self.rows = 0
+        self.sum_abs_diff = 0.0
+        self.max_abs_diff = 0.0
+        self.prediction_flips = 0
+        self.tier_disagreements = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def record(self, active, shadow):
+        diff = np.abs(shadow - active)
+        self.rows += len(diff)
+        self.sum_abs_diff += float(diff.sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(diff.max(initial=0.0)))
+        self.prediction_flips += int(((active > 0.5) != (shadow > 0.5)).sum())
+        self.tier_disagreements += int((risk_tier(active) != risk_tier(shadow)).sum())
+        for value in diff:
+            metrics.observe('shadow_abs_diff', float(value))
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'mean_abs_diff': self.sum_abs_diff / self.rows if self.rows else None,
+            'max_abs_diff': self.max_abs_diff,
+            'prediction_flips': self.prediction_flips,
+            'tier_disagreements': self.tier_disagreements,
+            'errors': self.errors,
+            'dropped': self.dropped,
+        }
+
+
+class ModelRegistry:
+    """Active model version (hot-swapped on redeploy), retained versions and an optional shadow."""
+
+    def __init__(self, models_path=DEFAULT_MODELS, shadow_path=None, poll_seconds=DEFAULT_POLL_SECONDS,
+                 keep_versions=KEEP_VERSIONS, initial=None):
+        """``initial`` serves an already-loaded version (e.g. a ``SharedModel``) instead of loading
+        ``models_path``; ``poll_seconds=None`` turns watching off."""
+        self.models_path = str(models_path) if models_path else None
+        self.shadow_path = str(shadow_path) if shadow_path else None
+        self.poll_seconds = poll_seconds
+        self.keep_versions = keep_versions
+        self._active = initial if initial is not None else ModelVersion(self.models_path)
+        self.versions = OrderedDict([(self._active.version, self._active)])
+        self.shadow = ModelVersion(self.shadow_path) if self.shadow_path else None
+        self.shadow_stats = ShadowStats()
+        self.reloads = 0
+        self.last_error = None
+        # path -> fingerprint of the files last loaded from it, whichever version is active
+        self._loaded = {self.models_path: self._active.fingerprint}
+        if self.shadow is not None:
+            self._loaded[self.shadow_path] = self.shadow.fingerprint
+        # path -> fingerprint seen on the previous poll but not yet loaded
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._shadow_queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self._threads = []
+
+    def current(self):
+        """The active version; callers keep this reference for the whole request."""
+        return self._active
+
+    def start(self):
+        """Start the watcher (and shadow scoring) threads; returns ``self``."""
+        self._threads = []
+        if self.poll_seconds is not None and self.models_path:
+            self._threads.append(threading.Thread(target=self._watch, name='model-registry-watch', daemon=True))
+        if self.shadow_path:
+            self._threads.append(threading.Thread(target=self._run_shadow, name='model-registry-shadow',
+                                                  daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self.shadow_path:
+            self._shadow_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def check(self):
+        """Poll both directories once; returns True when a new active or shadow version was loaded."""
+        swapped = False
+        loaded = self._poll(self.models_path) if self.models_path else None
+        if loaded is not None:
+            self._install(loaded)
+            swapped = True
+        if self.shadow_path:
+            loaded = self._poll(self.shadow_path)
+            if loaded is not None:
+                with self._lock:
+                    self.shadow = loaded
+                    self.shadow_stats = ShadowStats()
+                swapped = True
+        return swapped
+
+    def _poll(self, path):
+        fingerprint = artifacts_fingerprint(path)
+        if fingerprint is None or fingerprint == self._loaded.get(path):
+            self._pending.pop(path, None)
+            return None
+        # Load only once the files have been stable for a poll, so a half-finished export is never mixed
+        if self._pending.get(path) != fingerprint:
+            self._pending[path] = fingerprint
+            return None
+        try:
+            loaded = ModelVersion(path)
+        except Exception as exc:
+            self.last_error = f"{path}: {exc}"
+            metrics.increment('model_reload_errors_total')
+            return None
+        self._pending.pop(path, None)
+        self._loaded[path] = loaded.fingerprint
+        self.last_error = None
+        return loaded
+
+    def _install(self, loaded):
+        with self._lock:
+            self.versions[loaded.version] = loaded
+            self.versions.move_to_end(loaded.version)
+            while len(self.versions) > self.keep_versions:
+                self.versions.popitem(last=False)
+            self._active = loaded
+            self.reloads += 1
+        metrics.increment('model_reloads_total', version=loaded.version)
+
+    def activate(self, version):
+        """Make a retained version active again (rollback); raises KeyError for unknown versions.
+
+        It stays active until the models directory changes again.
+        """
+        with self._lock:
+            self._active = self.versions[version]
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def submit_shadow(self, features_df, active_proba):
+        """Queue raw rows and the active model's probabilities for shadow comparison (never blocks)."""
+        if self.shadow is None:
+            return
+        try:
+            self._shadow_queue.put_nowait((features_df.copy(), np.asarray(active_proba)[:, 1]))
+        except queue.Full:
+            # Request threads and the shadow thread both update the stats
+            with self._lock:
+                self.shadow_stats.dropped += 1
+            metrics.increment('shadow_dropped_total')
+
+    def _run_shadow(self):
+        while True:
+            item = self._shadow_queue.get()
+            if item is None:
+                return
+            features_df, active = item
+            with self._lock:
+                shadow, stats = self.shadow, self.shadow_stats
+            try:
+                X, _ = shadow.encoder.transform(features_df, on_unknown='flag')
+                proba = shadow.predict_proba(X, role='shadow')[:, 1]
+            except Exception:
+                with self._lock:
+                    stats.errors += 1
+                metrics.increment('shadow_errors_total')
+                continue
+            with self._lock:
+                stats.record(active, proba)
+            metrics.increment('shadow_rows_total', len(proba), version=shadow.version)
+
+    def info(self):
+        with self._lock:
+            return {
+                'active': self._active.info(),
+                'retained': list(self.versions),
+                'reloads': self.reloads,
+                'last_error': self.last_error,
+                'shadow': self.shadow.info() if self.shadow is not None else None,
+                'shadow_stats': self.shadow_stats.as_dict() if self.shadow is not None else None,
+            }
@@ -0,0 +1,76 @@
+"""Compact dtype schema for the four EMR tables.
+
+With pandas' default inference every string column (PatientID, LabName,
+diagnosis codes, demographics) is one Python ``str`` object per row,
+AdmissionID is int64 and LabValue float64, so the labs table is dominated
+by repeated strings. ``read_emr_table`` applies an explicit schema while
+reading instead:
+
+- repeated strings -> ``category`` (small integer codes plus one dictionary
+  per column); PatientID is a UUID string in this dataset, so it is
+  dictionary-encoded rather than stored as an integer
+- AdmissionID -> int32
+- LabValue and the poverty percentage -> float32
+- date columns -> datetime64[ns], parsed once (unparseable values -> NaT)
+
+Lab averages are still accumulated in float64 (``aggregate_lab_sums``), so
+only the float32 rounding of the input values differs from the default
+load.
+"""
+
+import pandas as pd
+
+from readmission.storage import DATE_COLUMNS
+
+# Non-date column dtypes per raw (and cleaned) table
+TABLE_DTYPES = {
+    'patients': {
+        'PatientID': 'category',
+        'PatientGender': 'category',
+        'PatientRace': 'category',
+        'PatientMaritalStatus': 'category',
+        'PatientLanguage': 'category',
+        'PatientPopulationPercentageBelowPoverty': 'float32'
+    },
+    'admissions': {
+        'PatientID': 'category',
+        'AdmissionID': 'int32'
+    },
+    'diagnoses': {
+        'PatientID': 'category',
+        'AdmissionID': 'int32',
+        'PrimaryDiagnosisCode': 'category',
+        'PrimaryDiagnosisDescription': 'category'
+    },
+    'labs': {
+        'PatientID': 'category',
+        'AdmissionID': 'int32',
+        'LabName': 'category',
+        'LabValue': 'float32',
+        'LabUnits': 'category'
+    }
+}
+
+# The raw extracts write datetimes as 'YYYY-MM-DD HH:MM:SS.fff'
+DATE_FORMAT = 'ISO8601'
+
+
+def parse_dates(df, table):
+    """Parse ``table``'s date columns in place; returns ``df``."""
+    for col in DATE_COLUMNS.get(table, ()):
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+    return df
+
+
+def read_emr_table(path, table, sep='\t', usecols=None, compact=True):
+    """Read one of the four tables with the compact schema.
+
+    ``compact=False`` reads with pandas' default inference (strings stay
+    objects, dates stay text), as the notebooks originally did.
+    """
+    if not compact:
+        return pd.read_csv(path, sep=sep, usecols=usecols)
+    df = pd.read_csv(path, sep=sep, usecols=usecols, dtype=TABLE_DTYPES[table])
+    return parse_dates(df, table)
+
@@ -0,0 +1,232 @@
+"""Batch scoring of admissions in the training feature schema.
+
+The input file has one row per admission with the 10 model features
+(``LengthOfStay`` ... ``wbc_avg``) as raw values, i.e. ``PatientGender``
+as "Male"/"Female" and ``DiagnosisChapter`` as the ICD chapter letter.
+Extra columns such as PatientID/AdmissionID are passed through.
+
+Chunks are scored in a process pool (artifacts are loaded once per
+worker) with one ``predict_proba`` call per chunk, and results are
+streamed to the output CSV in input order. ``--explain`` adds one
+``<feature>_contribution`` column per model feature: its exact path-based
+share of the row's readmission probability (``FlatForest.contributions``).
+
+When the models directory has a bundle of the same model
+(``readmission.bundle``), workers memory-map its forest instead of each
+unpickling the model; ``--no-bundle`` loads the pickles.
+``--shared-memory`` publishes the forest once and workers attach to it
+(``readmission.shared_model``) instead.
+
+Rows are encoded with ``readmission.encoding.FeatureEncoder``. Values the
+model never saw (a gender or ICD chapter outside the trained vocabulary)
+are scored with the fallback code and named in the ``unknown_features``
+column, so they are never silently scored as a known category. Missing lab
+values are filled with the training medians recorded with the model
+(``--lab-medians`` supplies them otherwise), never with a statistic of the
+chunk, so a row's score does not depend on the rows scored with it.
+Without recorded medians a missing lab value is an error.
+
+Usage:
+    python -m readmission score discharges.csv scores.csv --workers 4 [--explain] [--shared-memory]
+                                [--lab-medians medians.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from readmission import metrics
+from readmission.artifacts import DEFAULT_MODELS, load_lab_medians, load_model_artifacts, load_model_bundle
+from readmission.bundle import load_bundle
+from readmission.encoding import FeatureEncoder, unknown_flags
+from readmission.forest import FlatForest
+from readmission.shared_model import SharedModel, publish_artifacts
+
+# Risk tiers on the readmission probability, as shown in the UI
+HIGH_RISK_THRESHOLD = 0.60
+MODERATE_RISK_THRESHOLD = 0.40
+RISK_TIERS = np.array(['LOW', 'MODERATE', 'HIGH'], dtype=object)
+
+DEFAULT_CHUNKSIZE = 50_000
+PASSTHROUGH_COLUMNS = ['PatientID', 'AdmissionID']
+CONTRIBUTION_SUFFIX = '_contribution'
+
+
+def risk_tier(probabilities):
+    """HIGH (>= 60%), MODERATE (>= 40%) or LOW for each readmission probability."""
+    probabilities = np.asarray(probabilities)
+    return RISK_TIERS[(probabilities >= MODERATE_RISK_THRESHOLD).astype(int)
+                      + (probabilities >= HIGH_RISK_THRESHOLD).astype(int)]
+
+
+def encode_features(features_df, encoders, feature_names, lab_medians=None, on_unknown='flag'):
+    """Encode raw feature rows into the model's input matrix; returns ``(X, unknown)``.
+
+    ``FeatureEncoder.transform`` with encoders as saved by training (or
+    bundle vocabulary lists): ``unknown`` maps each column with unseen
+    values to those values, and missing labs need the training
+    ``lab_medians``.
+    """
+    return FeatureEncoder.from_encoders(encoders, feature_names, lab_medians).transform(features_df, on_unknown)
+
+
+def readmission_contributions(forest, X):
+    """Per-feature contributions to the readmission (class 1) probability of encoded rows.
+
+    Returns a DataFrame with one ``<feature>_contribution`` column per
+    model feature; with ``forest.contributions``' bias they sum to the
+    probability.
+    """
+    _, contributions = forest.contributions(X)
+    class_index = list(forest.classes_).index(1)
+    features = forest.feature_names or list(getattr(X, 'columns', range(contributions.shape[1])))
+    return pd.DataFrame(contributions[:, :, class_index], columns=[f'{f}{CONTRIBUTION_SUFFIX}' for f in features],
+                        index=getattr(X, 'index', None))
+
+
+def score_frame(features_df, model, encoder, cache=None, model_version=None, explainer=None):
+    """Score a DataFrame; returns passthrough IDs plus probability, prediction, tier and unknown features.
+
+    ``encoder`` is the model's ``FeatureEncoder``. With a ``PredictionCache``
+    (and the model's version), only rows not seen before are sent to
+    ``predict_proba``. With an ``explainer`` (the model as a
+    ``FlatForest``), per-feature contribution columns are appended.
+    """
+    with metrics.timer('encode_seconds', caller='batch'):
+        X, unknown = encoder.transform(features_df, on_unknown='flag')
+    with metrics.timer('predict_seconds', caller='batch'):
+        if cache is not None:
+            proba = cache.predict_proba(X, model.predict_proba, model_version)[:, 1]
+        else:
+            proba = model.predict_proba(X)[:, 1]
+    metrics.increment('rows_scored_total', len(X), caller='batch')
+    result = features_df[[c for c in PASSTHROUGH_COLUMNS if c in features_df.columns]].copy()
+    result['readmission_probability'] = proba
+    # Same as model.predict: class 1 only when it strictly wins
+    result['prediction'] = (proba > 0.5).astype(int)
+    result['risk_tier'] = risk_tier(proba)
+    result['unknown_features'] = unknown_flags(features_df, unknown).to_numpy()
+    if explainer is not None:
+        with metrics.timer('explain_seconds', caller='batch'):
+            contributions = readmission_contributions(explainer, X)
+        result[list(contributions.columns)] = contributions.to_numpy()
+    return result
+
+
+# Per-process artifacts, set by _init_worker
+_worker_artifacts = None
+# The attached SharedModel: its forest and encoder are views on the segment, which stays mapped while it lives
+_worker_shared = None
+
+
+def _init_worker(models_path, explain=False, shared_name=None, lab_medians=None, bundle_path=None):
+    global _worker_artifacts, _worker_shared
+    if shared_name is not None:
+        # Attach to the published forest: no unpickling, pages shared with the other workers
+        shared = _worker_shared = SharedModel.attach(shared_name)
+        encoder = (FeatureEncoder(shared.feature_names, shared.vocabularies, lab_medians) if lab_medians
+                   else shared.encoder)
+        _worker_artifacts = (shared.forest, encoder, shared.forest if explain else None)
+        return
+    if bundle_path is not None:
+        # Verified by the parent; the tree arrays are memory-mapped and shared through the page cache
+        bundle = load_bundle(bundle_path, verify=False)
+        encoder = FeatureEncoder(bundle.feature_names, bundle.vocabularies,
+                                 lab_medians or load_lab_medians(models_path))
+        _worker_artifacts = (bundle.forest, encoder, bundle.forest if explain else None)
+        return
+    model, encoders, feature_names = load_model_artifacts(models_path)
+    # One process per core already; avoid oversubscribing with joblib threads
+    model.n_jobs = 1
+    explainer = FlatForest.from_sklearn(model) if explain else None
+    encoder = FeatureEncoder.from_encoders(encoders, feature_names, lab_medians or load_lab_medians(models_path))
+    _worker_artifacts = (model, encoder, explainer)
+
+
+def _score_chunk(chunk):
+    model, encoder, explainer = _worker_artifacts
+    return score_frame(chunk, model, encoder, explainer=explainer)
+
+
+def read_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Read a CSV (or .tsv/.txt tab-separated) file in chunks."""
+    sep = '\t' if str(path).endswith(('.tsv', '.txt')) else ','
+    return pd.read_csv(path, sep=sep, chunksize=chunksize)
+
+
+def score_file(input_path, output_path, models_path=DEFAULT_MODELS, chunksize=DEFAULT_CHUNKSIZE, workers=None,
+               explain=False, shared_model=None, lab_medians=None, use_bundle=True):
+    """Score ``input_path`` into ``output_path``; returns (rows, seconds).
+
+    ``explain`` adds per-feature contribution columns (random forests only).
+    ``shared_model`` names a shared-memory segment (``readmission.shared_model``)
+    that workers attach to instead of each loading the pickles.
+    ``lab_medians`` overrides the training medians recorded with the model.
+    Otherwise workers use the directory's bundle when it holds the same model
+    as the pickles (``use_bundle=False`` loads the pickles).
+    """
+    workers = workers or os.cpu_count() or 1
+    bundle = load_model_bundle(models_path) if use_bundle and shared_model is None else None
+    start = time.perf_counter()
+    written = []
+
+    def write(scored):
+        scored.to_csv(output_path, mode='a' if written else 'w', header=not written, index=False)
+        written.append(len(scored))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(models_path), explain, shared_model, lab_medians,
+                                       str(bundle.path) if bundle is not None else None)) as pool:
+        # Bounded window of in-flight chunks, written back in input order
+        in_flight = deque()
+        for chunk in read_chunks(input_path, chunksize):
+            in_flight.append(pool.submit(_score_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
+    return sum(written), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission score',
+                                     description='Batch-score a discharge list')
+    parser.add_argument('input_path', help='CSV/TSV with the 10 model features per admission')
+    parser.add_argument('output_path', help='CSV to write probabilities and risk tiers to')
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS))
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per predict_proba call')
+    parser.add_argument('--workers', type=int, default=None, help='scoring processes (default: all cores)')
+    parser.add_argument('--explain', action='store_true',
+                        help='add per-feature contributions to the readmission probability')
+    shared = parser.add_mutually_exclusive_group()
+    shared.add_argument('--shared-memory', action='store_true',
+                        help='publish the forest to shared memory once; workers attach instead of unpickling')
+    shared.add_argument('--attach', metavar='NAME', default=None,
+                        help='attach workers to a model hosted by `python -m readmission share --name NAME`')
+    shared.add_argument('--no-bundle', action='store_true',
+                        help="unpickle the model in every worker instead of mapping the models directory's bundle")
+    parser.add_argument('--lab-medians', help='JSON of training lab medians, if the model did not record them')
+    args = parser.parse_args(argv)
+
+    lab_medians = None
+    if args.lab_medians:
+        with open(args.lab_medians) as f:
+            lab_medians = json.load(f)
+    host = publish_artifacts(args.models_dir, f'readmission_score_{os.getpid()}') if args.shared_memory else None
+    try:
+        rows, seconds = score_file(args.input_path, args.output_path, args.models_dir, args.chunksize, args.workers,
+                                   args.explain, host.name if host else args.attach, lab_medians, not args.no_bundle)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        if host is not None:
+            host.close()
+    print(f"✓ Scored {rows:,} rows in {seconds:.2f}s ({rows / seconds:,.0f} rows/s)")
+    print(f"✓ Saved: {args.output_path}")
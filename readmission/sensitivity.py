@@ -0,0 +1,54 @@
+"""What-if sensitivity curves for one admission.
+
+For a chosen numeric feature, the current (encoded) feature row is
+repeated once per grid value with only that feature changed, and the
+whole grid is scored in one ``predict_proba`` call, so a sweep costs about
+as much as a single prediction.
+
+    curve = sensitivity_curve(model.predict_proba, X_row, 'creatinine_avg')
+    curve[['creatinine_avg', 'probability', 'risk_tier']]
+"""
+
+import numpy as np
+import pandas as pd
+
+from readmission.scoring import risk_tier
+
+# Feature -> (low, high, step) of the what-if grid, within the UI's input bounds
+SENSITIVITY_GRIDS = {
+    'LengthOfStay': (0, 30, 1),
+    'NumLabs': (0, 500, 10),
+    'PatientAge': (18, 100, 1),
+    'hemoglobin_avg': (5.0, 20.0, 0.25),
+    'glucose_avg': (40.0, 400.0, 5.0),
+    'creatinine_avg': (0.3, 8.0, 0.1),
+    'wbc_avg': (1.0, 30.0, 0.5),
+}
+
+
+def grid_values(feature, current=None):
+    """Grid for ``feature``, plus ``current`` so the curve passes through the patient's own value."""
+    low, high, step = SENSITIVITY_GRIDS[feature]
+    values = np.round(np.arange(low, high + step / 2, step), 6)
+    if current is not None:
+        values = np.union1d(values, [current])
+    return values
+
+
+def sensitivity_grid(row, feature, values):
+    """``row`` (a one-row encoded frame) repeated once per value, with ``feature`` set to it."""
+    grid = row.iloc[np.zeros(len(values), dtype=np.intp)].reset_index(drop=True)
+    grid[feature] = values
+    return grid
+
+
+def sensitivity_curve(predict_proba, row, feature, values=None):
+    """Readmission probability and risk tier across ``feature``'s grid, from one batched call.
+
+    ``predict_proba`` takes an encoded frame and returns class
+    probabilities (a model's, a ``FlatForest``'s, or a cache wrapper).
+    """
+    if values is None:
+        values = grid_values(feature, float(row[feature].iloc[0]))
+    proba = np.asarray(predict_proba(sensitivity_grid(row, feature, values)))[:, 1]
+    return pd.DataFrame({feature: values, 'probability': proba, 'risk_tier': risk_tier(proba)})
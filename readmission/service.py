@@ -0,0 +1,302 @@
+"""Local HTTP scoring service with dynamic micro-batching.
+
+Serves the artifacts from ``load_model_artifacts`` over a small JSON API:
+
+    POST /predict   {"LengthOfStay": 5, ..., "wbc_avg": 7.5}
+                    or {"instances": [{...}, {...}]}
+    GET  /health    model and batching configuration
+    GET  /stats     request/batch counters
+    GET  /metrics   latency histograms and counters (Prometheus text format)
+
+Each instance needs all 10 model features as raw values (``PatientGender``
+as "Male"/"Female", ``DiagnosisChapter`` as the ICD chapter letter). The
+response has ``probability``, ``prediction``, ``risk_tier`` and
+``confidence`` (probability of the predicted class) per instance. A
+category the model never saw is rejected with 400 and the unknown values
+(``UnknownCategoryError``); a null lab is filled with the training median,
+or rejected when the model recorded none.
+
+Request threads encode their rows and hand them to a ``MicroBatcher``,
+which coalesces concurrent requests into one ``predict_proba`` call of up
+to ``--max-batch-size`` rows, waiting at most ``--max-wait-ms`` after the
+first request of a batch. Rows are scored independently, so results do not
+depend on how requests were batched. ``--no-batching`` scores each request
+in its own thread instead. ``--cache-size`` enables a ``PredictionCache``
+in front of the model; its counters are part of ``/stats``.
+
+Usage:
+    python -m readmission serve --port 8500 --max-batch-size 64 --max-wait-ms 5
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from readmission import metrics
+from readmission.artifacts import DEFAULT_MODELS, load_lab_medians, load_model_artifacts, model_version
+from readmission.cache import DEFAULT_TTL_SECONDS, PredictionCache
+from readmission.encoding import FeatureEncoder, UnknownCategoryError
+from readmission.forest import FlatForest
+from readmission.scoring import risk_tier
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8500
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+ENGINES = ['sklearn', 'flat']
+
+
+class MicroBatcher:
+    """Coalesces concurrent ``submit`` calls into batched ``predict_fn`` calls.
+
+    ``predict_fn`` maps an (n_rows, n_features) array to class probabilities.
+    A single background thread collects queued requests until the batch has
+    ``max_batch_size`` rows or ``max_wait_ms`` has passed since the first one.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        """Queue rows for scoring; returns a Future of their probabilities."""
+        future = Future()
+        self._queue.put((np.asarray(X), future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        n_rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Let the run loop see the shutdown after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                # The request-level predict_seconds also includes the wait for the batch
+                with metrics.timer('batch_predict_seconds'):
+                    proba = self.predict_fn(np.concatenate([X for X, _ in batch]))
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.rows += len(proba)
+            start = 0
+            for X, future in batch:
+                future.set_result(proba[start:start + len(X)])
+                start += len(X)
+
+
+class ScoringService:
+    """Artifacts, request encoding and (optionally batched) prediction."""
+
+    def __init__(self, models_path=DEFAULT_MODELS, engine='sklearn', batching=True,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 cache_size=0, cache_ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.model, self.encoders, self.feature_names = load_model_artifacts(models_path)
+        self.model_version = model_version(models_path)
+        # Batches are small; joblib thread dispatch costs more than it saves
+        self.model.n_jobs = 1
+        self.engine = engine
+        if engine == 'flat':
+            if not hasattr(self.model, 'estimators_'):
+                raise ValueError(f"engine 'flat' needs a random forest, got {type(self.model).__name__}")
+            self._forest = FlatForest.from_sklearn(self.model)
+            self._predict_proba = self._forest.predict_proba
+        else:
+            self._predict_proba = self._sklearn_predict_proba
+        self.batcher = MicroBatcher(self._predict_proba, max_batch_size, max_wait_ms) if batching else None
+        # UI chapter labels ("IX - Circulatory system") are accepted too
+        self.encoder = FeatureEncoder.from_encoders(self.encoders, self.feature_names, load_lab_medians(models_path))
+        self.cache = PredictionCache(cache_size, cache_ttl_seconds) if cache_size > 0 else None
+        self.requests = 0
+
+    def _sklearn_predict_proba(self, X):
+        return self.model.predict_proba(pd.DataFrame(X, columns=self.feature_names))
+
+    def encode(self, instances):
+        """Validate and encode a list of feature dicts into the model's input array.
+
+        ``FeatureEncoder.encode_records`` with ``on_unknown='raise'``: the
+        same encoding as the batch scorer, but an unknown category raises
+        ``UnknownCategoryError`` instead of being scored with the fallback code.
+        """
+        X, _ = self.encoder.encode_records(instances, on_unknown='raise')
+        return X
+
+    def _score(self, X):
+        if self.batcher is not None:
+            return self.batcher.submit(X).result()
+        return self._predict_proba(X)
+
+    def predict(self, instances):
+        """Score feature dicts; returns one result dict per instance."""
+        with metrics.timer('encode_seconds', caller='service'):
+            X = self.encode(instances)
+        self.requests += 1
+        with metrics.timer('predict_seconds', caller='service', engine=self.engine):
+            if self.cache is not None:
+                proba = self.cache.predict_proba(X, self._score, self.model_version)
+            else:
+                proba = self._score(X)
+        metrics.increment('rows_scored_total', len(X), caller='service')
+        readmission = proba[:, 1]
+        return [
+            {'probability': float(p), 'prediction': int(p > 0.5), 'risk_tier': tier, 'confidence': float(c)}
+            for p, tier, c in zip(readmission, risk_tier(readmission), proba.max(axis=1))
+        ]
+
+    def info(self):
+        return {
+            'status': 'ok',
+            'engine': self.engine,
+            'model_version': self.model_version,
+            'estimator': type(self.model).__name__,
+            'n_trees': len(self.model.estimators_) if hasattr(self.model, 'estimators_') else None,
+            'features': list(self.feature_names),
+            'batching': self.batcher is not None,
+            'max_batch_size': self.batcher.max_batch_size if self.batcher else 1,
+            'max_wait_ms': self.batcher.max_wait * 1000.0 if self.batcher else 0.0,
+        }
+
+    def stats(self):
+        stats = {'requests': self.requests}
+        if self.batcher is not None:
+            batches = self.batcher.batches
+            stats.update(batches=batches, rows=self.batcher.rows,
+                         mean_batch_rows=self.batcher.rows / batches if batches else 0.0)
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so load tests can reuse connections
+    protocol_version = 'HTTP/1.1'
+    service = None
+    quiet = True
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.service.info())
+        elif self.path == '/stats':
+            self._send_json(200, self.service.stats())
+        elif self.path == '/metrics':
+            body = metrics.REGISTRY.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send_json(404, {'error': f"unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            instances = payload['instances'] if 'instances' in payload else [payload]
+            predictions = self.service.predict(instances)
+        except UnknownCategoryError as exc:
+            self._send_json(400, {'error': str(exc), 'unknown': exc.unknown})
+            return
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send_json(400, {'error': str(exc)})
+            return
+        self._send_json(200, {'predictions': predictions})
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default listen backlog of 5 resets bursts of concurrent clients
+    request_queue_size = 128
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=True):
+    """A threading HTTP server bound to ``service`` (port 0 picks a free port)."""
+    handler = type('BoundScoringHandler', (ScoringHandler,), {'service': service, 'quiet': quiet})
+    return ScoringServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m readmission serve',
+                                     description='Serve readmission risk predictions over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS))
+    parser.add_argument('--engine', choices=ENGINES, default='sklearn',
+                        help='sklearn predict_proba or the flattened NumPy forest (identical output)')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE, help='rows per predict_proba call')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help='how long a batch waits for more requests')
+    parser.add_argument('--no-batching', action='store_true', help='score every request on its own')
+    parser.add_argument('--cache-size', type=int, default=0, help='prediction cache entries (0: no cache)')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL_SECONDS, help='prediction cache TTL in seconds')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    service = ScoringService(args.models_dir, args.engine, not args.no_batching, args.max_batch_size, args.max_wait_ms,
+                             args.cache_size, args.cache_ttl)
+    server = make_server(service, args.host, args.port, quiet=not args.verbose)
+    host, port = server.server_address[:2]
+    batching = 'off' if args.no_batching else f"max {args.max_batch_size} rows / {args.max_wait_ms:g} ms"
+    print(f"✓ Serving {args.engine} model on http://{host}:{port} (micro-batching: {batching})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,207 @@
+"""Multi-process feature engineering, sharded by PatientID.
+
+Every feature in ``model_df`` is computed per patient or per admission
+(lab averages, readmission labels, the patient merge and the primary
+diagnosis), so the cleaned tables can be split by a PatientID hash and
+each shard processed independently in a process pool.
+
+With ``workers <= 1`` (the default on a one-core machine) the serial
+functions run in-process; there is no pool and no sharding. Otherwise the
+workers receive the whole tables once and cut their own shards. Each
+shard's categorical PatientID keeps only its own patients, so a shard
+costs in proportion to its rows rather than to every patient in the data.
+
+Shard outputs are concatenated and stably sorted by PatientID. Each shard
+keeps its rows in input order and holds all rows of its patients, so the
+result has the same rows, order, index and values as the serial path.
+The two values that are not per-patient are fixed up front for all
+shards: the age reference date and the median age used to fill missing
+ages.
+
+Usage::
+
+    model_df = build_model_df_parallel(cleaned_tables, workers=8)
+"""
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from readmission.features import build_model_df, create_readmission_labels, patient_ages
+from readmission.lab_features import CRITICAL_LABS, aggregate_lab_features
+from readmission.storage import PARTITION_COLUMN, partition_of
+
+# Shards per worker; more shards even out uneven patient sizes
+SHARDS_PER_WORKER = 4
+
+
+def id_partition(id_dtype, n_shards):
+    """Split a categorical PatientID dtype over ``n_shards``.
+
+    Returns the categories, each category's shard (with the missing-ID
+    shard last), each category's code within its shard (-1 last), and the
+    dtype of each shard's categories. Computed once for every table whose
+    PatientID holds the same categories.
+    """
+    categories = id_dtype.categories
+    every_id = pd.Categorical.from_codes(np.append(np.arange(len(categories)), -1), dtype=id_dtype)
+    category_shards = partition_of(pd.Series(every_id), n_shards)
+    order = np.argsort(category_shards[:-1], kind='stable')
+    bounds = np.searchsorted(category_shards[:-1][order], np.arange(n_shards + 1))
+    shard_codes = np.full(len(categories) + 1, -1, dtype=np.int32)
+    shard_codes[order] = np.arange(len(categories)) - bounds[category_shards[order]]
+    shard_dtypes = [pd.CategoricalDtype(categories[order[bounds[shard]:bounds[shard + 1]]], id_dtype.ordered)
+                    for shard in range(n_shards)]
+    return categories, category_shards, shard_codes, shard_dtypes
+
+
+def _shard_plan(df, n_shards, partition=None):
+    """Shard of each row of ``df``, and its PatientID codes in ``partition``'s categories (None without one)."""
+    if partition is None:
+        return partition_of(df[PARTITION_COLUMN], n_shards), None
+    categories, category_shards, _, _ = partition
+    ids = df[PARTITION_COLUMN]
+    codes = ids.cat.codes.to_numpy()
+    if not ids.cat.categories.equals(categories):
+        # Tables read in chunks list the same IDs in a different order
+        codes = np.append(categories.get_indexer(ids.cat.categories), -1)[codes]
+    return category_shards[codes], codes
+
+
+def _take_shard(df, rows, codes, shard, partition=None):
+    frame = df.iloc[rows]
+    if partition is None:
+        return frame
+    _, _, shard_codes, shard_dtypes = partition
+    shard_ids = pd.Categorical.from_codes(shard_codes[codes[rows]], dtype=shard_dtypes[shard])
+    return frame.assign(**{PARTITION_COLUMN: pd.Series(shard_ids, index=frame.index)})
+
+
+def shard_frame(df, n_shards, partition=None):
+    """Split ``df`` into ``n_shards`` frames by PatientID hash, keeping row order and index.
+
+    With ``partition`` (``id_partition`` of a categorical dtype with the
+    same categories as the frame's PatientID, in any order) each shard's
+    PatientID keeps only the categories that hash to the shard, the same
+    dtype in every table split this way. Merges and groupbys on a
+    categorical pay for every category, so unpruned, each shard would cost
+    as much as the whole table.
+    """
+    shards, codes = _shard_plan(df, n_shards, partition)
+    # numpy radix-sorts 16-bit integers, much faster than a merge sort of int32
+    order = np.argsort(shards.astype(np.int16) if n_shards <= np.iinfo(np.int16).max else shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(n_shards + 1))
+    return [_take_shard(df, order[bounds[shard]:bounds[shard + 1]], codes, shard, partition)
+            for shard in range(n_shards)]
+
+
+def concat_shards(frames, ignore_index=True, id_dtype=None):
+    """Concatenate shard outputs and stably sort them by PatientID.
+
+    Use ``ignore_index=False`` when the per-shard function keeps the input
+    index (as ``create_readmission_labels`` does). ``id_dtype`` restores
+    the PatientID dtype of shards cut with an ``id_partition``.
+    """
+    non_empty = [df for df in frames if len(df)] or frames[:1]
+    combined = pd.concat(non_empty)
+    if id_dtype is not None and PARTITION_COLUMN in combined:
+        combined[PARTITION_COLUMN] = combined[PARTITION_COLUMN].astype(id_dtype)
+    combined = combined.sort_values(PARTITION_COLUMN, kind='stable', na_position='last')
+    return combined.reset_index(drop=True) if ignore_index else combined
+
+
+def map_patient_shards(func, tables, workers=None, n_shards=None, ignore_index=True):
+    """Run ``func(**shard_tables)`` on PatientID shards of ``tables`` in a process pool.
+
+    ``tables`` maps argument name -> DataFrame with a PatientID column;
+    ``func`` must be picklable. Returns the concatenated output, as
+    ``concat_shards``. With one worker, ``func`` runs on the whole tables
+    in this process: a one-process pool only adds the cost of pickling
+    every shard, and the output is the same.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return func(**tables)
+    n_shards = n_shards or workers * SHARDS_PER_WORKER
+    # Shards drop other patients' categories when every table's PatientID holds the same categories, as
+    # the cleaned tables do. The output gets back the first table's dtype, the one the serial merges keep.
+    id_dtype = next(iter(tables.values()))[PARTITION_COLUMN].dtype
+    prune_ids = (isinstance(id_dtype, pd.CategoricalDtype)
+                 and all(df[PARTITION_COLUMN].dtype == id_dtype for df in tables.values()))
+    partition = id_partition(id_dtype, n_shards) if prune_ids else None
+    # Workers get the whole tables once (inherited, not pickled, when processes fork) and cut their own
+    # shards, so the parent only assigns rows to shards
+    plans = {name: _shard_plan(df, n_shards, partition) for name, df in tables.items()}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(func, tables, plans, partition)) as pool:
+        frames = list(pool.map(_run_shard, range(n_shards)))
+    return concat_shards(frames, ignore_index, id_dtype if prune_ids else None)
+
+
+# Per-process function, tables and shard plans, set by _init_worker
+_worker_job = None
+
+
+def _init_worker(func, tables, plans, partition):
+    global _worker_job
+    _worker_job = func, tables, plans, partition
+
+
+def _run_shard(shard):
+    func, tables, plans, partition = _worker_job
+    shard_tables = {}
+    for name, df in tables.items():
+        shards, codes = plans[name]
+        shard_tables[name] = _take_shard(df, np.flatnonzero(shards == shard), codes, shard, partition)
+    return func(**shard_tables)
+
+
+def _fixed_age_inputs(patients_df, reference_date):
+    """Reference date and missing-age fill shared by all shards."""
+    reference = pd.Timestamp(reference_date) if reference_date is not None else pd.Timestamp('today')
+    # Median-filling leaves the median unchanged, so this is the serial path's fill value
+    return reference, patient_ages(patients_df, reference).median()
+
+
+def _build_shard(admissions, patients, diagnoses, labs, critical_labs, reference_date, age_fill):
+    lab_features = aggregate_lab_features(labs, critical_labs)
+    labelled = create_readmission_labels(admissions)
+    return build_model_df(labelled, patients, diagnoses, lab_features, reference_date, age_fill)
+
+
+def build_model_df_parallel(tables, critical_labs=CRITICAL_LABS, reference_date=None, workers=None, n_shards=None):
+    """Build ``model_df`` from the cleaned tables with one process-pool pass.
+
+    Lab aggregation, labels and all merges run per shard. The output is
+    identical to ``build_model_df(create_readmission_labels(...), ...,
+    aggregate_lab_features(...), reference_date)``.
+    """
+    reference, age_fill = _fixed_age_inputs(tables['patients'], reference_date)
+    build = functools.partial(_build_shard, critical_labs=critical_labs, reference_date=reference, age_fill=age_fill)
+    return map_patient_shards(build, {name: tables[name] for name in ('admissions', 'patients', 'diagnoses', 'labs')},
+                              workers, n_shards)
+
+
+def merge_model_df_parallel(admissions_df, patients_df, diagnoses_df, lab_features, reference_date=None,
+                            workers=None, n_shards=None):
+    """``build_model_df`` over PatientID shards, for already labelled admissions and lab features."""
+    reference, age_fill = _fixed_age_inputs(patients_df, reference_date)
+    merge = functools.partial(build_model_df, reference_date=reference, age_fill=age_fill)
+    tables = {'admissions_df': admissions_df, 'patients_df': patients_df,
+              'diagnoses_df': diagnoses_df, 'lab_features': lab_features}
+    return map_patient_shards(merge, tables, workers, n_shards)
+
+
+def aggregate_lab_features_parallel(labs_df, critical_labs=CRITICAL_LABS, workers=None, n_shards=None):
+    """``aggregate_lab_features`` over PatientID shards in a process pool."""
+    return map_patient_shards(functools.partial(aggregate_lab_features, critical_labs=critical_labs),
+                              {'labs_df': labs_df}, workers, n_shards)
+
+
+def create_readmission_labels_parallel(admissions_df, workers=None, n_shards=None):
+    """``create_readmission_labels`` over PatientID shards; keeps the input index like the serial path."""
+    return map_patient_shards(create_readmission_labels, {'admissions_df': admissions_df}, workers, n_shards,
+                              ignore_index=False)
@@ -0,0 +1,245 @@
+"""Forest node arrays and encoder tables hosted in shared memory.
+
+One loader process publishes a model into a named POSIX shared-memory
+segment; any number of worker processes (batch-scoring workers, Streamlit
+servers) attach to it read-only. Attaching parses a small JSON layout and
+creates NumPy views on the segment, with no unpickling and no copy of the
+trees. The pages are shared, so the forest is resident in memory once per
+host instead of once per process.
+
+Segment layout::
+
+    [8-byte little-endian length][JSON layout][padding][array 0][array 1]...
+
+The JSON holds the model version, classes, feature names, encoder
+vocabularies, training lab medians, evaluation metrics, max depth and
+each array's dtype, shape and offset (relative to the first array,
+64-byte aligned).
+
+    python -m readmission share --models-dir models/ --name readmission_model   # host
+    model = SharedModel.attach('readmission_model')                             # worker
+    X, _ = model.encoder.transform(raw_df)
+    proba = model.predict_proba(X)
+
+The segment exists until the host stops (``SharedModelHost.close`` unlinks
+it); workers that are still attached keep their mapping until they exit.
+
+Usage:
+    python -m readmission share [--models-dir models/ | --bundle models/bundle] [--name readmission_model]
+"""
+
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from readmission.encoding import FeatureEncoder
+from readmission.forest import ARRAY_NAMES, FlatForest
+
+DEFAULT_NAME = 'readmission_model'
+LENGTH_BYTES = 8
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _attach_segment(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Before 3.13 attaching registers the segment with this process's resource tracker,
+    # which would unlink it (for every process) when this one exits
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class SharedModelHost:
+    """Owner of a published segment; ``close`` unlinks it."""
+
+    def __init__(self, shm, layout):
+        self.shm = shm
+        self.layout = layout
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def version(self):
+        return self.layout['model_version']
+
+    @property
+    def size(self):
+        return self.shm.size
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.shm.close()
+        if sys.version_info < (3, 13):
+            # Forked attachers share this process's tracker and unregistered the name; re-register
+            # so unlink's own unregister finds it
+            resource_tracker.register(self.shm._name, 'shared_memory')
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def publish(forest, vocabularies, feature_names, lab_medians=None, model_version=None, name=DEFAULT_NAME,
+            metrics=None):
+    """Copy a ``FlatForest`` and its encoder tables into a new shared-memory segment ``name``."""
+    arrays = {array_name: np.ascontiguousarray(array) for array_name, array in forest.arrays().items()}
+    specs = {}
+    offset = 0
+    for array_name in ARRAY_NAMES:
+        offset = _align(offset)
+        array = arrays[array_name]
+        specs[array_name] = {'dtype': str(array.dtype), 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    layout = {
+        'model_version': model_version,
+        'classes': forest.classes_.tolist(),
+        'feature_names': list(feature_names),
+        'vocabularies': {col: [str(value) for value in getattr(classes, 'classes_', classes)]
+                         for col, classes in vocabularies.items()},
+        'lab_medians': {col: float(value) for col, value in lab_medians.items()} if lab_medians else None,
+        'metrics': metrics or None,
+        'max_depth': forest.max_depth,
+        'arrays': specs,
+    }
+    header = json.dumps(layout).encode()
+    data_start = _align(LENGTH_BYTES + len(header))
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=data_start + offset)
+    try:
+        shm.buf[:LENGTH_BYTES] = len(header).to_bytes(LENGTH_BYTES, 'little')
+        shm.buf[LENGTH_BYTES:LENGTH_BYTES + len(header)] = header
+        for array_name, spec in specs.items():
+            view = np.ndarray(spec['shape'], dtype=spec['dtype'], buffer=shm.buf, offset=data_start + spec['offset'])
+            view[...] = arrays[array_name]
+            del view
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return SharedModelHost(shm, layout)
+
+
+def publish_artifacts(models_path, name=DEFAULT_NAME):
+    """Publish the pickled model in ``models_path`` (needs a random forest)."""
+    # Only the host needs sklearn and the pickles
+    from readmission.artifacts import load_lab_medians, load_metrics, load_model_artifacts, model_version
+
+    model, encoders, feature_names = load_model_artifacts(models_path)
+    if not hasattr(model, 'estimators_'):
+        raise ValueError(f"shared-memory hosting needs a random forest, got {type(model).__name__}")
+    return publish(FlatForest.from_sklearn(model), encoders, feature_names, load_lab_medians(models_path),
+                   model_version(models_path), name, load_metrics(models_path))
+
+
+def publish_bundle(bundle_path, name=DEFAULT_NAME):
+    """Publish a model bundle (no sklearn needed)."""
+    from readmission.bundle import load_bundle
+
+    bundle = load_bundle(bundle_path)
+    return publish(bundle.forest, bundle.vocabularies, bundle.feature_names, bundle.lab_medians, bundle.version,
+                   name, bundle.metrics)
+
+
+class SharedModel:
+    """Read-only view of a published model: forest, compiled encoder and metadata."""
+
+    # No file fingerprint: a ModelRegistry serving this version never reloads it from disk
+    fingerprint = None
+
+    def __init__(self, shm):
+        self.shm = shm
+        length = int.from_bytes(shm.buf[:LENGTH_BYTES], 'little')
+        self.layout = json.loads(bytes(shm.buf[LENGTH_BYTES:LENGTH_BYTES + length]))
+        data_start = _align(LENGTH_BYTES + length)
+        arrays = {}
+        for array_name, spec in self.layout['arrays'].items():
+            array = np.ndarray(spec['shape'], dtype=spec['dtype'], buffer=shm.buf, offset=data_start + spec['offset'])
+            array.flags.writeable = False
+            arrays[array_name] = array
+        self.forest = FlatForest(arrays, self.layout['classes'], self.layout['feature_names'],
+                                 self.layout['max_depth'])
+        self.encoder = FeatureEncoder(self.feature_names, self.vocabularies, self.layout['lab_medians'])
+        self.loaded_at = time.time()
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME):
+        """Attach to the segment published as ``name``; raises FileNotFoundError if there is none."""
+        return cls(_attach_segment(name))
+
+    @property
+    def model(self):
+        return self.forest
+
+    @property
+    def version(self):
+        return self.layout['model_version']
+
+    @property
+    def feature_names(self):
+        return self.layout['feature_names']
+
+    @property
+    def vocabularies(self):
+        return self.layout['vocabularies']
+
+    @property
+    def metrics(self):
+        return self.layout.get('metrics')
+
+    @property
+    def encoders(self):
+        # Vocabulary lists are accepted wherever fitted encoders are (encode_features, FeatureEncoder)
+        return self.vocabularies
+
+    def predict_proba(self, X, role='active'):
+        return self.forest.predict_proba(X)
+
+    def info(self):
+        return {
+            'version': self.version,
+            'models_path': f'shm://{self.shm.name}',
+            'estimator': 'FlatForest (shared memory)',
+            'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at)),
+        }
+
+
+def main(argv=None):
+    from readmission.artifacts import DEFAULT_MODELS
+
+    parser = argparse.ArgumentParser(prog='python -m readmission share',
+                                     description='Host the model in shared memory for worker processes')
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS), help='publish the pickled model from here')
+    parser.add_argument('--bundle', default=None, help='publish this model bundle instead of the pickles')
+    parser.add_argument('--name', default=DEFAULT_NAME, help='shared-memory segment name')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    host = publish_bundle(args.bundle, args.name) if args.bundle else publish_artifacts(args.models_dir, args.name)
+    print(f"✓ Model {host.version} published to shared memory '{host.name}' "
+          f"({host.size / 2**20:.1f} MiB, {time.perf_counter() - start:.2f}s); Ctrl-C to stop", flush=True)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.close()
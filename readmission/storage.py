@@ -0,0 +1,155 @@
+"""Columnar, PatientID-partitioned storage for the cleaned tables.
+
+Replaces the ``cleaned_data/*.csv`` round-trip. Each table is written as one
+directory per PatientID hash partition with one ``.npy`` file per column,
+so reads are column-projected (only requested files are opened) and
+memory-mapped. Dates are stored as ``datetime64[ns]`` and never re-parsed.
+String columns are dictionary-encoded: per-partition int32 codes plus one
+categories array shared by all partitions of the table.
+
+Layout::
+
+    <root>/<table>/_schema.json
+    <root>/<table>/<column>.categories.npy
+    <root>/<table>/part-00003/<column>.npy
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CLEANED_TABLES = ['patients', 'admissions', 'diagnoses', 'labs']
+
+# Date columns parsed once at write time, per cleaned table
+DATE_COLUMNS = {
+    'patients': ['PatientDateOfBirth'],
+    'admissions': ['AdmissionStartDate', 'AdmissionEndDate'],
+    'diagnoses': [],
+    'labs': ['LabDateTime']
+}
+
+DEFAULT_PARTITIONS = 16
+PARTITION_COLUMN = 'PatientID'
+SCHEMA_FILE = '_schema.json'
+
+
+def partition_of(patient_ids, n_partitions):
+    """Stable PatientID -> partition number (independent of process and run)."""
+    if isinstance(patient_ids.dtype, pd.CategoricalDtype):
+        # Hash each category once; a lab table repeats every PatientID hundreds of times.
+        # The trailing entry is the hash of a missing ID, for code -1.
+        categories = np.append(np.asarray(patient_ids.cat.categories, dtype=object), np.nan)
+        hashes = pd.util.hash_array(categories)[patient_ids.cat.codes.to_numpy()]
+    else:
+        hashes = pd.util.hash_array(np.asarray(patient_ids, dtype=object))
+    return (hashes % np.uint64(n_partitions)).astype(np.int32)
+
+
+def _column_kind(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    return 'category'
+
+
+def _partition_dir(table_dir, partition):
+    return table_dir / f'part-{partition:05d}'
+
+
+def write_table(df, root, name, n_partitions=DEFAULT_PARTITIONS, date_columns=()):
+    """Write ``df`` as table ``name`` under ``root``, replacing any old copy."""
+    table_dir = Path(root) / name
+    if table_dir.exists():
+        shutil.rmtree(table_dir)
+    table_dir.mkdir(parents=True)
+
+    df = df.copy()
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+
+    columns = {}
+    encoded = {}
+    for col in df.columns:
+        kind = _column_kind(df[col])
+        if kind == 'category':
+            codes, categories = pd.factorize(df[col], sort=True)
+            np.save(table_dir / f'{col}.categories.npy', np.asarray(categories, dtype=str))
+            encoded[col] = codes.astype(np.int32)
+        elif kind == 'datetime':
+            encoded[col] = df[col].to_numpy(dtype='datetime64[ns]')
+        else:
+            encoded[col] = df[col].to_numpy()
+        columns[col] = {'kind': kind, 'dtype': str(encoded[col].dtype)}
+
+    partitions = partition_of(df[PARTITION_COLUMN], n_partitions)
+    order = np.argsort(partitions, kind='stable')
+    bounds = np.searchsorted(partitions[order], np.arange(n_partitions + 1))
+    rows = []
+    for partition in range(n_partitions):
+        idx = order[bounds[partition]:bounds[partition + 1]]
+        part_dir = _partition_dir(table_dir, partition)
+        part_dir.mkdir()
+        for col, values in encoded.items():
+            np.save(part_dir / f'{col}.npy', values[idx])
+        rows.append(len(idx))
+
+    schema = {'columns': columns, 'n_partitions': n_partitions, 'partition_rows': rows}
+    (table_dir / SCHEMA_FILE).write_text(json.dumps(schema, indent=2))
+
+
+def read_schema(root, name):
+    """Column kinds, dtypes and partition row counts for a stored table."""
+    return json.loads((Path(root) / name / SCHEMA_FILE).read_text())
+
+
+def read_table(root, name, columns=None, partitions=None, mmap=True, categorical=False):
+    """Read a stored table.
+
+    ``columns`` limits which column files are opened; ``partitions`` limits
+    which PatientID partitions are read. String columns are decoded back to
+    Python strings unless ``categorical=True``, which returns them as
+    pandas categoricals sharing the stored dictionary. Rows come back grouped
+    by partition, in their original order within each partition.
+    """
+    table_dir = Path(root) / name
+    schema = read_schema(root, name)
+    columns = list(schema['columns']) if columns is None else list(columns)
+    missing = [col for col in columns if col not in schema['columns']]
+    if missing:
+        raise KeyError(f"Columns not in stored table '{name}': {missing}")
+    if partitions is None:
+        partitions = range(schema['n_partitions'])
+    mmap_mode = 'r' if mmap else None
+
+    data = {}
+    for col in columns:
+        parts = [np.load(_partition_dir(table_dir, p) / f'{col}.npy', mmap_mode=mmap_mode) for p in partitions]
+        values = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        if schema['columns'][col]['kind'] == 'category':
+            categories = np.load(table_dir / f'{col}.categories.npy', mmap_mode=mmap_mode)
+            values = pd.Categorical.from_codes(np.asarray(values), categories=pd.Index(categories, dtype=object))
+            if not categorical:
+                values = np.asarray(values, dtype=object)
+        data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def write_cleaned_tables(tables, root, n_partitions=DEFAULT_PARTITIONS):
+    """Write the cleaned patients/admissions/diagnoses/labs frames."""
+    for name, df in tables.items():
+        write_table(df, root, name, n_partitions, DATE_COLUMNS.get(name, ()))
+
+
+def read_cleaned_tables(root, columns=None, partitions=None, categorical=False):
+    """Read all cleaned tables; ``columns`` maps table name -> column list."""
+    columns = columns or {}
+    return {
+        name: read_table(root, name, columns.get(name), partitions, categorical=categorical)
+        for name in CLEANED_TABLES
+        if (Path(root) / name / SCHEMA_FILE).exists()
+    }
@@ -0,0 +1,134 @@
+"""Balancing, feature preparation, training and artifact export (model-training.ipynb, sections 6-14)."""
+
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from readmission.artifacts import (
+    ENCODERS_FILE, FEATURE_NAMES_FILE, LAB_MEDIANS_FILE, METRICS_FILE, MODEL_FILE, model_version
+)
+from readmission.bundle import BUNDLE_DIR, write_bundle
+from readmission.engines import DEFAULT_ENGINE, get_engine
+from readmission.features import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, LAB_COLUMNS, TARGET_COLUMN
+
+
+def balance_dataset(model_df, n_healthy=200, random_state=42):
+    """Keep every readmitted row plus ``n_healthy`` sampled non-readmitted rows, shuffled.
+
+    ``n_healthy=None`` keeps every non-readmitted row (full-data engines).
+    """
+    readmitted_df = model_df[model_df[TARGET_COLUMN] == 1].copy()
+    not_readmitted_df = model_df[model_df[TARGET_COLUMN] == 0].copy()
+
+    if n_healthy is None:
+        sampled_healthy = not_readmitted_df
+    else:
+        sampled_healthy = not_readmitted_df.sample(n=min(n_healthy, len(not_readmitted_df)),
+                                                   random_state=random_state)
+    balanced_df = pd.concat([readmitted_df, sampled_healthy], ignore_index=True)
+    return balanced_df.sample(frac=1, random_state=random_state).reset_index(drop=True)
+
+
+def prepare_features(model_df):
+    """Build the encoded feature matrix.
+
+    Returns ``(X, y, label_encoders, lab_medians)``; missing lab values are
+    filled with the median of this frame, which ``lab_medians`` records.
+    """
+    X = model_df[FEATURE_COLUMNS].copy()
+    y = model_df[TARGET_COLUMN].copy()
+
+    # Handle missing lab values (fill with median - indicates test not done)
+    lab_medians = {}
+    for col in LAB_COLUMNS:
+        lab_medians[col] = float(X[col].median())
+        X[col] = X[col].fillna(lab_medians[col])
+
+    # Encode categorical variables
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder()
+        X[col] = le.fit_transform(X[col].astype(str))
+        label_encoders[col] = le
+
+    return X, y, label_encoders, lab_medians
+
+
+def split_features(X, y, test_size=0.2, random_state=42):
+    """Stratified train/test split."""
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+
+def train_model(X_train, y_train, engine=DEFAULT_ENGINE, params=None):
+    """Fit the named engine (see ``readmission.engines``) with ``params`` over its defaults."""
+    return get_engine(engine).fit(X_train, y_train, params)
+
+
+def train_random_forest(X_train, y_train, params=None):
+    """Fit the readmission RandomForestClassifier."""
+    return train_model(X_train, y_train, 'random_forest', params)
+
+
+def evaluate_model(model, X, y):
+    """Accuracy, precision, recall, F1 and ROC-AUC on (X, y)."""
+    y_pred = model.predict(X)
+    y_pred_proba = model.predict_proba(X)[:, 1]
+    return {
+        'accuracy': float(accuracy_score(y, y_pred)),
+        'precision': float(precision_score(y, y_pred, zero_division=0)),
+        'recall': float(recall_score(y, y_pred, zero_division=0)),
+        'f1': float(f1_score(y, y_pred, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y, y_pred_proba)) if len(np.unique(y)) > 1 else float('nan')
+    }
+
+
+def _write_pickle(obj, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _write_json(obj, path):
+    """Rename ``obj`` as JSON into ``path``, or remove ``path`` when there is nothing to write."""
+    if not obj:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path + '.tmp', 'w') as f:
+        json.dump(obj, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def save_artifacts(models_path, model, label_encoders, feature_names, lab_medians=None, metrics=None):
+    """Write the three pickles the UI loads, the training lab medians and metrics, and the versioned model bundle.
+
+    Returns the bundle manifest. Its ``model_version`` is the pickle hash.
+    The bundle holds flattened forest arrays, so other engines get no bundle
+    (a stale one is removed) and the returned dict has only ``model_version``.
+    """
+    os.makedirs(models_path, exist_ok=True)
+    # Each file is renamed into place, so a watching ModelRegistry never reads a partial one. The medians and
+    # metrics go first: the registry reloads once the pickles change, and then finds the new model's. A stale
+    # file would describe a different model, so one with nothing to write is removed.
+    _write_json({col: float(value) for col, value in (lab_medians or {}).items()},
+                os.path.join(models_path, LAB_MEDIANS_FILE))
+    _write_json(metrics, os.path.join(models_path, METRICS_FILE))
+    _write_pickle(model, os.path.join(models_path, MODEL_FILE))
+    _write_pickle(label_encoders, os.path.join(models_path, ENCODERS_FILE))
+    _write_pickle(list(feature_names), os.path.join(models_path, FEATURE_NAMES_FILE))
+    bundle_path = os.path.join(models_path, BUNDLE_DIR)
+    # The bundle carries the pickle's version, so both name the same model
+    version = model_version(models_path)
+    if not isinstance(model, RandomForestClassifier):
+        shutil.rmtree(bundle_path, ignore_errors=True)
+        return {'model_version': version}
+    return write_bundle(bundle_path, model, label_encoders, feature_names, lab_medians, metrics, version)
@@ -0,0 +1,509 @@
+"""Event-driven scoring of discharge files dropped into a directory.
+
+The EHR export writes one batch of discharges per set of TSV files
+sharing a stem::
+
+    <stem>.admissions.tsv   required, shaped like AdmissionsCorePopulatedTable
+    <stem>.labs.tsv         optional, LabsCorePopulatedTable rows of those admissions
+    <stem>.diagnoses.tsv    optional, AdmissionsDiagnosesCorePopulatedTable rows
+    <stem>.patients.tsv     optional, PatientCorePopulatedTable rows of new patients
+
+A batch is picked up once its files have had the same size and mtime for
+one poll (as the model registry does for pickles), so a half-written
+export is never read. A scanner thread finds ready batches; a scoring
+thread drains everything queued at that moment, builds the 10 model
+features per file with the training code (``create_readmission_labels``
+over the patient's earlier admissions, ``build_model_df``, lab
+aggregation) and scores all of them with one ``predict_proba`` call.
+
+``PreviousAdmissions`` and the demographics come from a history of earlier
+admissions and patients (a cleaned-table store or the raw dataset), which
+every scored file extends. Admissions without labs get ``NumLabs`` 0 and
+the training lab medians; a file needing medians the model did not record
+fails (``--lab-medians`` supplies them). Unknown categories are scored
+with the fallback code and listed in ``unknown_features``.
+
+Results are renamed into ``<out>/<stem>.scores.csv``, the output queue for
+downstream consumers. A batch's admissions and patients join the history
+only once its output is written; the files scored in the same call see
+each other's through a fork of the history. ``<out>/_checkpoint.json``
+records each batch's file fingerprint after its output is written, so a
+restart skips what was scored (a batch whose output was written but not
+yet checkpointed is scored again into the same file) and rebuilds the
+history from the outputs. A batch that cannot be read, scored or written
+is checkpointed as failed with its error and left out of the history; it
+is retried when its files change.
+
+Latency from file arrival (last mtime of the batch) to the written score
+is recorded as ``discharge_latency_seconds`` and reported with the
+sustained files per second.
+
+Usage:
+    python -m readmission watch drop/ scored/ (--history STORE | --dataset dataset/) [--attach NAME] [--once]
+"""
+
+import argparse
+import copy
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from readmission import metrics, storage
+from readmission.cleaning import clean_admissions, clean_diagnoses, clean_labs, clean_patients, raw_paths
+from readmission.encoding import FeatureEncoder, unknown_flags
+from readmission.features import build_model_df, create_readmission_labels, patient_ages
+from readmission.lab_features import CRITICAL_LABS, KEY_COLUMNS, aggregate_lab_features
+from readmission.schema import parse_dates, read_emr_table
+from readmission.scoring import risk_tier
+
+# File suffix per table of a dropped batch; admissions marks the batch
+BATCH_FILES = {
+    'admissions': '.admissions.tsv',
+    'labs': '.labs.tsv',
+    'diagnoses': '.diagnoses.tsv',
+    'patients': '.patients.tsv',
+}
+SCORES_SUFFIX = '.scores.csv'
+CHECKPOINT_FILE = '_checkpoint.json'
+
+ADMISSION_COLUMNS = ['PatientID', 'AdmissionID', 'AdmissionStartDate', 'AdmissionEndDate']
+PATIENT_COLUMNS = ['PatientID', 'PatientGender', 'PatientDateOfBirth']
+LAB_FEATURE_COLUMNS = ['NumLabs'] + [f'{lab}_avg' for lab in CRITICAL_LABS]
+OUTPUT_COLUMNS = ADMISSION_COLUMNS + ['readmission_probability', 'prediction', 'risk_tier', 'unknown_features',
+                                      'model_version']
+
+DEFAULT_POLL_SECONDS = 0.25
+MAX_BATCH_FILES = 64
+LATENCY_WINDOW = 10_000
+
+
+def _write_atomic(path, write):
+    tmp = f'{path}.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class DischargeHistory:
+    """Earlier admissions and patient demographics, extended as discharges are scored."""
+
+    def __init__(self, admissions, patients, reference_date=None):
+        self.admissions = parse_dates(admissions[ADMISSION_COLUMNS].copy(), 'admissions').reset_index(drop=True)
+        patients = parse_dates(patients[PATIENT_COLUMNS].copy(), 'patients')
+        self.patients = patients.drop_duplicates('PatientID', keep='last').set_index('PatientID')
+        # Missing ages are filled with the median over all patients, as in training
+        self.age_fill = float(patient_ages(patients, reference_date).median())
+        self._positions = self.admissions.groupby('PatientID', sort=False).indices
+        self._recent = []
+
+    @classmethod
+    def from_store(cls, root, reference_date=None):
+        """From cleaned tables in the columnar store (``readmission.storage``)."""
+        admissions = storage.read_table(root, 'admissions', ADMISSION_COLUMNS)
+        patients = storage.read_table(root, 'patients', PATIENT_COLUMNS)
+        return cls(admissions, patients, reference_date)
+
+    @classmethod
+    def from_dataset(cls, dataset_path, reference_date=None):
+        """From the raw admissions and patients tables (labs and diagnoses are not read)."""
+        paths = raw_paths(dataset_path)
+        admissions = clean_admissions(read_emr_table(paths['admissions'], 'admissions', compact=False))
+        patients = clean_patients(read_emr_table(paths['patients'], 'patients', compact=False))
+        return cls(admissions, patients, reference_date)
+
+    def admissions_of(self, patient_ids):
+        """Known admissions of ``patient_ids``."""
+        positions = [self._positions[patient] for patient in patient_ids if patient in self._positions]
+        stored = self.admissions.iloc[np.concatenate(positions)] if positions else self.admissions.iloc[:0]
+        recent = [frame[frame['PatientID'].isin(patient_ids)] for frame in self._recent]
+        return pd.concat([stored, *recent], ignore_index=True)
+
+    def patients_of(self, patient_ids):
+        """Demographics of ``patient_ids``; unknown patients get an all-missing row."""
+        return self.patients.reindex(pd.Index(patient_ids, name='PatientID')).reset_index()
+
+    def add_admissions(self, admissions):
+        self._recent.append(admissions[ADMISSION_COLUMNS])
+        # Fold into the indexed frame once the unindexed part is large enough to slow lookups
+        if sum(len(frame) for frame in self._recent) > max(10_000, len(self.admissions) // 10):
+            self.admissions = pd.concat([self.admissions, *self._recent], ignore_index=True).drop_duplicates(
+                KEY_COLUMNS, keep='last').reset_index(drop=True)
+            self._positions = self.admissions.groupby('PatientID', sort=False).indices
+            self._recent = []
+
+    def add_patients(self, patients):
+        patients = parse_dates(patients[PATIENT_COLUMNS].copy(), 'patients').set_index('PatientID')
+        self.patients = pd.concat([self.patients[~self.patients.index.isin(patients.index)], patients])
+
+    def fork(self):
+        """A copy sharing the stored frames; extending it leaves this history unchanged."""
+        fork = copy.copy(self)
+        fork._recent = list(self._recent)
+        return fork
+
+
+def _empty_diagnoses():
+    return pd.DataFrame({'PatientID': pd.Series(dtype=object), 'AdmissionID': pd.Series(dtype='int64'),
+                         'PrimaryDiagnosisCode': pd.Series(dtype=object),
+                         'PrimaryDiagnosisDescription': pd.Series(dtype=object)})
+
+
+def _empty_lab_features():
+    return pd.DataFrame({'PatientID': pd.Series(dtype=object), 'AdmissionID': pd.Series(dtype='int64'),
+                         **{col: pd.Series(dtype='float64') for col in LAB_FEATURE_COLUMNS}})
+
+
+def discharge_features(admissions, history, labs=None, diagnoses=None, reference_date=None):
+    """The model features of one batch of discharges, one row per admission in file order.
+
+    Returns the cleaned admissions (rows with missing dates dropped) and
+    the feature frame (``PatientID``, ``AdmissionID`` and the model
+    columns in raw form).
+    """
+    admissions = parse_dates(clean_admissions(admissions)[ADMISSION_COLUMNS].copy(), 'admissions')
+    admissions = admissions.drop_duplicates(KEY_COLUMNS, keep='last')
+    patient_ids = admissions['PatientID'].unique()
+
+    # Label over the patients' full known history so PreviousAdmissions counts earlier stays
+    known = pd.concat([history.admissions_of(patient_ids), admissions], ignore_index=True)
+    labelled = create_readmission_labels(known.drop_duplicates(KEY_COLUMNS, keep='last'))
+    labelled = admissions[KEY_COLUMNS].merge(labelled, on=KEY_COLUMNS, how='left')
+
+    diagnoses = clean_diagnoses(diagnoses) if diagnoses is not None else _empty_diagnoses()
+    lab_features = (aggregate_lab_features(clean_labs(labs)) if labs is not None and len(labs)
+                    else _empty_lab_features())
+    features = build_model_df(labelled, history.patients_of(patient_ids), diagnoses, lab_features,
+                              reference_date, history.age_fill)
+    # No lab rows for an admission: no tests were done
+    features['NumLabs'] = features['NumLabs'].fillna(0)
+    return admissions, features
+
+
+def batch_fingerprint(drop_dir, stem):
+    """[[suffix, size, mtime_ns], ...] of the batch's files that exist."""
+    fingerprint = []
+    for suffix in BATCH_FILES.values():
+        try:
+            stat = os.stat(os.path.join(drop_dir, stem + suffix))
+        except FileNotFoundError:
+            continue
+        fingerprint.append([suffix, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+class DischargeWatcher:
+    """Scans a drop directory, scores ready batches and writes them to the output queue."""
+
+    def __init__(self, drop_dir, out_dir, model, history, lab_medians=None, poll_seconds=DEFAULT_POLL_SECONDS,
+                 max_batch_files=MAX_BATCH_FILES, reference_date=None):
+        """``model`` is a ``ModelVersion`` or ``SharedModel``; ``lab_medians`` overrides its recorded medians."""
+        self.drop_dir = str(drop_dir)
+        self.out_dir = str(out_dir)
+        self.model = model
+        self.encoder = (FeatureEncoder(model.feature_names, model.encoder.vocabularies, lab_medians)
+                        if lab_medians else model.encoder)
+        self.history = history
+        self.poll_seconds = poll_seconds
+        self.max_batch_files = max_batch_files
+        self.reference_date = reference_date
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(self.out_dir, CHECKPOINT_FILE)
+        self.checkpoint = self._load_checkpoint()
+
+        self.files = 0
+        self.failed = 0
+        self.rows = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.first_arrival = None
+        self.last_scored = None
+
+        # stem -> fingerprint seen on the previous scan but not yet stable
+        self._pending = {}
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)['batches']
+        # Scored batches are history for the ones still to come
+        for stem, entry in checkpoint.items():
+            if entry['status'] != 'scored':
+                continue
+            patients_path = os.path.join(self.drop_dir, stem + BATCH_FILES['patients'])
+            if os.path.exists(patients_path):
+                self.history.add_patients(clean_patients(read_emr_table(patients_path, 'patients', compact=False)))
+            scored = pd.read_csv(os.path.join(self.out_dir, entry['output']), usecols=ADMISSION_COLUMNS)
+            self.history.add_admissions(parse_dates(scored, 'admissions'))
+        return checkpoint
+
+    def _save_checkpoint(self):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump({'batches': self.checkpoint}, f, indent=1)
+        _write_atomic(self.checkpoint_path, write)
+
+    def scan(self):
+        """Queue the batches whose files were unchanged since the previous scan; returns how many."""
+        stable, unsettled = [], {}
+        suffix = BATCH_FILES['admissions']
+        with os.scandir(self.drop_dir) as entries:
+            stems = sorted(entry.name[:-len(suffix)] for entry in entries if entry.name.endswith(suffix))
+        for stem in stems:
+            fingerprint = batch_fingerprint(self.drop_dir, stem)
+            done = self.checkpoint.get(stem)
+            with self._lock:
+                queued = stem in self._queued
+            if queued or not fingerprint or (done is not None and done['fingerprint'] == fingerprint):
+                continue
+            if self._pending.get(stem) == fingerprint:
+                stable.append((max(mtime for _, _, mtime in fingerprint) / 1e9, stem, fingerprint))
+            else:
+                unsettled[stem] = fingerprint
+        self._pending = unsettled
+        for arrival, stem, fingerprint in sorted(stable):
+            with self._lock:
+                self._queued.add(stem)
+            self._queue.put((stem, fingerprint, arrival))
+        return len(stable)
+
+    def _read(self, stem, table):
+        path = os.path.join(self.drop_dir, stem + BATCH_FILES[table])
+        return read_emr_table(path, table, compact=False) if os.path.exists(path) else None
+
+    def _prepare(self, stem, history):
+        """Features and encoded rows of one batch; extends ``history`` (a fork) with its admissions and patients.
+
+        Returns ``(result, X, admissions, patients)``; the last two are added
+        to the watcher's history once the output is written.
+        """
+        admissions = self._read(stem, 'admissions')
+        patients = self._read(stem, 'patients')
+        if patients is not None:
+            patients = clean_patients(patients)
+            history.add_patients(patients)
+        admissions, features = discharge_features(admissions, history, self._read(stem, 'labs'),
+                                                  self._read(stem, 'diagnoses'), self.reference_date)
+        with metrics.timer('encode_seconds', caller='watch'):
+            X, unknown = self.encoder.transform(features, on_unknown='flag')
+        history.add_admissions(admissions)
+        result = admissions[ADMISSION_COLUMNS].reset_index(drop=True)
+        result['unknown_features'] = unknown_flags(features, unknown).to_numpy()
+        return result, X, admissions, patients
+
+    def process(self, batches):
+        """Score ``[(stem, fingerprint, arrival), ...]`` with one ``predict_proba`` call and write the outputs.
+
+        Returns (files scored, files failed). The batches are released for
+        rescanning whatever happens.
+        """
+        try:
+            with metrics.timer('discharge_batch_seconds'):
+                scored, failures = self._score_batches(batches)
+        finally:
+            with self._lock:
+                self._queued.difference_update(stem for stem, *_ in batches)
+
+        done = time.time()
+        for stem, _, arrival, result in scored:
+            self.latencies.append(done - arrival)
+            metrics.observe('discharge_latency_seconds', done - arrival)
+            self.rows += len(result)
+        metrics.increment('discharge_files_total', len(scored), status='scored')
+        metrics.increment('discharge_files_total', len(failures), status='failed')
+        first_arrival = min(arrival for _, _, arrival in batches)
+        if self.first_arrival is None or first_arrival < self.first_arrival:
+            self.first_arrival = first_arrival
+        self.last_scored = done
+        self.files += len(scored)
+        self.failed += len(failures)
+        return len(scored), len(failures)
+
+    def _score_batches(self, batches):
+        prepared, failures = [], []
+        history = self.history.fork()
+        for stem, fingerprint, arrival in batches:
+            try:
+                prepared.append((stem, fingerprint, arrival, *self._prepare(stem, history)))
+            except Exception as exc:
+                failures.append((stem, fingerprint, arrival, exc))
+
+        if prepared:
+            X = pd.concat([X for _, _, _, _, X, _, _ in prepared], ignore_index=True)
+            try:
+                with metrics.timer('predict_seconds', caller='watch'):
+                    proba = self.model.model.predict_proba(X)[:, 1] if len(X) else np.empty(0)
+            except Exception as exc:
+                failures.extend((stem, fingerprint, arrival, exc) for stem, fingerprint, arrival, *_ in prepared)
+                prepared = []
+            else:
+                metrics.increment('rows_scored_total', len(X), caller='watch')
+
+        scored, offset = [], 0
+        for stem, fingerprint, arrival, result, X, admissions, patients in prepared:
+            result['readmission_probability'] = proba[offset:offset + len(X)]
+            offset += len(X)
+            result['prediction'] = (result['readmission_probability'] > 0.5).astype(int)
+            result['risk_tier'] = risk_tier(result['readmission_probability'])
+            result['model_version'] = self.model.version
+            output = stem + SCORES_SUFFIX
+            try:
+                _write_atomic(os.path.join(self.out_dir, output),
+                              lambda path: result[OUTPUT_COLUMNS].to_csv(path, index=False))
+            except Exception as exc:
+                failures.append((stem, fingerprint, arrival, exc))
+                continue
+            # Only a written batch becomes history, so a re-dropped failed one is not counted twice
+            if patients is not None:
+                self.history.add_patients(patients)
+            self.history.add_admissions(admissions)
+            self.checkpoint[stem] = {'fingerprint': fingerprint, 'status': 'scored', 'rows': len(result),
+                                     'output': output}
+            scored.append((stem, fingerprint, arrival, result))
+        for stem, fingerprint, arrival, exc in failures:
+            self.checkpoint[stem] = {'fingerprint': fingerprint, 'status': 'failed', 'error': str(exc)}
+            print(f"✗ {stem}: {exc}", flush=True)
+        self._save_checkpoint()
+        return scored, failures
+
+    def _drain(self, block=True):
+        batches = []
+        try:
+            batches.append(self._queue.get(timeout=self.poll_seconds) if block else self._queue.get_nowait())
+            while len(batches) < self.max_batch_files:
+                batches.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batches
+
+    def run_once(self):
+        """Score what is in the drop directory now (two scans, one poll apart) and return."""
+        self.scan()
+        time.sleep(self.poll_seconds)
+        self.scan()
+        while batches := self._drain(block=False):
+            self.process(batches)
+        return self
+
+    def start(self):
+        """Start the scanner and scoring threads; returns ``self``."""
+        self._threads = [threading.Thread(target=self._watch, name='discharge-watch-scan', daemon=True),
+                         threading.Thread(target=self._score, name='discharge-watch-score', daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _watch(self):
+        while not self._stop.is_set():
+            self.scan()
+            self._stop.wait(self.poll_seconds)
+
+    def _score(self):
+        while not self._stop.is_set():
+            batches = self._drain()
+            if not batches:
+                continue
+            try:
+                self.process(batches)
+            except Exception as exc:
+                # Only the checkpoint save can fail here; it is retried with the next files
+                print(f"✗ {', '.join(stem for stem, *_ in batches)}: {exc}", flush=True)
+
+    def report(self):
+        """Files and rows scored, arrival-to-score latency percentiles and sustained files per second."""
+        latencies = np.array(self.latencies)
+        elapsed = (self.last_scored - self.first_arrival) if self.files else None
+        return {
+            'files': self.files,
+            'failed': self.failed,
+            'rows': self.rows,
+            'latency_p50_seconds': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p95_seconds': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'latency_max_seconds': float(latencies.max()) if len(latencies) else None,
+            'files_per_second': self.files / elapsed if elapsed else None,
+        }
+
+
+def load_model(models_path=None, attach=None):
+    """A ``SharedModel`` attached to segment ``attach``, else a ``ModelVersion`` of ``models_path``."""
+    if attach:
+        from readmission.shared_model import SharedModel
+        return SharedModel.attach(attach)
+    from readmission.registry import ModelVersion
+    return ModelVersion(models_path)
+
+
+def _print_report(report):
+    print(f"✓ Scored {report['files']:,} files ({report['rows']:,} discharges), {report['failed']} failed")
+    if report['files']:
+        print(f"  latency from arrival: p50 {report['latency_p50_seconds']:.2f}s  "
+              f"p95 {report['latency_p95_seconds']:.2f}s  max {report['latency_max_seconds']:.2f}s")
+        if report['files_per_second']:
+            print(f"  sustained: {report['files_per_second']:,.1f} files/s")
+
+
+def main(argv=None):
+    from readmission.artifacts import DEFAULT_MODELS
+
+    parser = argparse.ArgumentParser(prog='python -m readmission watch',
+                                     description='Score discharge files dropped into a directory')
+    parser.add_argument('drop_dir', help='directory the EHR export writes <stem>.admissions.tsv batches to')
+    parser.add_argument('out_dir', help='output queue: <stem>.scores.csv files and the checkpoint')
+    history = parser.add_mutually_exclusive_group(required=True)
+    history.add_argument('--history', help='cleaned-table store (readmission.storage) with earlier admissions')
+    history.add_argument('--dataset', help='raw dataset directory with earlier admissions and patients')
+    parser.add_argument('--models-dir', default=str(DEFAULT_MODELS))
+    parser.add_argument('--attach', metavar='NAME', default=None,
+                        help='score with a model hosted by `python -m readmission share --name NAME`')
+    parser.add_argument('--lab-medians', help='JSON of training lab medians, if the model did not record them')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS, help='scan interval in seconds')
+    parser.add_argument('--max-batch-files', type=int, default=MAX_BATCH_FILES,
+                        help='files scored together in one predict_proba call')
+    parser.add_argument('--reference-date', default=None, help='date ages are computed at (default: today)')
+    parser.add_argument('--once', action='store_true', help='score the files already dropped and exit')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    history = (DischargeHistory.from_store(args.history, args.reference_date) if args.history
+               else DischargeHistory.from_dataset(args.dataset, args.reference_date))
+    model = load_model(args.models_dir, args.attach)
+    lab_medians = None
+    if args.lab_medians:
+        with open(args.lab_medians) as f:
+            lab_medians = json.load(f)
+    watcher = DischargeWatcher(args.drop_dir, args.out_dir, model, history, lab_medians, args.poll,
+                               args.max_batch_files, args.reference_date)
+    print(f"✓ Model {model.version}, {len(history.admissions):,} earlier admissions, "
+          f"{len(watcher.checkpoint):,} batches already checkpointed ({time.perf_counter() - start:.2f}s)")
+    if watcher.encoder.lab_medians is None:
+        print("  No training lab medians recorded: files with a missing lab value will fail (see --lab-medians)")
+
+    if args.once:
+        _print_report(watcher.run_once().report())
+        return 0
+    print(f"  Watching {args.drop_dir} every {args.poll:g}s; Ctrl-C to stop", flush=True)
+    watcher.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        _print_report(watcher.report())
+    return 0
@@ -0,0 +1,92 @@
+"""FlatForest gives exactly sklearn's predict_proba, and its contributions add up to it."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from readmission.forest import CONTRIBUTION_BLOCK_ROWS, FlatForest
+
+FEATURES = ['LengthOfStay', 'PreviousAdmissions', 'PatientAge', 'PatientGender', 'DiagnosisChapter', 'NumLabs',
+            'hemoglobin_avg', 'glucose_avg', 'creatinine_avg', 'wbc_avg']
+
+
+def synthetic(n_rows, seed=0):
+    """Rows shaped like the encoded model features, with a readmission label."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'LengthOfStay': rng.integers(1, 30, n_rows),
+        'PreviousAdmissions': rng.integers(0, 8, n_rows),
+        'PatientAge': rng.uniform(18, 95, n_rows).round(1),
+        'PatientGender': rng.integers(0, 2, n_rows),
+        'DiagnosisChapter': rng.integers(0, 20, n_rows),
+        'NumLabs': rng.integers(0, 400, n_rows),
+        'hemoglobin_avg': rng.normal(13, 2, n_rows),
+        'glucose_avg': rng.normal(120, 30, n_rows),
+        'creatinine_avg': rng.gamma(2, 0.6, n_rows),
+        'wbc_avg': rng.normal(8, 2.5, n_rows),
+    }, columns=FEATURES)
+    logit = 0.3 * X['PreviousAdmissions'] + 0.05 * X['LengthOfStay'] - 2 + rng.normal(0, 1, n_rows)
+    return X, (logit > 0).astype(int)
+
+
+@pytest.fixture(scope='module')
+def forest():
+    X, y = synthetic(3000)
+    model = RandomForestClassifier(n_estimators=40, max_depth=10, random_state=0, n_jobs=1).fit(X, y)
+    return model, FlatForest.from_sklearn(model), synthetic(1000, seed=1)[0]
+
+
+def assert_identical(model, flat, X):
+    np.testing.assert_array_equal(flat.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+
+def test_single_row(forest):
+    model, flat, X = forest
+    assert_identical(model, flat, X.iloc[[0]])
+
+
+def test_batch(forest):
+    model, flat, X = forest
+    assert_identical(model, flat, X)
+    # Columns are taken by name
+    np.testing.assert_array_equal(flat.predict_proba(X[FEATURES[::-1]]), model.predict_proba(X))
+
+
+def test_values_on_split_thresholds(forest):
+    model, flat, X = forest
+    rng = np.random.default_rng(2)
+    on_threshold = X.iloc[:500].astype(float)
+    internal = np.flatnonzero(flat.left != np.arange(flat.n_nodes))
+    for i in range(len(on_threshold)):
+        node = rng.choice(internal)
+        on_threshold.iloc[i, flat.feature[node]] = np.float32(flat.threshold[node])
+    assert not on_threshold.isna().any().any()
+    assert_identical(model, flat, on_threshold)
+
+
+def test_extreme_values(forest):
+    model, flat, X = forest
+    extreme = X.iloc[:100].astype(float)
+    extreme.iloc[::2] = 1e9
+    extreme.iloc[1::2] = -1e9
+    assert_identical(model, flat, extreme)
+
+
+def test_multiclass_forest_with_missing_values():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(2000, 6))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    y = rng.integers(0, 3, 2000)
+    model = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0, n_jobs=1).fit(X, y)
+    assert_identical(model, FlatForest.from_sklearn(model), X)
+
+
+@pytest.mark.parametrize('rows', [1, CONTRIBUTION_BLOCK_ROWS + 7])
+def test_contributions_sum_to_probability(forest, rows):
+    model, flat, X = forest
+    X = pd.concat([X] * (rows // len(X) + 1), ignore_index=True).iloc[:rows]
+    bias, contributions = flat.contributions(X)
+    assert contributions.shape == (rows, len(FEATURES), 2)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X), atol=1e-12)
@@ -0,0 +1,103 @@
+"""Incremental updates of the patient-history store match a full build of the same tables."""
+
+import pandas as pd
+import pytest
+
+from readmission import history_store
+from readmission.cleaning import clean_labs, clean_patients
+from readmission.history_store import PatientHistoryStore
+from readmission.lab_features import aggregate_lab_sums
+
+REFERENCE_DATE = '2025-01-01'
+
+PATIENTS = pd.DataFrame({
+    'PatientID': ['A', 'B', 'C'],
+    'PatientGender': ['Male', 'Female', 'Male'],
+    'PatientDateOfBirth': ['1950-01-01 00:00:00.000', '1990-06-01 00:00:00.000', '1975-03-15 00:00:00.000'],
+    'PatientRace': ['White', 'Asian', 'African American'],
+    'PatientMaritalStatus': ['Married', 'Single', 'Divorced'],
+    'PatientLanguage': ['English', 'English', 'Spanish'],
+    'PatientPopulationPercentageBelowPoverty': [10.5, 12.0, 18.3],
+})
+ADMISSIONS = pd.DataFrame({
+    'PatientID': ['A', 'A', 'B', 'C'],
+    'AdmissionID': [1, 2, 1, 1],
+    'AdmissionStartDate': ['2010-01-01 08:00:00.000', '2010-01-20 09:00:00.000', '2015-05-01 10:00:00.000',
+                           '2016-07-04 11:00:00.000'],
+    'AdmissionEndDate': ['2010-01-05 08:00:00.000', '2010-01-23 09:00:00.000', '2015-05-08 10:00:00.000',
+                         '2016-07-06 11:00:00.000'],
+})
+DIAGNOSES = pd.DataFrame({
+    'PatientID': ['A', 'A', 'B', 'C'],
+    'AdmissionID': [1, 2, 1, 1],
+    'PrimaryDiagnosisCode': ['E11.9', 'I10', 'J45.909', 'M54.5'],
+    'PrimaryDiagnosisDescription': ['Type 2 diabetes', 'Hypertension', 'Asthma', 'Low back pain'],
+})
+LABS = pd.DataFrame({
+    'PatientID': ['A', 'A', 'A', 'B', 'C'],
+    'AdmissionID': [1, 2, 2, 1, 1],
+    'LabName': ['CBC: HEMOGLOBIN', 'METABOLIC: GLUCOSE', 'CBC: WHITE BLOOD CELL COUNT', 'CBC: HEMOGLOBIN',
+                'URINALYSIS: PH'],
+    'LabValue': [13.1, 142.0, 9.5, 11.4, 6.0],
+    'LabUnits': ['gm/dl', 'mg/dl', 'k/cumm', 'gm/dl', 'no unit'],
+    'LabDateTime': ['2010-01-02 08:00:00.000', '2010-01-21 09:00:00.000', '2010-01-21 09:00:00.000',
+                    '2015-05-02 10:00:00.000', '2016-07-05 11:00:00.000'],
+})
+
+
+def _rows(table, keys):
+    return table[pd.MultiIndex.from_frame(table[['PatientID', 'AdmissionID']]).isin(keys)]
+
+
+def _build(root, held_out=(), patients=PATIENTS):
+    """A store of all tables except the admissions in ``held_out`` (and their labs and diagnoses)."""
+    tables = {name: table.drop(_rows(table, held_out).index)
+              for name, table in (('admissions', ADMISSIONS), ('diagnoses', DIAGNOSES), ('labs', LABS))}
+    return PatientHistoryStore.build(root, tables['admissions'], clean_patients(patients), tables['diagnoses'],
+                                     aggregate_lab_sums(clean_labs(tables['labs'])))
+
+
+def _update(store, held_out, patients=None):
+    return store.update(_rows(ADMISSIONS, held_out), _rows(LABS, held_out), _rows(DIAGNOSES, held_out), patients)
+
+
+def assert_same_as_full_build(root, tmp_path):
+    updated = PatientHistoryStore(root)
+    full = _build(tmp_path / 'full')
+    for patient_id, admission_id in ADMISSIONS[['PatientID', 'AdmissionID']].itertuples(index=False):
+        assert updated.admissions_of(patient_id) == full.admissions_of(patient_id)
+        pd.testing.assert_series_equal(pd.Series(updated.lookup(patient_id, admission_id, REFERENCE_DATE)),
+                                       pd.Series(full.lookup(patient_id, admission_id, REFERENCE_DATE)))
+
+
+def test_update_new_patient(tmp_path):
+    # B is known only from the patients table when the store is built
+    store = _build(tmp_path / 'store', held_out=[('B', 1)])
+    assert store.lookup('B') is None
+    assert _update(store, [('B', 1)]) == 1
+    record = PatientHistoryStore(tmp_path / 'store').lookup('B', reference_date=REFERENCE_DATE)
+    assert record['PatientGender'] == 'Female'
+    assert record['PatientAge'] == pytest.approx(34.59, abs=0.01)
+    assert record['hemoglobin_avg'] == pytest.approx(11.4)
+    assert_same_as_full_build(tmp_path / 'store', tmp_path)
+
+
+def test_update_returning_patient(tmp_path):
+    store = _build(tmp_path / 'store', held_out=[('A', 2)])
+    assert _update(store, [('A', 2)]) == 2
+    record = PatientHistoryStore(tmp_path / 'store').lookup('A', reference_date=REFERENCE_DATE)
+    assert (record['AdmissionID'], record['PreviousAdmissions']) == (2, 1)
+    assert record['NumLabs'] == 2
+    assert_same_as_full_build(tmp_path / 'store', tmp_path)
+
+
+def test_update_only_new_patients(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, 'MAX_SEGMENTS', 2)
+    # C is not in the store at all: the patient row comes first, the admission in a later update
+    store = _build(tmp_path / 'store', held_out=[('B', 1), ('C', 1)], patients=PATIENTS[PATIENTS['PatientID'] != 'C'])
+    assert _update(store, [], PATIENTS[PATIENTS['PatientID'] == 'C']) == 0
+    assert _update(store, [('C', 1)]) == 1
+    assert _update(store, [('B', 1)]) == 1
+    # Three updates with MAX_SEGMENTS 2: the admission segments were compacted
+    assert len(store.segments) == 1
+    assert_same_as_full_build(tmp_path / 'store', tmp_path)
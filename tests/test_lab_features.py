@@ -0,0 +1,65 @@
+"""Vectorized lab aggregation matches the per-admission loop of model-training.ipynb."""
+
+import numpy as np
+import pandas as pd
+
+from readmission.lab_features import CRITICAL_LABS, KEY_COLUMNS, aggregate_lab_sums, finalize_lab_features
+
+LABS = pd.DataFrame({
+    'PatientID': ['P1', 'P1', 'P1', 'P1', 'P1', 'P2', 'P2', 'P2', 'P3', 'P3'],
+    'AdmissionID': [1, 1, 1, 1, 2, 1, 1, 1, 1, 1],
+    'LabName': ['CBC: HEMOGLOBIN', 'CBC: MEAN CORPUSCULAR HEMOGLOBIN', 'METABOLIC: GLUCOSE', 'METABOLIC: GLUCOSE',
+                'CBC: WHITE BLOOD CELL COUNT', 'METABOLIC: CREATININE', 'METABOLIC: SODIUM', 'METABOLIC: POTASSIUM',
+                # Only names no critical lab matches
+                'URINALYSIS: PH', 'URINALYSIS: SPECIFIC GRAVITY'],
+    'LabValue': [13.2, 29.1, 101.0, 143.5, 8.7, 1.1, 139.0, 4.2, 6.5, 1.02],
+})
+# P2 admission 2 and P4 admission 1 have no lab rows
+ADMISSIONS = pd.DataFrame({'PatientID': ['P1', 'P1', 'P2', 'P2', 'P3', 'P4'], 'AdmissionID': [1, 2, 1, 2, 1, 1]})
+
+
+def notebook_lab_features(labs_df):
+    """The per-admission loop from model-training.ipynb."""
+    def extract_lab_value(group, lab_keywords):
+        mask = group['LabName'].str.upper().str.contains('|'.join(lab_keywords), na=False)
+        if mask.any():
+            return group[mask]['LabValue'].mean()
+        return np.nan
+
+    lab_features_list = []
+    for (patient_id, admission_id), group in labs_df.groupby(['PatientID', 'AdmissionID']):
+        features = {
+            'PatientID': patient_id,
+            'AdmissionID': admission_id,
+            'NumLabs': len(group),
+        }
+        for lab_name, keywords in CRITICAL_LABS.items():
+            features[f'{lab_name}_avg'] = extract_lab_value(group, keywords)
+        lab_features_list.append(features)
+    return pd.DataFrame(lab_features_list)
+
+
+def test_matches_notebook_loop():
+    pd.testing.assert_frame_equal(finalize_lab_features(aggregate_lab_sums(LABS)), notebook_lab_features(LABS))
+
+
+def test_unmatched_lab_names_count_but_average_nothing():
+    features = finalize_lab_features(aggregate_lab_sums(LABS)).set_index(KEY_COLUMNS)
+    assert features.loc[('P3', 1), 'NumLabs'] == 2
+    assert features.loc[('P3', 1), [f'{lab}_avg' for lab in CRITICAL_LABS]].isna().all()
+    # "MEAN CORPUSCULAR HEMOGLOBIN" counts as hemoglobin, as the regex match did
+    assert features.loc[('P1', 1), 'hemoglobin_avg'] == (13.2 + 29.1) / 2
+
+
+def test_admissions_without_labs():
+    expected = ADMISSIONS.merge(notebook_lab_features(LABS), on=KEY_COLUMNS, how='left')
+    actual = ADMISSIONS.merge(finalize_lab_features(aggregate_lab_sums(LABS)), on=KEY_COLUMNS, how='left')
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual.set_index(KEY_COLUMNS).loc[[('P2', 2), ('P4', 1)]].isna().all().all()
+
+
+def test_chunked_sums_fold_to_the_same_features():
+    # The first admission is split across the chunks
+    chunks = [aggregate_lab_sums(LABS.iloc[:3]), aggregate_lab_sums(LABS.iloc[3:])]
+    sums = pd.concat(chunks, ignore_index=True).groupby(KEY_COLUMNS, as_index=False).sum()
+    pd.testing.assert_frame_equal(finalize_lab_features(sums), notebook_lab_features(LABS))
@@ -0,0 +1,68 @@
+"""PatientID-sharded feature engineering gives the serial model_df, with or without a process pool."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from readmission import sharding
+from readmission.cleaning import clean_tables, load_raw_tables
+from readmission.features import build_model_df, create_readmission_labels
+from readmission.lab_features import aggregate_lab_features
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'benchmarks'))
+from synthetic_emr import generate_emr  # noqa: E402
+
+REFERENCE_DATE = '2024-01-01'
+
+
+@pytest.fixture(scope='module')
+def tables(tmp_path_factory):
+    dataset = tmp_path_factory.mktemp('emr')
+    generate_emr(dataset, 300, labs_per_admission=5)
+    return clean_tables(load_raw_tables(dataset))
+
+
+@pytest.fixture(scope='module')
+def serial(tables):
+    lab_features = aggregate_lab_features(tables['labs'])
+    labelled = create_readmission_labels(tables['admissions'])
+    return build_model_df(labelled, tables['patients'], tables['diagnoses'], lab_features, REFERENCE_DATE)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_build_model_df_parallel_matches_serial(tables, serial, workers):
+    actual = sharding.build_model_df_parallel(tables, reference_date=REFERENCE_DATE, workers=workers)
+    pd.testing.assert_frame_equal(actual, serial)
+
+
+def test_one_worker_runs_in_process(tables, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started for one worker")
+
+    monkeypatch.setattr(sharding, 'ProcessPoolExecutor', no_pool)
+    expected = create_readmission_labels(tables['admissions'])
+    pd.testing.assert_frame_equal(sharding.create_readmission_labels_parallel(tables['admissions'], workers=1),
+                                  expected)
+
+
+def test_shards_keep_own_ids_across_category_orders():
+    ids = ['P3', 'P1', None, 'P2', 'P1', 'P4', 'P5', 'P3']
+    first = pd.DataFrame({'PatientID': pd.Categorical(ids, categories=['P1', 'P2', 'P3', 'P4', 'P5']),
+                          'row': range(8)}, index=list('abcdefgh'))
+    # The same IDs listed in another order, as a table read in chunks has them
+    second = first.assign(PatientID=first['PatientID'].cat.reorder_categories(['P5', 'P3', 'P1', 'P4', 'P2']))
+    partition = sharding.id_partition(first['PatientID'].dtype, 3)
+    shard_categories = []
+    for pruned_first, pruned_second, plain in zip(sharding.shard_frame(first, 3, partition),
+                                                  sharding.shard_frame(second, 3, partition),
+                                                  sharding.shard_frame(first, 3)):
+        for pruned in (pruned_first, pruned_second):
+            pd.testing.assert_index_equal(pruned.index, plain.index)
+            assert pruned['PatientID'].dtype == pruned_first['PatientID'].dtype
+            assert list(pruned['PatientID'].astype(object)) == list(plain['PatientID'].astype(object))
+        assert set(plain['PatientID'].dropna()) <= set(pruned_first['PatientID'].cat.categories)
+        shard_categories += list(pruned_first['PatientID'].cat.categories)
+    # Every ID is a category of exactly one shard
+    assert sorted(shard_categories) == ['P1', 'P2', 'P3', 'P4', 'P5']
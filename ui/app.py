@@ -1,12 +1,17 @@
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
 import os
+import sys
+import json
+import time
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.express as px
+
+# Make the shared `readmission` package (repo root) importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from readmission import metrics
+
+# Whole-script timing of this rerun, recorded at the end of the script
+rerun_start = time.perf_counter_ns()
 
 # Page configuration
 st.set_page_config(
@@ -106,29 +111,216 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Load model artifacts
+# Header: on screen before pandas, sklearn and the model are loaded
+st.markdown('<div class="main-header">🏥 Clinical Readmission Risk Assessment</div>', unsafe_allow_html=True)
+st.markdown('<div class="sub-header">AI-Powered Clinical Decision Support for 30-Day Readmission Prediction</div>', unsafe_allow_html=True)
+metrics.REGISTRY.record('ui_first_paint_seconds', rerun_start, time.perf_counter_ns())
+
+# Heavy imports come after the first paint (Python caches them, so reruns don't pay again);
+# plotly and the sensitivity code load when the first analysis is drawn
+import numpy as np
+import pandas as pd
+from readmission.encoding import CHAPTER_LABELS, chapter_aliases
+from readmission.features import LAB_COLUMNS
+
+# Model registry: watches models/ and swaps in retrained models without a restart
 @st.cache_resource
-def load_model_artifacts():
-    """Load trained model, encoders, and feature names"""
+def get_model_registry():
+    """Active model (hot-reloaded), plus a shadow candidate when READMISSION_SHADOW_MODELS is set"""
+    # Imports sklearn (through the pickles); shared-memory models need only NumPy
+    from readmission.registry import ModelRegistry
+    from readmission.shared_model import SharedModel
     try:
+        shadow_path = os.environ.get('READMISSION_SHADOW_MODELS')
+        shared_name = os.environ.get('READMISSION_SHARED_MODEL')
+        if shared_name:
+            # Attach to the model hosted by `python -m readmission share` (no unpickling, shared pages)
+            return ModelRegistry(None, shadow_path, poll_seconds=None, initial=SharedModel.attach(shared_name)).start()
         models_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
-        
-        with open(os.path.join(models_path, 'random_forest_readmission_model.pkl'), 'rb') as f:
-            model = pickle.load(f)
-        
-        with open(os.path.join(models_path, 'label_encoders.pkl'), 'rb') as f:
-            encoders = pickle.load(f)
-        
-        with open(os.path.join(models_path, 'feature_names.pkl'), 'rb') as f:
-            feature_names = pickle.load(f)
-        
-        return model, encoders, feature_names
+        return ModelRegistry(models_path, shadow_path=shadow_path).start()
     except Exception as e:
         st.error(f"❌ Error loading model: {str(e)}")
-        return None, None, None
+        return None
+
+@st.cache_resource
+def get_prediction_cache():
+    """Prediction cache shared across sessions and reruns (keyed on the model version)"""
+    from readmission.cache import PredictionCache
+    return PredictionCache()
+
+@st.cache_resource
+def load_explainer(_model, version):
+    """Flattened copy of the forest for per-patient attributions (None for other engines)"""
+    from readmission.forest import FlatForest
+    if isinstance(_model, FlatForest):
+        return _model
+    if not hasattr(_model, 'estimators_'):
+        return None
+    return FlatForest.from_sklearn(_model)
+
+@st.cache_resource
+def get_history_store():
+    """Patient-history store for form pre-fill (READMISSION_HISTORY_STORE), or None when not configured"""
+    store_path = os.environ.get('READMISSION_HISTORY_STORE')
+    if not store_path:
+        return None
+    from readmission.history_store import PatientHistoryStore
+    try:
+        return PatientHistoryStore(store_path)
+    except Exception as e:
+        st.warning(f"⚠️ Patient history store unavailable: {str(e)}")
+        return None
 
-# Initialize
-model, encoders, feature_names = load_model_artifacts()
+def prefill_form(store, encoder):
+    """Fill the assessment form from the stored admission (runs before the widgets are redrawn)"""
+    patient_id = st.session_state['prefill_patient_id'].strip()
+    admission_id = st.session_state['prefill_admission_id'].strip()
+    if not patient_id:
+        st.session_state['prefill_message'] = ('warning', "Enter a PatientID.")
+        return
+    store.refresh()
+    with metrics.timer('history_lookup_seconds', caller='ui'):
+        record = store.lookup(patient_id, int(admission_id) if admission_id.isdigit() else None)
+    if record is None:
+        st.session_state['prefill_message'] = ('warning', f"No stored admission for patient {patient_id}"
+                                               + (f", admission {admission_id}" if admission_id else "") + ".")
+        return
+    
+    state = st.session_state
+    state['form_admission_date'] = record['AdmissionStartDate'].date()
+    state['form_discharge_date'] = record['AdmissionEndDate'].date()
+    state['form_previous_admissions'] = min(record['PreviousAdmissions'], 50)
+    state['form_num_labs'] = min(int(record['NumLabs']), 500)
+    if not np.isnan(record['PatientAge']):
+        state['form_patient_age'] = min(max(int(record['PatientAge']), 0), 120)
+    notes = []
+    if record['PatientGender'] in ('Male', 'Female'):
+        state['form_patient_gender'] = record['PatientGender']
+    else:
+        notes.append(f"gender '{record['PatientGender']}' left as entered")
+    # The stored chapter is an ICD-10 letter: show the chapter label the model reads as that letter,
+    # or the bare letter when no label does
+    labels = {letter: label for label, letter in chapter_aliases(encoder.vocabularies['DiagnosisChapter']).items()}
+    state['form_diagnosis_chapter'] = labels.get(record['DiagnosisChapter'], record['DiagnosisChapter'])
+    lab_limits = {'hemoglobin_avg': 25.0, 'glucose_avg': 600.0, 'creatinine_avg': 20.0, 'wbc_avg': 100.0}
+    for col in LAB_COLUMNS:
+        value = record[col]
+        if np.isnan(value):
+            # Not measured: the model would use the training median
+            if encoder.lab_medians is None:
+                notes.append(f"{col} not measured")
+                continue
+            value = encoder.lab_medians[col]
+            notes.append(f"{col} not measured (training median)")
+        state[f'form_{col}'] = min(max(float(value), 0.0), lab_limits[col])
+    state.pop('analysis_inputs', None)
+    state['prefill_message'] = ('success', f"Pre-filled admission {record['AdmissionID']} of patient {patient_id}"
+                                + (f" — {'; '.join(notes)}" if notes else ""))
+
+# Initialize: this rerun uses one model version throughout, even if a new one is swapped in meanwhile
+with st.spinner("Loading model..."):
+    registry = get_model_registry()
+active_model = registry.current() if registry is not None else None
+model, encoders, feature_names, model_version_id = (
+    (active_model.model, active_model.encoders, active_model.feature_names, active_model.version)
+    if active_model is not None else (None, None, None, None)
+)
+prediction_cache = get_prediction_cache()
+history_store = get_history_store()
+
+# Evaluation recorded with the model at export (bootstrap CIs on the test set, k-fold CV)
+model_metrics = getattr(active_model, 'metrics', None) if active_model is not None else None
+evaluation = (model_metrics or {}).get('evaluation')
+METRIC_LABELS = {'accuracy': "Accuracy", 'precision': "Precision", 'recall': "Recall", 'f1': "F1-Score",
+                 'roc_auc': "ROC-AUC"}
+
+def format_metric(name, value):
+    return f"{value:.2f}" if name == 'roc_auc' else f"{value * 100:.0f}%"
+
+# Static tables are built once per model version, not on every rerun
+@st.cache_data
+def performance_table(version, _evaluation):
+    """System Info performance table of one model version"""
+    interval_column = f"{_evaluation['confidence']:.0%} CI"
+    cv_column = f"{_evaluation['cv']['folds']}-fold CV"
+    return pd.DataFrame([
+        {
+            'Metric': label,
+            'Test': format_metric(name, _evaluation['test'][name]['value']),
+            interval_column: f"{format_metric(name, _evaluation['test'][name]['low'])}–"
+                             f"{format_metric(name, _evaluation['test'][name]['high'])}",
+            cv_column: f"{format_metric(name, _evaluation['cv']['mean'][name])} "
+                       f"± {format_metric(name, _evaluation['cv']['std'][name])}"
+        }
+        for name, label in METRIC_LABELS.items()
+    ])
+
+ENGINE_LABELS = {'random_forest': "Random Forest Classifier", 'hist_gb': "Histogram Gradient Boosting Classifier"}
+ESTIMATOR_ENGINES = {'FlatForest': 'random_forest', 'RandomForestClassifier': 'random_forest',
+                     'HistGradientBoostingClassifier': 'hist_gb'}
+PARAM_LABELS = {'max_depth': "Max Depth", 'learning_rate': "Learning Rate", 'max_leaf_nodes': "Max Leaf Nodes",
+                'min_samples_leaf': "Min Samples per Leaf", 'class_weight': "Class Weight",
+                'random_state': "Random State"}
+
+@st.cache_data
+def architecture_text(version, _model, _recorded):
+    """System Info model description of one model version, from the estimator and what export recorded"""
+    engine = _recorded.get('engine') or ESTIMATOR_ENGINES.get(type(_model).__name__)
+    lines = [f"**Algorithm:** {ENGINE_LABELS.get(engine, type(_model).__name__)}", "", "**Configuration:**"]
+    # A bundle's FlatForest counts its trees; a pickled forest has its estimators
+    n_trees = getattr(_model, 'n_trees', None) or len(getattr(_model, 'estimators_', []))
+    if n_trees:
+        lines.append(f"- Estimators: {n_trees} trees")
+    if getattr(_model, 'n_iter_', None):
+        lines.append(f"- Boosting Iterations: {_model.n_iter_}")
+    params = _recorded.get('params') or (_model.get_params() if hasattr(_model, 'get_params') else {})
+    if 'max_depth' not in params and getattr(_model, 'max_depth', None):
+        params = {**params, 'max_depth': _model.max_depth}
+    lines += [f"- {label}: {str(params[key]).title()}" for key, label in PARAM_LABELS.items()
+              if params.get(key) is not None]
+    rows = _recorded.get('rows')
+    lines += ["", "**Training Data:**"]
+    if rows:
+        total = rows['train'] + rows['test']
+        lines += [f"- Admissions: {total:,}", f"- Train Split: {rows['train'] / total:.0%}",
+                  f"- Test Split: {rows['test'] / total:.0%}"]
+    else:
+        lines.append("- Not recorded with this model version")
+    return "\n".join(lines)
+
+@st.cache_data
+def feature_table():
+    """System Info clinical features table"""
+    return pd.DataFrame({
+        'Feature': [
+            'Length of Stay',
+            'Previous Admissions',
+            'Patient Age',
+            'Gender',
+            'Diagnosis Chapter',
+            'Lab Test Count',
+            'Hemoglobin',
+            'Glucose',
+            'Creatinine',
+            'WBC Count'
+        ],
+        'Type': [
+            'Numeric', 'Numeric', 'Numeric', 'Categorical', 'Categorical',
+            'Numeric', 'Numeric', 'Numeric', 'Numeric', 'Numeric'
+        ],
+        'Clinical Relevance': [
+            'Severity indicator',
+            'Chronic condition marker',
+            'Age-related risk',
+            'Gender-specific conditions',
+            'Disease category risk',
+            'Monitoring intensity',
+            'Anemia detection',
+            'Diabetes control',
+            'Kidney function',
+            'Infection/immune status'
+        ]
+    })
 
 # Sidebar
 with st.sidebar:
@@ -136,13 +328,54 @@ with st.sidebar:
     st.markdown("---")
     
     with st.expander("📊 Model Performance", expanded=True):
+        col1, col2 = st.columns(2)
+        if evaluation:
+            test_metrics = evaluation['test']
+            for column, names in ((col1, ['accuracy', 'roc_auc']), (col2, ['precision', 'recall'])):
+                with column:
+                    for name in names:
+                        interval = test_metrics[name]
+                        st.metric(METRIC_LABELS[name], format_metric(name, interval['value']),
+                                  help=f"{evaluation['confidence']:.0%} CI {format_metric(name, interval['low'])}"
+                                       f"–{format_metric(name, interval['high'])}")
+            st.caption(f"{evaluation['test_rows']:,} test rows · {evaluation['confidence']:.0%} CI "
+                       f"ROC-AUC {test_metrics['roc_auc']['low']:.2f}–{test_metrics['roc_auc']['high']:.2f} · "
+                       f"{evaluation['cv']['folds']}-fold CV {evaluation['cv']['mean']['roc_auc']:.2f} "
+                       f"± {evaluation['cv']['std']['roc_auc']:.2f}")
+        else:
+            with col1:
+                st.metric("Accuracy", "72%")
+                st.metric("ROC-AUC", "0.72")
+            with col2:
+                st.metric("Precision", "40%")
+                st.metric("Recall", "72%")
+            st.caption("Single 80/20 split from the training notebook; no evaluation was recorded with this model.")
+    
+    with st.expander("⚡ Prediction Cache"):
+        cache_stats = prediction_cache.stats()
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Accuracy", "72%")
-            st.metric("ROC-AUC", "0.72")
+            st.metric("Hits", cache_stats['hits'])
         with col2:
-            st.metric("Precision", "40%")
-            st.metric("Recall", "72%")
+            st.metric("Misses", cache_stats['misses'])
+        st.caption(f"Hit rate {cache_stats['hit_rate']:.0%} · {cache_stats['size']}/{cache_stats['maxsize']} entries · model {model_version_id}")
+    
+    if registry is not None:
+        with st.expander("🔁 Model Registry"):
+            registry_info = registry.info()
+            st.caption(f"Active {model_version_id} · loaded {registry_info['active']['loaded_at']} · "
+                       f"{registry_info['reloads']} hot reloads")
+            if registry_info['last_error']:
+                st.warning(f"Reload failed: {registry_info['last_error']}")
+            if registry_info['shadow'] is not None:
+                shadow_stats = registry_info['shadow_stats']
+                st.caption(f"Shadow {registry_info['shadow']['version']} · {shadow_stats['rows']} compared")
+                if shadow_stats['rows']:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("Mean |Δ|", f"{shadow_stats['mean_abs_diff'] * 100:.1f} pts")
+                    with col2:
+                        st.metric("Tier changes", shadow_stats['tier_disagreements'])
     
     with st.expander("🔬 Clinical Features"):
         st.markdown("""
@@ -169,10 +402,6 @@ with st.sidebar:
     st.caption("🔒 HIPAA Compliant")
     st.caption(f"🕒 {datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
-# Header
-st.markdown('<div class="main-header">🏥 Clinical Readmission Risk Assessment</div>', unsafe_allow_html=True)
-st.markdown('<div class="sub-header">AI-Powered Clinical Decision Support for 30-Day Readmission Prediction</div>', unsafe_allow_html=True)
-
 if model is None:
     st.error("⚠️ Model not loaded. Please ensure model files exist.")
     st.stop()
@@ -180,10 +409,48 @@ if model is None:
 # Tabs
 tab1, tab2, tab3 = st.tabs(["📝 Patient Assessment", "🔮 Risk Analysis", "📈 System Info"])
 
-with tab1:
+# Fragments: editing the form reruns only the form, and the what-if selector reruns only the analysis.
+# Analyzing stores the inputs and reruns the whole app once.
+@st.fragment
+@metrics.timed('ui_fragment_seconds', fragment='patient_form')
+def patient_form(active_model, history_store):
+    """Assessment form; the analyze button snapshots its values for the Risk Analysis tab"""
     st.markdown("### Patient Information Entry")
+    
+    if history_store is not None:
+        with st.expander("🗂️ Pre-fill from patient history", expanded=True):
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                st.text_input("PatientID", key='prefill_patient_id')
+            with col2:
+                st.text_input("AdmissionID", key='prefill_admission_id', help="Leave blank for the latest admission")
+            with col3:
+                st.button("Pre-fill", on_click=prefill_form, args=(history_store, active_model.encoder),
+                          use_container_width=True)
+            if 'prefill_message' in st.session_state:
+                level, message = st.session_state.pop('prefill_message')
+                getattr(st, level)(message)
+    
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
     
+    # Form defaults live in session state so the pre-fill can overwrite them
+    for key, default in {
+        'form_admission_date': (datetime.now() - timedelta(days=4)).date(),
+        'form_discharge_date': datetime.now().date(),
+        'form_previous_admissions': 0,
+        'form_num_labs': 15,
+        'form_patient_age': 55,
+        'form_patient_gender': "Male",
+        'form_diagnosis_chapter': CHAPTER_LABELS[8],  # Default to Circulatory
+        'form_hemoglobin_avg': 13.5,
+        'form_glucose_avg': 100.0,
+        'form_creatinine_avg': 1.0,
+        'form_wbc_avg': 7.5
+    }.items():
+        st.session_state.setdefault(key, default)
+    chapter_options = CHAPTER_LABELS + ([st.session_state['form_diagnosis_chapter']]
+                                        if st.session_state['form_diagnosis_chapter'] not in CHAPTER_LABELS else [])
+    
     col1, col2, col3 = st.columns([1, 1, 1])
     
     # Column 1: Admission Data
@@ -192,14 +459,14 @@ with tab1:
         
         admission_date = st.date_input(
             "Admission Date",
-            value=datetime.now() - timedelta(days=4),
+            key='form_admission_date',
             max_value=datetime.now(),
             help="Date patient was admitted to hospital"
         )
         
         discharge_date = st.date_input(
             "Discharge Date",
-            value=datetime.now(),
+            key='form_discharge_date',
             min_value=admission_date,
             max_value=datetime.now(),
             help="Date patient was discharged"
@@ -212,7 +479,7 @@ with tab1:
             "Previous Admissions",
             min_value=0,
             max_value=50,
-            value=0,
+            key='form_previous_admissions',
             help="Total number of previous hospital admissions in patient history"
         )
         
@@ -220,7 +487,7 @@ with tab1:
             "Number of Lab Tests",
             min_value=0,
             max_value=500,
-            value=15,
+            key='form_num_labs',
             help="Total laboratory tests performed during admission"
         )
     
@@ -232,13 +499,14 @@ with tab1:
             "Patient Age",
             min_value=0,
             max_value=120,
-            value=55,
+            key='form_patient_age',
             help="Patient's age in years"
         )
         
         patient_gender = st.selectbox(
             "Gender",
             options=["Male", "Female"],
+            key='form_patient_gender',
             help="Patient's biological sex"
         )
         
@@ -246,30 +514,8 @@ with tab1:
         
         diagnosis_chapter = st.selectbox(
             "ICD Diagnosis Chapter",
-            options=[
-                "I - Infectious diseases",
-                "II - Neoplasms",
-                "III - Blood/immune disorders",
-                "IV - Endocrine/nutritional/metabolic",
-                "V - Mental disorders",
-                "VI - Nervous system",
-                "VII - Eye disorders",
-                "VIII - Ear disorders",
-                "IX - Circulatory system",
-                "X - Respiratory system",
-                "XI - Digestive system",
-                "XII - Skin disorders",
-                "XIII - Musculoskeletal system",
-                "XIV - Genitourinary system",
-                "XV - Pregnancy/childbirth",
-                "XVI - Perinatal conditions",
-                "XVII - Congenital abnormalities",
-                "XVIII - Symptoms/signs",
-                "XIX - Injury/poisoning",
-                "XX - External causes",
-                "XXI - Health status factors"
-            ],
-            index=8,  # Default to Circulatory
+            options=chapter_options,
+            key='form_diagnosis_chapter',
             help="Primary diagnosis classification (ICD-10 chapter)"
         )
     
@@ -282,7 +528,7 @@ with tab1:
             "Hemoglobin (g/dL)",
             min_value=0.0,
             max_value=25.0,
-            value=13.5,
+            key='form_hemoglobin_avg',
             step=0.1,
             help="Normal: 12-16 g/dL. Indicates anemia if low"
         )
@@ -291,7 +537,7 @@ with tab1:
             "Glucose (mg/dL)",
             min_value=0.0,
             max_value=600.0,
-            value=100.0,
+            key='form_glucose_avg',
             step=1.0,
             help="Normal: 70-100 mg/dL. Diabetes indicator if elevated"
         )
@@ -300,7 +546,7 @@ with tab1:
             "Creatinine (mg/dL)",
             min_value=0.0,
             max_value=20.0,
-            value=1.0,
+            key='form_creatinine_avg',
             step=0.1,
             help="Normal: 0.7-1.3 mg/dL. Kidney function marker"
         )
@@ -309,7 +555,7 @@ with tab1:
             "WBC Count (k/cumm)",
             min_value=0.0,
             max_value=100.0,
-            value=7.5,
+            key='form_wbc_avg',
             step=0.1,
             help="Normal: 4.0-11.0 k/cumm. Infection/immune indicator"
         )
@@ -319,35 +565,77 @@ with tab1:
     col_center = st.columns([1, 2, 1])[1]
     with col_center:
         predict_button = st.button("🔮 Analyze Readmission Risk", type="primary", use_container_width=True)
-
-with tab2:
+    # The analysis keeps these inputs until the next analyze, so editing the form doesn't re-score
     if predict_button:
+        st.session_state['analysis_inputs'] = {
+            'admission_date': admission_date,
+            'discharge_date': discharge_date,
+            'length_of_stay': length_of_stay,
+            'previous_admissions': previous_admissions,
+            'num_labs': num_labs,
+            'patient_age': patient_age,
+            'patient_gender': patient_gender,
+            'diagnosis_chapter': diagnosis_chapter,
+            'hemoglobin': hemoglobin,
+            'glucose': glucose,
+            'creatinine': creatinine,
+            'wbc': wbc
+        }
+        st.session_state['analysis_new'] = True
+        st.rerun()
+
+@st.fragment
+@metrics.timed('ui_fragment_seconds', fragment='risk_analysis')
+def risk_analysis(active_model, registry, prediction_cache):
+    """Prediction block for the analyzed inputs; the only part that re-executes per interaction"""
+    import plotly.graph_objects as go
+    from readmission.sensitivity import SENSITIVITY_GRIDS, sensitivity_curve
+    
+    model, feature_names, model_version_id = active_model.model, active_model.feature_names, active_model.version
+    inputs = st.session_state.get('analysis_inputs')
+    if inputs is not None:
+        admission_date, discharge_date = inputs['admission_date'], inputs['discharge_date']
+        length_of_stay, previous_admissions, num_labs = (
+            inputs['length_of_stay'], inputs['previous_admissions'], inputs['num_labs']
+        )
+        patient_age, patient_gender, diagnosis_chapter = (
+            inputs['patient_age'], inputs['patient_gender'], inputs['diagnosis_chapter']
+        )
+        hemoglobin, glucose, creatinine, wbc = (
+            inputs['hemoglobin'], inputs['glucose'], inputs['creatinine'], inputs['wbc']
+        )
+        
         # Prepare input
         try:
-            input_data = pd.DataFrame({
-                'LengthOfStay': [length_of_stay],
-                'PreviousAdmissions': [previous_admissions],
-                'PatientAge': [patient_age],
-                'PatientGender': [patient_gender],
-                'DiagnosisChapter': [diagnosis_chapter],
-                'NumLabs': [num_labs],
-                'hemoglobin_avg': [hemoglobin],
-                'glucose_avg': [glucose],
-                'creatinine_avg': [creatinine],
-                'wbc_avg': [wbc]
-            })
+            raw_input = {
+                'LengthOfStay': length_of_stay,
+                'PreviousAdmissions': previous_admissions,
+                'PatientAge': patient_age,
+                'PatientGender': patient_gender,
+                'DiagnosisChapter': diagnosis_chapter,
+                'NumLabs': num_labs,
+                'hemoglobin_avg': hemoglobin,
+                'glucose_avg': glucose,
+                'creatinine_avg': creatinine,
+                'wbc_avg': wbc
+            }
             
-            # Encode
-            for col in ['PatientGender', 'DiagnosisChapter']:
-                if col in encoders:
-                    try:
-                        input_data[col] = encoders[col].transform(input_data[col].astype(str))
-                    except:
-                        input_data[col] = 0
+            # Encode (chapter labels map onto the trained ICD-10 letters; unseen values are flagged).
+            # One record: the dict lookups of encode_records, not a DataFrame transform
+            with metrics.timer('encode_seconds', caller='ui'):
+                encoded, unknown = active_model.encoder.encode_records([raw_input], on_unknown='flag')
+                input_data = pd.DataFrame(encoded, columns=active_model.encoder.feature_names)
+            for col, values in unknown.items():
+                st.warning(f"⚠️ {col} '{', '.join(values)}' was not in the training data; "
+                           f"the model scores it as its first category, so treat this result with caution.")
             
-            # Predict
-            prediction = model.predict(input_data)[0]
-            prediction_proba = model.predict_proba(input_data)[0]
+            # Predict (reruns with unchanged inputs are served from the cache)
+            with metrics.timer('predict_seconds', caller='ui'):
+                prediction_proba = prediction_cache.predict_proba(input_data, active_model.predict_proba, model_version_id)[0]
+            # A candidate model (if configured) scores the same input in the background, once per analysis
+            if st.session_state.pop('analysis_new', False):
+                registry.submit_shadow(pd.DataFrame([raw_input]), prediction_proba[None, :])
+            prediction = model.classes_[np.argmax(prediction_proba)]
             readmission_prob = prediction_proba[1] * 100
             
             # Risk Level
@@ -455,33 +743,93 @@ with tab2:
             st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
             st.markdown("### 📈 Contributing Factors")
             
-            feature_importance = pd.DataFrame({
-                'Feature': feature_names,
-                'Importance': model.feature_importances_
-            }).sort_values('Importance', ascending=True)
+            # Per-patient attribution: how much each feature moved this patient's probability
+            with metrics.timer('chart_seconds', chart='contributions'):
+                explainer = load_explainer(model, model_version_id)
+                if explainer is not None:
+                    bias, contributions = explainer.contributions(input_data[feature_names])
+                    readmit_index = list(explainer.classes_).index(1)
+                    contribution = pd.DataFrame({
+                        'Feature': feature_names,
+                        'Contribution': contributions[0, :, readmit_index] * 100
+                    })
+                    contribution = contribution.sort_values('Contribution', key=abs)
+                
+                    fig = go.Figure(go.Bar(
+                        x=contribution['Contribution'],
+                        y=contribution['Feature'],
+                        orientation='h',
+                        marker=dict(
+                            color=np.where(contribution['Contribution'] > 0, '#dc2626', '#059669'),
+                            line=dict(color='#1e293b', width=1)
+                        ),
+                        hovertemplate='%{y}: %{x:+.1f} percentage points<extra></extra>'
+                    ))
+                
+                    fig.update_layout(
+                        title=f"What Drove This Patient's Risk (baseline {bias[readmit_index] * 100:.1f}%)",
+                        xaxis_title="Contribution to Readmission Probability (percentage points)",
+                        yaxis_title="Clinical Feature",
+                        height=400,
+                        template="plotly_white",
+                        showlegend=False
+                    )
+                
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.caption("Red bars raise the risk, green bars lower it. Baseline plus all bars equals the predicted probability.")
+                else:
+                    st.info("Per-patient contributions are only available for the random forest engine.")
+            
+            # What-if sensitivity: sweep one feature, scoring the whole grid in one batched call
+            st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+            st.markdown("### 🎚️ What-If Sensitivity")
             
-            # Create modern plotly chart
-            fig = go.Figure(go.Bar(
-                x=feature_importance['Importance'],
-                y=feature_importance['Feature'],
-                orientation='h',
-                marker=dict(
-                    color=feature_importance['Importance'],
-                    colorscale='Blues',
-                    line=dict(color='#1e40af', width=1)
+            sweep_feature = st.selectbox(
+                "Feature to vary",
+                list(SENSITIVITY_GRIDS),
+                help="All other inputs stay at this patient's values"
+            )
+            patient_row = input_data[feature_names]
+            with metrics.timer('sensitivity_sweep_seconds', feature=sweep_feature):
+                curve = sensitivity_curve(
+                    lambda grid: prediction_cache.predict_proba(grid, active_model.predict_proba, model_version_id),
+                    patient_row,
+                    sweep_feature
                 )
+            curve['probability'] *= 100
+            current_value = patient_row[sweep_feature].iloc[0]
+            
+            fig = go.Figure(go.Scatter(
+                x=curve[sweep_feature],
+                y=curve['probability'],
+                mode='lines',
+                line=dict(color='#1e293b', width=3),
+                hovertemplate=f'{sweep_feature} %{{x}}: %{{y:.1f}}%<extra></extra>'
+            ))
+            fig.add_hrect(y0=60, y1=100, fillcolor='#dc2626', opacity=0.08, line_width=0)
+            fig.add_hrect(y0=40, y1=60, fillcolor='#d97706', opacity=0.08, line_width=0)
+            fig.add_hline(y=60, line_dash='dash', line_color='#dc2626', annotation_text='High risk (60%)')
+            fig.add_hline(y=40, line_dash='dash', line_color='#d97706', annotation_text='Moderate risk (40%)')
+            fig.add_trace(go.Scatter(
+                x=[current_value],
+                y=[readmission_prob],
+                mode='markers',
+                marker=dict(size=14, color=risk_color, line=dict(color='#1e293b', width=2)),
+                hovertemplate=f'This patient: {current_value} → {readmission_prob:.1f}%<extra></extra>'
             ))
             
             fig.update_layout(
-                title="Feature Importance in Prediction Model",
-                xaxis_title="Importance Score",
-                yaxis_title="Clinical Feature",
+                title=f"Readmission Risk as {sweep_feature} Changes",
+                xaxis_title=sweep_feature,
+                yaxis_title="Readmission Probability (%)",
+                yaxis_range=[0, 100],
                 height=400,
                 template="plotly_white",
                 showlegend=False
             )
             
             st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"{len(curve)} what-if values scored in one batch; the marker is the current patient.")
             
             # Patient Summary
             st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
@@ -519,6 +867,12 @@ with tab2:
     else:
         st.info("👈 Please enter patient details in the 'Patient Assessment' tab and click 'Analyze Readmission Risk'")
 
+with tab1:
+    patient_form(active_model, history_store)
+
+with tab2:
+    risk_analysis(active_model, registry, prediction_cache)
+
 with tab3:
     st.markdown("### 📈 System Information")
     
@@ -526,25 +880,17 @@ with tab3:
     
     with col1:
         st.markdown("#### Model Architecture")
-        st.markdown("""
-        **Algorithm:** Random Forest Classifier
-        
-        **Configuration:**
-        - Estimators: 100 trees
-        - Max Depth: 10
-        - Class Weight: Balanced
-        - Random State: 42
-        
-        **Training Data:**
-        - Total Admissions: 36,143
-        - Total Patients: 10,002
-        - Train Split: 80%
-        - Test Split: 20%
-        """)
+        if model is not None:
+            st.markdown(architecture_text(model_version_id, model, model_metrics or {}))
     
     with col2:
         st.markdown("#### Performance Metrics")
-        st.markdown("""
+        if evaluation:
+            st.dataframe(performance_table(model_version_id, evaluation), use_container_width=True, hide_index=True)
+            st.caption(f"Intervals from {evaluation['resamples']:,} bootstrap resamples of the "
+                       f"{evaluation['test_rows']:,}-row test set. Model {model_version_id}.")
+        else:
+            st.markdown("""
         **Test Set Results:**
         - Accuracy: ~72%
         - Precision: ~40%
@@ -559,38 +905,38 @@ with tab3:
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
     st.markdown("#### Clinical Features")
     
-    features_df = pd.DataFrame({
-        'Feature': [
-            'Length of Stay',
-            'Previous Admissions',
-            'Patient Age',
-            'Gender',
-            'Diagnosis Chapter',
-            'Lab Test Count',
-            'Hemoglobin',
-            'Glucose',
-            'Creatinine',
-            'WBC Count'
-        ],
-        'Type': [
-            'Numeric', 'Numeric', 'Numeric', 'Categorical', 'Categorical',
-            'Numeric', 'Numeric', 'Numeric', 'Numeric', 'Numeric'
-        ],
-        'Clinical Relevance': [
-            'Severity indicator',
-            'Chronic condition marker',
-            'Age-related risk',
-            'Gender-specific conditions',
-            'Disease category risk',
-            'Monitoring intensity',
-            'Anemia detection',
-            'Diabetes control',
-            'Kidney function',
-            'Infection/immune status'
-        ]
-    })
+    st.dataframe(feature_table(), use_container_width=True, hide_index=True)
+    
+    st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+    st.markdown("#### ⏱️ Runtime Metrics")
+    
+    # Process-wide timings (all sessions); the current rerun is recorded after the page renders
+    snapshot = metrics.REGISTRY.snapshot()
+    if snapshot['histograms']:
+        timings_df = pd.DataFrame([
+            {
+                'Timer': name,
+                'Count': summary['count'],
+                'Mean (ms)': summary['mean'] * 1000,
+                'p50 ≤ (ms)': summary['p50'] * 1000,
+                'p99 ≤ (ms)': summary['p99'] * 1000
+            }
+            for name, summary in sorted(snapshot['histograms'].items())
+        ])
+        st.dataframe(timings_df, use_container_width=True, hide_index=True, column_config={
+            col: st.column_config.NumberColumn(format="%.2f") for col in ['Mean (ms)', 'p50 ≤ (ms)', 'p99 ≤ (ms)']
+        })
+        st.caption("Percentiles are histogram bucket upper bounds.")
+    else:
+        st.info("No timings recorded yet.")
     
-    st.dataframe(features_df, use_container_width=True, hide_index=True)
+    metrics_col1, metrics_col2 = st.columns(2)
+    with metrics_col1:
+        st.download_button("Download metrics (Prometheus text)", metrics.REGISTRY.to_prometheus(),
+                           file_name="readmission_metrics.prom", mime="text/plain", use_container_width=True)
+    with metrics_col2:
+        st.download_button("Download trace (JSON)", json.dumps(metrics.REGISTRY.trace()),
+                           file_name="readmission_trace.json", mime="application/json", use_container_width=True)
     
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
     st.markdown("#### ⚠️ Clinical Use Disclaimer")
@@ -625,3 +971,6 @@ st.markdown("""
         <p style="margin: 5px 0;">© 2026 | For Healthcare Professional Use Only</p>
     </div>
 """, unsafe_allow_html=True)
+
+metrics.REGISTRY.record('ui_rerun_seconds', rerun_start, time.perf_counter_ns())
+metrics.increment('ui_reruns_total')